@@ -1,61 +1,567 @@
-import diskcache
+"""
+Two-tier cache for AI responses and other derived data.
+
+Reads go to a bounded in-process LRU first and fall back to the shared tier
+(``diskcache`` by default, or Redis; see ``cache_backends``), promoting its
+hits into memory. The memory tier is
+bounded by entry count and by the pickled size of its values
+(``settings.cache_memory_max_bytes``); values served from it are shared
+objects and must be treated as read-only.
+
+Entries can carry tags (``CacheManager.tag("org", 7)``, ``"domain:payroll"``,
+entity ids). ``invalidate_tags`` bumps a per-tag generation stored in the shared
+tier; an entry is only served while the generations recorded when it was
+written are still current. Other workers notice a bump within
+``settings.cache_tag_refresh_seconds``.
+
+Keys are a fast non-cryptographic digest (xxh3 when ``xxhash`` is installed,
+blake2b otherwise) of a canonical encoding of the payload. ``cache_ai_response``
+can declare which arguments take part in the key and how each is normalized.
+
+``cache_ai_response(tags=...)`` derives entity tags from the call's arguments;
+they are also applied to the AI gateway entries written underneath it (see
+``cache_tags``), so one ``invalidate_tags`` on a write path clears both layers.
+
+With ``stale_after`` (soft TTL) the decorator serves a stale value
+immediately and refreshes it once in the background; callers only block on
+the model after the hard TTL (``expire``) has dropped the entry.
+"""
+import contextvars
+import enum
 import hashlib
-import json
+import inspect
 import logging
-from functools import wraps
-from typing import Any, Optional
+import pickle
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from uuid import UUID
+from pydantic import BaseModel
+from app.core.cache_backends import CacheBackend, RedisCacheBackend, create_cache_backend
 from app.core.config import settings
+from app.core.metrics import MetricsManager
+from app.core.rate_governor import AIPriority, ai_call_context
+from app.core.singleflight import SingleFlight
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - optional speedup
+    xxhash = None
 
 logger = logging.getLogger(__name__)
 
+Normalizer = Callable[[Any], Any]
+
+# Strings at least this long have their digest memoized (resumes, job descriptions)
+_MEMO_MIN_CHARS = 1024
+
+
+def _hasher():
+    return xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+
+
+def _feed(h, value: Any):
+    """Feed a canonical, type-tagged encoding of ``value`` into hasher ``h``."""
+    if value is None:
+        h.update(b"N")
+    elif isinstance(value, bool):
+        h.update(b"T" if value else b"F")
+    elif isinstance(value, enum.Enum):
+        _feed(h, value.value)
+    elif isinstance(value, str):
+        if len(value) >= _MEMO_MIN_CHARS:
+            h.update(b"H" + _memo_digest(None, value))
+        else:
+            data = value.encode("utf-8", "surrogatepass")
+            h.update(b"s" + struct.pack("<Q", len(data)) + data)
+    elif isinstance(value, int):
+        h.update(b"i" + str(value).encode() + b";")
+    elif isinstance(value, (float, Decimal)):
+        h.update(b"f" + repr(value).encode() + b";")
+    elif isinstance(value, (bytes, bytearray)):
+        h.update(b"b" + struct.pack("<Q", len(value)) + bytes(value))
+    elif isinstance(value, (list, tuple)):
+        h.update(b"l" + struct.pack("<Q", len(value)))
+        for item in value:
+            _feed(h, item)
+    elif isinstance(value, dict):
+        h.update(b"d" + struct.pack("<Q", len(value)))
+        for k, v in sorted(value.items(), key=lambda item: str(item[0])):
+            _feed(h, k)
+            _feed(h, v)
+    elif isinstance(value, (set, frozenset)):
+        _feed(h, sorted(value, key=str))
+    elif isinstance(value, (datetime, date, UUID)):
+        _feed(h, str(value))
+    elif isinstance(value, BaseModel):
+        _feed(h, value.model_dump())
+    else:
+        raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+
+@lru_cache(maxsize=256)
+def _memo_digest(normalizer: Optional[Normalizer], text: str) -> bytes:
+    """Digest of a large string (after ``normalizer``), computed once per distinct input."""
+    if normalizer is not None:
+        text = normalizer(text)
+    h = _hasher()
+    data = text.encode("utf-8", "surrogatepass") if isinstance(text, str) else text
+    if isinstance(data, bytes):
+        h.update(b"s" + struct.pack("<Q", len(data)) + data)
+    else:
+        _feed(h, data)
+    return h.digest()
+
+
+def hash_payload(payload: Any) -> str:
+    h = _hasher()
+    _feed(h, payload)
+    return h.hexdigest()
+
+
+def collapse_whitespace(value: Any) -> Any:
+    """Key normalizer: runs of whitespace compare equal."""
+    return " ".join(value.split()) if isinstance(value, str) else value
+
+
+def truncate(limit: int) -> Normalizer:
+    """Key normalizer: only the first ``limit`` characters (what the prompt actually uses) count."""
+    def normalize(value: Any) -> Any:
+        return value[:limit] if isinstance(value, str) else value
+    return normalize
+
+
+def text_key(limit: Optional[int] = None) -> Normalizer:
+    """Truncate to ``limit`` (if given), then collapse whitespace."""
+    cut = truncate(limit) if limit is not None else None
+
+    def normalize(value: Any) -> Any:
+        return collapse_whitespace(cut(value) if cut else value)
+    return normalize
+
+
+class _Tagged:
+    """Shared-tier envelope for a value written with tags."""
+    __slots__ = ("value", "tags")
+
+    def __init__(self, value: Any, tags: Dict[str, int]):
+        self.value = value
+        self.tags = tags
+
+
+class _MemoryEntry:
+    __slots__ = ("value", "size", "expires_at", "tags")
+
+    def __init__(self, value: Any, size: int, expires_at: Optional[float], tags: Optional[Dict[str, int]]):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class MemoryTier:
+    """Thread-safe LRU bounded by entry count and total value size in bytes."""
+
+    def __init__(self, max_bytes: int, max_items: int):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.size = 0
+        self._entries: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[_MemoryEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: Optional[float], tags: Optional[Dict[str, int]] = None):
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            self.delete(key)
+            return
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = _MemoryEntry(value, size, expires_at, tags)
+            self.size += size
+            evicted = 0
+            while self.size > self.max_bytes or len(self._entries) > self.max_items:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            MetricsManager.set_cache_memory_bytes(self.size)
+        if evicted:
+            MetricsManager.record_cache_eviction("memory", evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+            MetricsManager.set_cache_memory_bytes(self.size)
+
+    def drop_tags(self, tags: Iterable[str]):
+        tags = set(tags)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.tags and tags.intersection(e.tags)]:
+                self._remove(key)
+            MetricsManager.set_cache_memory_bytes(self.size)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class CacheManager:
-    _cache: Optional[diskcache.Cache] = None
+    _cache: Optional[CacheBackend] = None
+    _memory: Optional[MemoryTier] = None
+    _memory_owner: Optional[CacheBackend] = None
+    _tag_generations: Dict[str, Tuple[int, float]] = {}  # tag -> (generation, fetched at)
+    _lock = threading.Lock()
 
     @classmethod
-    def get_cache(cls) -> diskcache.Cache:
+    def get_cache(cls) -> CacheBackend:
         if cls._cache is None:
-            cls._cache = diskcache.Cache(settings.cache_dir)
+            cls._cache = create_cache_backend()
         return cls._cache
 
+    @classmethod
+    def close(cls):
+        """Release the shared tier's connections / file handles (on shutdown)."""
+        if cls._cache is not None:
+            cls._cache.close()
+            cls._cache = None
+
+    @classmethod
+    def _memory_tier(cls) -> Optional[MemoryTier]:
+        """Memory tier for the current shared tier (rebuilt when ``_cache`` is replaced)."""
+        cache = cls.get_cache()
+        with cls._lock:
+            if cls._memory_owner is not cache:
+                cls._memory = None
+                cls._memory_owner = cache
+                cls._tag_generations = {}
+            if cls._memory is None and settings.cache_memory_max_bytes > 0:
+                cls._memory = MemoryTier(settings.cache_memory_max_bytes, settings.cache_memory_max_items)
+            return cls._memory
+
     @classmethod
     def generate_key(cls, domain: str, task: str, payload: Any) -> str:
         """Generate a unique cache key based on domain, task, and input payload."""
-        payload_str = json.dumps(payload, sort_keys=True)
-        hash_val = hashlib.sha256(payload_str.encode()).hexdigest()
-        return f"{domain}:{task}:{hash_val}"
+        return f"{domain}:{task}:{hash_payload(payload)}"
+
+    @staticmethod
+    def tag(kind: str, value: Any) -> str:
+        """Tag name such as ``org:7``, ``domain:payroll`` or ``employee:42``."""
+        return f"{kind}:{value}"
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"cache_tag:{tag}"
+
+    @classmethod
+    def _generations(cls, tags: Iterable[str]) -> Dict[str, int]:
+        now = time.monotonic()
+        generations = {}
+        for tag in tags:
+            known = cls._tag_generations.get(tag)
+            if known is None or now - known[1] > settings.cache_tag_refresh_seconds:
+                known = (cls.get_cache().get(cls._tag_key(tag), default=0), now)
+                with cls._lock:
+                    cls._tag_generations[tag] = known
+            generations[tag] = known[0]
+        return generations
+
+    @classmethod
+    def _is_current(cls, tags: Optional[Dict[str, int]]) -> bool:
+        return not tags or cls._generations(tags) == tags
 
     @classmethod
-    def get(cls, key: str) -> Optional[Any]:
+    def get(cls, key: str, memory: bool = True) -> Optional[Any]:
+        """
+        Look ``key`` up in memory, then in the shared tier. Pass ``memory=False`` for
+        values other workers rewrite in place, so a stale local copy is never read.
+        """
         if not settings.enable_caching:
             return None
-        return cls.get_cache().get(key)
+        tier = cls._memory_tier() if memory else None
+        if tier is not None:
+            entry = tier.get(key)
+            if entry is not None and cls._is_current(entry.tags):
+                MetricsManager.record_cache_lookup("memory", "hit")
+                return entry.value
+            if entry is not None:
+                tier.delete(key)
+            MetricsManager.record_cache_lookup("memory", "miss")
+
+        value, expires_at = cls.get_cache().get(key, expire_time=True)
+        tags = None
+        if isinstance(value, _Tagged):
+            tags, value = value.tags, value.value
+            if not cls._is_current(tags):
+                cls.get_cache().delete(key)
+                value = None
+        if value is None:
+            MetricsManager.record_cache_lookup("shared", "miss")
+            return None
+        MetricsManager.record_cache_lookup("shared", "hit")
+        if tier is not None:
+            tier.set(key, value, expires_at, tags)
+        return value
 
     @classmethod
-    def set(cls, key: str, value: Any, expire: int = 3600):
+    def set(
+        cls,
+        key: str,
+        value: Any,
+        expire: int = 3600,
+        tags: Optional[Iterable[str]] = None,
+        memory: bool = True
+    ):
+        """Write both tiers; ``tags`` make the entry invalidatable with ``invalidate_tags``."""
         if not settings.enable_caching:
             return
-        cls.get_cache().set(key, value, expire=expire)
+        snapshot = cls._generations(tags) if tags else None
+        cls.get_cache().set(key, _Tagged(value, snapshot) if snapshot else value, expire=expire)
+        tier = cls._memory_tier()
+        if tier is None:
+            return
+        if memory:
+            tier.set(key, value, time.time() + expire if expire is not None else None, snapshot)
+        else:
+            tier.delete(key)
+
+    @classmethod
+    def transact(cls, key: str):
+        """Context manager serializing read-modify-write of ``key`` across workers."""
+        cache = cls.get_cache()
+        if isinstance(cache, RedisCacheBackend):
+            return cache.transact(key)
+        return cache.transact()  # diskcache: one write transaction for the whole cache
+
+    @classmethod
+    def evict_local(cls, key: str):
+        """Forget this worker's in-memory copy of ``key``; the next read goes to the shared tier."""
+        tier = cls._memory_tier()
+        if tier is not None:
+            tier.delete(key)
+
+    @classmethod
+    def invalidate_tags(cls, *tags: str):
+        """Drop every entry carrying any of ``tags``, in this worker and (shortly) all others."""
+        cache = cls.get_cache()
+        tier = cls._memory_tier()
+        for tag in tags:
+            generation = cache.incr(cls._tag_key(tag), default=0)
+            with cls._lock:
+                cls._tag_generations[tag] = (generation, time.monotonic())
+        if tier is not None:
+            tier.drop_tags(tags)
+        logger.info(f"Cache invalidated for tags {', '.join(tags)}")
+
+class _Fresh:
+    """Cached value with its soft-TTL deadline."""
+    __slots__ = ("value", "fresh_until")
+
+    def __init__(self, value: Any, fresh_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+
+# Set while a background refresh runs, so lower cache layers (the AI gateway)
+# do not hand the stale answer straight back
+_refreshing: ContextVar[bool] = ContextVar("cache_refreshing", default=False)
+_refresh_keys: set = set()
+_refresh_lock = threading.Lock()
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+
+
+def is_refreshing() -> bool:
+    return _refreshing.get()
+
+
+# Tags for every entry written in the current context, on top of the entry's own
+_entry_tags: ContextVar[Tuple[str, ...]] = ContextVar("cache_entry_tags", default=())
+
+
+def current_cache_tags() -> Tuple[str, ...]:
+    return _entry_tags.get()
+
+
+@contextmanager
+def cache_tags(*tags: str) -> Iterator[None]:
+    """Tag every cache entry written inside the block (e.g. the gateway's) with ``tags``."""
+    token = _entry_tags.set(tuple(dict.fromkeys(_entry_tags.get() + tags)))
+    try:
+        yield
+    finally:
+        _entry_tags.reset(token)
+
+
+def _schedule_refresh(key: str, compute: Callable[[], Any]):
+    """Recompute ``key`` in the background, at most once at a time per worker."""
+    global _refresh_executor
+    with _refresh_lock:
+        if key in _refresh_keys:
+            return
+        _refresh_keys.add(key)
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(
+                max_workers=settings.cache_refresh_workers, thread_name_prefix="cache-refresh"
+            )
+    _refresh_executor.submit(contextvars.copy_context().run, _refresh, key, compute)
 
-def cache_ai_response(domain: str, expire: int = 3600):
-    """Decorator for caching AI service responses."""
+
+def _refresh(key: str, compute: Callable[[], Any]):
+    token = _refreshing.set(True)
+    try:
+        current = CacheManager.get(key, memory=False)
+        if isinstance(current, _Fresh) and current.is_fresh():
+            # Another worker already refreshed it; drop our stale copy
+            CacheManager.evict_local(key)
+            return
+
+        def recheck():
+            value = CacheManager.get(key, memory=False)
+            return value if isinstance(value, _Fresh) and value.is_fresh() else None
+
+        with ai_call_context(priority=AIPriority.BACKGROUND):
+            SingleFlight.do(key, compute, recheck=recheck)
+        logger.info(f"Cache refreshed {key}")
+    except Exception as e:
+        logger.warning(f"Background cache refresh failed for {key}: {e}")
+    finally:
+        _refreshing.reset(token)
+        with _refresh_lock:
+            _refresh_keys.discard(key)
+
+
+def _unwrap(value: Any) -> Any:
+    return value.value if isinstance(value, _Fresh) else value
+
+
+def _tag_builder(
+    func: Callable, tags: Optional[Callable[[Dict[str, Any]], Iterable[str]]]
+) -> Callable[..., Tuple[str, ...]]:
+    signature = inspect.signature(func)
+
+    def build(*args, **kwargs) -> Tuple[str, ...]:
+        if tags is None:
+            return ()
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple(tags(bound.arguments))
+    return build
+
+
+def _key_builder(func: Callable, domain: str, key: Optional[Dict[str, Optional[Normalizer]]]) -> Callable[..., str]:
+    signature = inspect.signature(func)
+    params = list(signature.parameters)
+    if params and params[0] in ("self", "cls"):
+        params = params[1:]  # instance state never takes part implicitly
+    if key is None:
+        key = {name: None for name in params}
+    unknown = set(key) - set(params)
+    if unknown:
+        raise ValueError(f"{func.__qualname__} has no arguments named {', '.join(sorted(unknown))}")
+
+    def build(*args, **kwargs) -> str:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        h = _hasher()
+        for name, normalizer in key.items():
+            value = bound.arguments[name]
+            _feed(h, name)
+            if isinstance(value, str) and len(value) >= _MEMO_MIN_CHARS:
+                h.update(b"H" + _memo_digest(normalizer, value))
+            else:
+                _feed(h, normalizer(value) if normalizer else value)
+        return f"{domain}:{func.__name__}:{h.hexdigest()}"
+    return build
+
+
+def cache_ai_response(
+    domain: str,
+    expire: int = 3600,
+    key: Optional[Dict[str, Optional[Normalizer]]] = None,
+    stale_after: Optional[int] = None,
+    tags: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None
+):
+    """
+    Decorator for caching AI service responses.
+
+    ``key`` maps the argument names that identify the response to an optional
+    normalizer (``collapse_whitespace``, ``truncate(n)``, ``text_key(n)``);
+    by default every argument except ``self``/``cls`` is used as-is.
+
+    ``tags`` receives the bound arguments (``self`` included) and returns the
+    tags to store the entry under besides ``domain:<domain>``, e.g.
+    ``lambda a: [CacheManager.tag("employee", a["employee_id"])]``; write paths
+    that change the inputs then call ``CacheManager.invalidate_tags``.
+
+    ``stale_after`` (seconds, less than ``expire``) enables stale-while-revalidate.
+    The function is then re-run on a background thread, so it must not depend on
+    request-scoped state such as a DB session, and should raise rather than
+    return a fallback it does not want cached.
+    """
     def decorator(func):
+        build_key = _key_builder(func, domain, key)
+        build_tags = _tag_builder(func, tags)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             if not settings.enable_caching:
                 return func(*args, **kwargs)
-            
-            # Simple key generation based on args
-            key_input = {"args": args[1:], "kwargs": kwargs} # Skip self/cls if present
-            key = CacheManager.generate_key(domain, func.__name__, key_input)
-            
-            cached_val = CacheManager.get(key)
+
+            try:
+                cache_key = build_key(*args, **kwargs)
+                entry_tags = build_tags(*args, **kwargs)
+            except TypeError as e:
+                logger.warning(f"Cache bypassed for {domain}:{func.__name__}: {e}")
+                return func(*args, **kwargs)
+
+            def compute():
+                with cache_tags(*entry_tags):
+                    result = func(*args, **kwargs)
+                    stored = _Fresh(result, time.time() + stale_after) if stale_after else result
+                    CacheManager.set(
+                        cache_key, stored, expire=expire,
+                        tags=[CacheManager.tag("domain", domain), *current_cache_tags()]
+                    )
+                return result
+
+            cached_val = CacheManager.get(cache_key)
             if cached_val is not None:
-                logger.info(f"Cache HIT for {domain}:{func.__name__}")
-                return cached_val
+                if isinstance(cached_val, _Fresh) and not cached_val.is_fresh():
+                    logger.info(f"Cache STALE for {domain}:{func.__name__}; refreshing in background")
+                    _schedule_refresh(cache_key, compute)
+                else:
+                    logger.info(f"Cache HIT for {domain}:{func.__name__}")
+                return _unwrap(cached_val)
             
             logger.info(f"Cache MISS for {domain}:{func.__name__}")
-            result = func(*args, **kwargs)
-            CacheManager.set(key, result, expire=expire)
-            return result
+
+            # Concurrent identical calls share one upstream call
+            return SingleFlight.do(cache_key, compute, recheck=lambda: _unwrap(CacheManager.get(cache_key)))
         return wrapper
     return decorator
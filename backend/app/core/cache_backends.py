@@ -0,0 +1,185 @@
+"""
+Storage backends behind ``CacheManager``'s shared tier.
+
+The backend interface is the subset of the ``diskcache.Cache`` API the app
+uses, so a ``diskcache.Cache`` is the local backend as-is. ``RedisCacheBackend``
+speaks the Redis protocol (Redis, Valkey, KeyDB, ...) so several app nodes
+share one cache; it keeps a client-side connection pool and zlib-compresses
+large values.
+
+Select with ``settings.cache_backend`` (``disk`` or ``redis``).
+"""
+import abc
+import logging
+import pickle
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import diskcache
+
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only needed for CACHE_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Value headers; counters written by INCR are stored as bare ASCII digits
+_PICKLED = b"\x00"
+_COMPRESSED = b"\x01"
+
+
+class CacheBackend(abc.ABC):
+    """Shared-tier storage used by ``CacheManager``."""
+
+    @abc.abstractmethod
+    def get(self, key: str, default: Any = None, expire_time: bool = False) -> Any:
+        """Value for ``key`` (or ``default``); with ``expire_time`` a ``(value, expires_at)`` pair."""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Any, expire: Optional[float] = None) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def incr(self, key: str, delta: int = 1, default: int = 0) -> int:
+        """Atomically add ``delta`` to an integer counter and return the new value."""
+
+    @abc.abstractmethod
+    def transact(self):
+        """
+        Context manager that serializes read-modify-write sequences across
+        workers. Use ``CacheManager.transact(key)``: backends that can lock a
+        single key (Redis) do, ``diskcache`` serializes all writes.
+        """
+
+    @abc.abstractmethod
+    def close(self):
+        ...
+
+
+CacheBackend.register(diskcache.Cache)
+
+
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, url: str, prefix: str = "", max_connections: int = 50, compress_min_bytes: int = 1024):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.prefix = prefix
+        self.compress_min_bytes = compress_min_bytes
+        self._pool = redis.ConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            socket_timeout=settings.cache_redis_timeout,
+            socket_connect_timeout=settings.cache_redis_timeout,
+        )
+        self._client = redis.Redis(connection_pool=self._pool)
+
+    @classmethod
+    def from_client(cls, client, prefix: str = "", compress_min_bytes: int = 1024) -> "RedisCacheBackend":
+        """Wrap an existing client (e.g. ``fakeredis.FakeRedis``)."""
+        backend = cls.__new__(cls)
+        backend.prefix = prefix
+        backend.compress_min_bytes = compress_min_bytes
+        backend._pool = client.connection_pool
+        backend._client = client
+        return backend
+
+    def _encode(self, value: Any) -> bytes:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self.compress_min_bytes:
+            compressed = zlib.compress(data, 6)
+            if len(compressed) < len(data):
+                return _COMPRESSED + compressed
+        return _PICKLED + data
+
+    @staticmethod
+    def _decode(data: bytes) -> Any:
+        header, body = data[:1], data[1:]
+        if header == _COMPRESSED:
+            return pickle.loads(zlib.decompress(body))
+        if header == _PICKLED:
+            return pickle.loads(body)
+        return int(data)  # counter
+
+    def get(self, key: str, default: Any = None, expire_time: bool = False) -> Any:
+        try:
+            if expire_time:
+                pipe = self._client.pipeline(transaction=False)
+                pipe.get(self.prefix + key)
+                pipe.pttl(self.prefix + key)
+                data, ttl_ms = pipe.execute()
+            else:
+                data, ttl_ms = self._client.get(self.prefix + key), -1
+        except redis.RedisError as e:
+            logger.warning(f"Cache backend read failed for {key}: {e}")
+            data, ttl_ms = None, -1
+        value = default if data is None else self._decode(data)
+        if not expire_time:
+            return value
+        expires_at = time.time() + ttl_ms / 1000 if data is not None and ttl_ms > 0 else None
+        return value, expires_at
+
+    def set(self, key: str, value: Any, expire: Optional[float] = None) -> bool:
+        try:
+            px = int(expire * 1000) if expire else None
+            return bool(self._client.set(self.prefix + key, self._encode(value), px=px))
+        except redis.RedisError as e:
+            logger.warning(f"Cache backend write failed for {key}: {e}")
+            return False
+
+    def delete(self, key: str) -> bool:
+        try:
+            return bool(self._client.delete(self.prefix + key))
+        except redis.RedisError as e:
+            logger.warning(f"Cache backend delete failed for {key}: {e}")
+            return False
+
+    def incr(self, key: str, delta: int = 1, default: int = 0) -> int:
+        # Counters back invalidation (tag generations, corpus versions): errors propagate
+        if default:
+            self._client.set(self.prefix + key, default, nx=True)
+        return self._client.incrby(self.prefix + key, delta)
+
+    @contextmanager
+    def transact(self, key: Optional[str] = None) -> Iterator[None]:
+        # Scoped to the key being rewritten, so unrelated updates don't queue behind each other
+        lock_name = f"{self.prefix}lock:{key}" if key is not None else f"{self.prefix}transact"
+        lock = self._client.lock(lock_name, timeout=10, blocking_timeout=10)
+        try:
+            acquired = lock.acquire()
+        except redis.RedisError as e:
+            logger.warning(f"Cache backend lock failed for {lock_name}: {e}")
+            acquired = False
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except redis.RedisError:
+                    pass  # expired; the next holder already owns it
+
+    def close(self):
+        self._pool.disconnect()
+
+
+def create_cache_backend() -> CacheBackend:
+    if settings.cache_backend == "redis":
+        logger.info("Using Redis cache backend")
+        return RedisCacheBackend(
+            settings.cache_redis_url,
+            prefix=settings.cache_redis_prefix,
+            max_connections=settings.cache_redis_max_connections,
+            compress_min_bytes=settings.cache_compress_min_bytes,
+        )
+    if settings.cache_backend != "disk":
+        raise ValueError(f"Unknown CACHE_BACKEND {settings.cache_backend!r} (expected 'disk' or 'redis')")
+    return diskcache.Cache(settings.cache_dir)
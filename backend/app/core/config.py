@@ -10,6 +10,11 @@ class AISettings(BaseModel):
     model_name: str = Field(default=os.getenv("AI_MODEL_NAME", "google/gemini-2.0-flash-exp:free"))
     kill_switch: bool = Field(default=os.getenv("AI_KILL_SWITCH", "false").lower() == "true")
     temperature: float = 0.7
+    http_timeout: float = float(os.getenv("AI_HTTP_TIMEOUT", "30"))  # read timeout per model call
+    http_connect_timeout: float = float(os.getenv("AI_HTTP_CONNECT_TIMEOUT", "10"))
+    http_max_connections: int = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "200"))
+    http_max_keepalive: int = int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "50"))
+    http_per_host_limit: int = int(os.getenv("AI_HTTP_PER_HOST_LIMIT", "100"))  # concurrent requests per provider
 
 class Config(BaseModel):
     app_name: str = "HR AI Platform"
@@ -26,6 +31,27 @@ class Config(BaseModel):
     # AI Components
     ai: AISettings = AISettings()
     ai_fallback_model: str = os.getenv("AI_FALLBACK_MODEL", "google/gemini-2.0-flash-lite-preview-02-05:free")
+    ai_hedging_enabled: bool = os.getenv("AI_HEDGING", "true").lower() == "true"  # race the fallback when the primary is slow
+    ai_hedge_quantile: float = float(os.getenv("AI_HEDGE_QUANTILE", "0.95"))  # hedge after the primary's rolling p95
+    ai_hedge_min_samples: int = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+    ai_hedge_default_delay: float = float(os.getenv("AI_HEDGE_DEFAULT_DELAY", "8"))  # seconds, until enough samples exist
+    ai_latency_window: int = int(os.getenv("AI_LATENCY_WINDOW", "200"))  # recent calls kept per model
+    ai_circuit_error_rate: float = float(os.getenv("AI_CIRCUIT_ERROR_RATE", "0.5"))  # open a model's circuit at this error rate
+    ai_circuit_min_calls: int = int(os.getenv("AI_CIRCUIT_MIN_CALLS", "10"))
+    ai_circuit_window: int = int(os.getenv("AI_CIRCUIT_WINDOW", "20"))
+    ai_circuit_cooldown: float = float(os.getenv("AI_CIRCUIT_COOLDOWN", "30"))  # seconds before a trial call
+    ai_governor_enabled: bool = os.getenv("AI_GOVERNOR", "true").lower() == "true"  # rate budgets in front of all model calls
+    ai_rpm_limit: int = int(os.getenv("AI_RPM_LIMIT", "120"))  # global requests/minute (0 = unlimited)
+    ai_tpm_limit: int = int(os.getenv("AI_TPM_LIMIT", "200000"))  # global tokens/minute (0 = unlimited)
+    ai_org_rpm_limit: int = int(os.getenv("AI_ORG_RPM_LIMIT", "60"))  # per organization (0 = unlimited)
+    ai_org_tpm_limit: int = int(os.getenv("AI_ORG_TPM_LIMIT", "100000"))
+    ai_expected_completion_tokens: int = int(os.getenv("AI_EXPECTED_COMPLETION_TOKENS", "500"))  # budgeted before usage is known
+    ai_governor_max_wait: float = float(os.getenv("AI_GOVERNOR_MAX_WAIT", "120"))  # seconds a call may queue
+    ai_rate_limit_default_pause: float = float(os.getenv("AI_RATE_LIMIT_PAUSE", "5"))  # after a 429 without Retry-After
+    ai_batching_enabled: bool = os.getenv("AI_BATCHING", "true").lower() == "true"  # micro-batch small classification prompts
+    ai_batch_max_items: int = int(os.getenv("AI_BATCH_MAX_ITEMS", "20"))
+    ai_batch_max_wait_ms: float = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "25"))  # how long a call waits for batch mates
+    ai_batch_max_chars: int = int(os.getenv("AI_BATCH_MAX_CHARS", "16000"))  # item text per batched prompt
     
     # Enterprise Architecture
     # Enterprise Architecture
@@ -37,9 +63,52 @@ class Config(BaseModel):
     # Scalability & Performance
     enable_caching: bool = os.getenv("ENABLE_CACHING", "true").lower() == "true"
     cache_dir: str = ".cache"
+    cache_backend: str = os.getenv("CACHE_BACKEND", "disk")  # disk | redis (shared across nodes; needs the redis package)
+    cache_redis_url: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    cache_redis_prefix: str = os.getenv("CACHE_REDIS_PREFIX", "hrms:")
+    cache_redis_max_connections: int = int(os.getenv("CACHE_REDIS_MAX_CONNECTIONS", "50"))  # client-side pool per process
+    cache_redis_timeout: float = float(os.getenv("CACHE_REDIS_TIMEOUT", "2"))
+    cache_compress_min_bytes: int = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))  # zlib values at least this large (redis)
+    cache_memory_max_bytes: int = int(os.getenv("CACHE_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))  # in-process tier; 0 disables it
+    cache_memory_max_items: int = int(os.getenv("CACHE_MEMORY_MAX_ITEMS", "10000"))
+    cache_tag_refresh_seconds: float = float(os.getenv("CACHE_TAG_REFRESH_SECONDS", "1.0"))  # how stale another worker's tag invalidation may be
+    cache_prewarm_concurrency: int = int(os.getenv("CACHE_PREWARM_CONCURRENCY", "4"))  # model calls in flight while prewarming
+    cache_refresh_workers: int = int(os.getenv("CACHE_REFRESH_WORKERS", "4"))  # background stale-while-revalidate refreshes
+    singleflight_enabled: bool = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"  # coalesce identical in-flight AI calls
+    singleflight_lock_timeout: float = float(os.getenv("SINGLEFLIGHT_LOCK_TIMEOUT", "60"))  # max wait for another worker's call
+    singleflight_cross_process: bool = os.getenv("SINGLEFLIGHT_CROSS_PROCESS", "true").lower() == "true"  # per-key file locks across workers
     rate_limit_per_minute: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
     encryption_key: str = os.getenv("ENCRYPTION_KEY", "oX_fC_g-l7-W_m_C_l-k7-W_m_C_l-k7-W_m_C_l-k7-W_==")
-    
+
+    # Document Search
+    embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "hash")  # hash | numpy (re-embed documents after switching)
+    embedding_model_path: str = os.getenv("EMBEDDING_MODEL_PATH", os.path.join("models", "embedding.npz"))
+    embedding_workers: int = int(os.getenv("EMBEDDING_WORKERS", "2"))
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    embedding_storage: str = os.getenv("EMBEDDING_STORAGE", "float32")  # float32 | float16 | int8 | pickle (legacy)
+    vector_index_ivf_threshold: int = int(os.getenv("VECTOR_INDEX_IVF_THRESHOLD", "50000"))  # 0 disables IVF partitioning
+    vector_index_ivf_lists: int = int(os.getenv("VECTOR_INDEX_IVF_LISTS", "256"))
+    vector_index_ivf_probes: int = int(os.getenv("VECTOR_INDEX_IVF_PROBES", "16"))
+    vector_segments_enabled: bool = os.getenv("VECTOR_SEGMENTS", "false").lower() == "true"  # mmap-shared embeddings
+    vector_segments_dir: str = os.getenv("VECTOR_SEGMENTS_DIR", os.path.join(".cache", "embeddings"))
+
+    rag_cache_ttl: int = int(os.getenv("RAG_CACHE_TTL", "3600"))
+    rag_cache_similarity_threshold: float = float(os.getenv("RAG_CACHE_SIMILARITY", "0.97"))  # > 1 disables near-duplicate hits
+    rag_cache_max_recent: int = int(os.getenv("RAG_CACHE_MAX_RECENT", "200"))  # questions kept per org for near-duplicate matching
+    rag_context_token_budget: int = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))  # prompt tokens for retrieved context
+    rag_mmr_lambda: float = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))  # 1.0 = pure relevance order
+    rag_dedup_threshold: float = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.8"))  # share of a passage already in a better one to drop it
+
+    # Document Ingestion
+    chunk_size: int = int(os.getenv("CHUNK_SIZE", "800"))
+    chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    chunk_unit: str = os.getenv("CHUNK_UNIT", "chars")  # chars | tokens (whitespace-delimited)
+    pdf_extraction_workers: int = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 extracts in-process
+    pdf_pages_per_task: int = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+    pdf_page_timeout: float = float(os.getenv("PDF_PAGE_TIMEOUT", "30"))
+    chunk_insert_batch_size: int = int(os.getenv("CHUNK_INSERT_BATCH_SIZE", "1000"))
+    chunk_insert_copy: bool = os.getenv("CHUNK_INSERT_COPY", "true").lower() == "true"  # PostgreSQL COPY for chunk inserts
+
     # Feature Flags
     enable_burnout_analysis: bool = os.getenv("ENABLE_BURNOUT_AI", "true").lower() == "true"
     enable_onboarding_ai: bool = os.getenv("ENABLE_ONBOARDING_AI", "true").lower() == "true"
@@ -23,6 +23,15 @@ class AIError(AppException):
             details=details
         )
 
+class AICapacityError(AppException):
+    """Local rate budget exhausted; no upstream call was made."""
+    def __init__(self, message: str = "AI service is at capacity; please retry shortly."):
+        super().__init__(
+            message=message,
+            status_code=503,
+            error_code="AI_CAPACITY_EXCEEDED"
+        )
+
 class AIKillSwitchError(AppException):
     def __init__(self):
         super().__init__(
@@ -0,0 +1,151 @@
+"""
+Shared async HTTP client for outbound model calls.
+
+One ``httpx.AsyncClient`` per event loop keeps TLS connections alive across
+calls, and a per-host semaphore caps concurrent requests to a provider. Async
+code awaits ``HTTPClientManager.post``/``stream`` directly; synchronous callers
+go through ``run_sync``/``iterate_sync``, which run the coroutine on a single
+background event loop so a blocked worker thread no longer holds a
+connection of its own.
+"""
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class HTTPClientManager:
+    _clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+    _semaphores: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Semaphore] = {}
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def timeout(cls, read: Optional[float] = None) -> httpx.Timeout:
+        return httpx.Timeout(
+            read or settings.ai.http_timeout,
+            connect=settings.ai.http_connect_timeout,
+            pool=settings.ai.http_connect_timeout,
+        )
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """Pooled client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = cls._clients.get(loop)
+        if client is None or client.is_closed:
+            # Drop clients of loops that have gone away (e.g. asyncio.run in scripts)
+            for stale in [stale for stale in cls._clients if stale.is_closed()]:
+                del cls._clients[stale]
+            client = httpx.AsyncClient(
+                timeout=cls.timeout(),
+                limits=httpx.Limits(
+                    max_connections=settings.ai.http_max_connections,
+                    max_keepalive_connections=settings.ai.http_max_keepalive,
+                    keepalive_expiry=60,
+                ),
+            )
+            cls._clients[loop] = client
+        return client
+
+    @classmethod
+    def _host_semaphore(cls, url: str) -> asyncio.Semaphore:
+        key = (asyncio.get_running_loop(), urlsplit(url).netloc)
+        semaphore = cls._semaphores.get(key)
+        if semaphore is None:
+            semaphore = cls._semaphores[key] = asyncio.Semaphore(settings.ai.http_per_host_limit)
+        return semaphore
+
+    @classmethod
+    async def post(
+        cls,
+        url: str,
+        json: Any,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> httpx.Response:
+        async with cls._host_semaphore(url):
+            return await cls.get_client().post(url, json=json, headers=headers, timeout=cls.timeout(timeout))
+
+    @classmethod
+    @asynccontextmanager
+    async def stream(
+        cls,
+        url: str,
+        json: Any,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[httpx.Response]:
+        """Streaming POST; the host slot is held until the body has been consumed."""
+        async with cls._host_semaphore(url):
+            async with cls.get_client().stream(
+                "POST", url, json=json, headers=headers, timeout=cls.timeout(timeout)
+            ) as response:
+                yield response
+
+    # --- sync bridge ---------------------------------------------------------
+
+    @classmethod
+    def _background_loop(cls) -> asyncio.AbstractEventLoop:
+        with cls._lock:
+            if cls._loop is None or cls._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="http-client-loop", daemon=True)
+                thread.start()
+                cls._loop, cls._thread = loop, thread
+            return cls._loop
+
+    @classmethod
+    def run_sync(cls, coroutine: Awaitable[T]) -> T:
+        """Run ``coroutine`` on the background loop and wait for its result."""
+        loop = cls._background_loop()
+        if threading.current_thread() is cls._thread:
+            raise RuntimeError("run_sync called from the HTTP client loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    @classmethod
+    def iterate_sync(cls, iterator: AsyncIterator[T]) -> Iterator[T]:
+        """Consume an async iterator from synchronous code, one item at a time."""
+        try:
+            while True:
+                try:
+                    yield cls.run_sync(iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                cls.run_sync(aclose())
+
+    @classmethod
+    async def aclose(cls):
+        """Close the client bound to the running loop (application shutdown)."""
+        client = cls._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    @classmethod
+    def shutdown(cls):
+        """Close the background loop's client and stop the loop."""
+        with cls._lock:
+            loop, thread = cls._loop, cls._thread
+            cls._loop = cls._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(cls.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+        for key in [key for key in cls._semaphores if key[0] is loop]:
+            del cls._semaphores[key]
@@ -22,6 +22,61 @@ AI_FAILURE_COUNT = Counter(
     ["domain", "error_code", "organization_id"]
 )
 
+AI_CALL_LATENCY = Histogram(
+    "ai_call_duration_seconds",
+    "Model call latency through the AI gateway (including retries)",
+    ["domain", "model", "outcome"],
+    buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, float("inf"))
+)
+
+AI_CACHE_HITS = Counter(
+    "ai_cache_hits_total",
+    "Model calls served from the AI gateway response cache",
+    ["domain"]
+)
+
+AI_HEDGED_CALLS = Counter(
+    "ai_hedged_calls_total",
+    "Model calls answered after a hedged or fallback request was issued",
+    ["domain", "winner"]
+)
+
+AI_QUEUE_DEPTH = Gauge(
+    "ai_queue_depth",
+    "Model calls waiting for rate budget",
+    ["priority"]
+)
+
+AI_QUEUE_WAIT = Histogram(
+    "ai_queue_wait_seconds",
+    "Time model calls waited for rate budget",
+    ["priority"],
+    buckets=(0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, float("inf"))
+)
+
+AI_RATE_LIMITED = Counter(
+    "ai_rate_limited_total",
+    "Upstream 429 responses",
+    ["model"]
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups per tier",
+    ["tier", "result"]
+)
+
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Entries evicted to keep a cache tier within its bounds",
+    ["tier"]
+)
+
+CACHE_MEMORY_BYTES = Gauge(
+    "cache_memory_bytes",
+    "Pickled size of the values held in the in-process cache tier"
+)
+
 ACTIVE_TASKS = Gauge(
     "active_background_tasks",
     "Number of active background tasks",
@@ -47,6 +102,42 @@ class MetricsManager:
     def record_ai_failure(domain: str, error_code: str, org_id: str = "unknown"):
         AI_FAILURE_COUNT.labels(domain=domain, error_code=error_code, organization_id=org_id).inc()
 
+    @staticmethod
+    def record_ai_call(domain: str, model: str, outcome: str, duration: float):
+        AI_CALL_LATENCY.labels(domain=domain, model=model, outcome=outcome).observe(duration)
+
+    @staticmethod
+    def record_ai_hedge(domain: str, winner: str):
+        AI_HEDGED_CALLS.labels(domain=domain, winner=winner).inc()
+
+    @staticmethod
+    def set_ai_queue_depth(priority: str, depth: int):
+        AI_QUEUE_DEPTH.labels(priority=priority).set(depth)
+
+    @staticmethod
+    def record_ai_queue_wait(priority: str, duration: float):
+        AI_QUEUE_WAIT.labels(priority=priority).observe(duration)
+
+    @staticmethod
+    def record_ai_rate_limited(model: str):
+        AI_RATE_LIMITED.labels(model=model).inc()
+
+    @staticmethod
+    def record_ai_cache_hit(domain: str):
+        AI_CACHE_HITS.labels(domain=domain).inc()
+
+    @staticmethod
+    def record_cache_lookup(tier: str, result: str):
+        CACHE_LOOKUPS.labels(tier=tier, result=result).inc()
+
+    @staticmethod
+    def record_cache_eviction(tier: str, count: int = 1):
+        CACHE_EVICTIONS.labels(tier=tier).inc(count)
+
+    @staticmethod
+    def set_cache_memory_bytes(size: int):
+        CACHE_MEMORY_BYTES.set(size)
+
     @staticmethod
     def set_active_tasks(task_type: str, count: int):
         ACTIVE_TASKS.labels(task_type=task_type).set(count)
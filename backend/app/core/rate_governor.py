@@ -0,0 +1,228 @@
+"""
+Rate governor for upstream model quota.
+
+Every model call acquires a slot from ``RateGovernor`` before it is sent.
+Token buckets enforce requests-per-minute and tokens-per-minute budgets,
+globally and per organization (a limit of 0 disables that bucket). Callers
+that do not fit wait in a queue where interactive work goes ahead of
+background work. A 429 with ``Retry-After`` pauses all calls until the
+provider is ready again, so retries stop making the storm worse.
+
+Priority and organization come from context variables. Sync callers keep
+them when their coroutine is scheduled on the HTTP client loop, because
+``run_coroutine_threadsafe`` copies the caller's context. Requests get them
+from the ``get_current_org`` dependency; background tasks set them with
+``ai_call_context``.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import AICapacityError
+from app.core.metrics import MetricsManager
+
+logger = logging.getLogger(__name__)
+
+
+class AIPriority:
+    INTERACTIVE = 0
+    BACKGROUND = 10
+
+PRIORITY_LABELS = {AIPriority.INTERACTIVE: "interactive", AIPriority.BACKGROUND: "background"}
+
+ai_priority_var: ContextVar[int] = ContextVar("ai_priority", default=AIPriority.INTERACTIVE)
+ai_organization_var: ContextVar[Optional[int]] = ContextVar("ai_organization", default=None)
+
+
+@contextmanager
+def ai_call_context(priority: Optional[int] = None, organization_id: Optional[int] = None):
+    """Tag model calls made inside the block with a priority and organization."""
+    tokens = []
+    if priority is not None:
+        tokens.append((ai_priority_var, ai_priority_var.set(priority)))
+    if organization_id is not None:
+        tokens.append((ai_organization_var, ai_organization_var.set(organization_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt tokens (~4 characters each) plus the expected completion."""
+    prompt = sum(len(message.get("content") or "") for message in messages) // 4
+    return prompt + settings.ai_expected_completion_tokens
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a ``Retry-After`` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding up to one minute of budget."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A single request larger than the whole budget waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Charge (or refund, if negative) the difference between estimated and actual usage."""
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateGovernor:
+    _buckets: Dict[Tuple[str, Optional[int]], TokenBucket] = {}
+    _waiting: Dict[int, int] = {}  # priority -> queued callers
+    _paused_until = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _bucket(cls, kind: str, organization_id: Optional[int]) -> Optional[TokenBucket]:
+        if organization_id is None:
+            limit = settings.ai_rpm_limit if kind == "rpm" else settings.ai_tpm_limit
+        else:
+            limit = settings.ai_org_rpm_limit if kind == "rpm" else settings.ai_org_tpm_limit
+        if limit <= 0:
+            return None
+        key = (kind, organization_id)
+        bucket = cls._buckets.get(key)
+        if bucket is None:
+            bucket = cls._buckets[key] = TokenBucket(limit)
+        return bucket
+
+    @classmethod
+    def _demands(cls, tokens: int, organization_id: Optional[int]) -> List[Tuple[TokenBucket, int]]:
+        demands = []
+        for org in (None, organization_id) if organization_id is not None else (None,):
+            for kind, amount in (("rpm", 1), ("tpm", tokens)):
+                bucket = cls._bucket(kind, org)
+                if bucket is not None:
+                    demands.append((bucket, amount))
+        return demands
+
+    @classmethod
+    async def acquire(cls, tokens: int, organization_id: Optional[int] = None, priority: Optional[int] = None):
+        """Wait until the call fits every budget (higher-priority waiters go first)."""
+        if not settings.ai_governor_enabled:
+            return
+        priority = ai_priority_var.get() if priority is None else priority
+        organization_id = ai_organization_var.get() if organization_id is None else organization_id
+        label = PRIORITY_LABELS.get(priority, str(priority))
+        started = time.monotonic()
+        deadline = started + settings.ai_governor_max_wait
+
+        with cls._lock:
+            cls._waiting[priority] = cls._waiting.get(priority, 0) + 1
+            MetricsManager.set_ai_queue_depth(label, cls._waiting[priority])
+        try:
+            while True:
+                with cls._lock:
+                    now = time.monotonic()
+                    wait = cls._paused_until - now
+                    if wait <= 0 and any(p < priority and n for p, n in cls._waiting.items()):
+                        wait = 0.05  # interactive work is queued ahead of us
+                    if wait <= 0:
+                        demands = cls._demands(tokens, organization_id)
+                        wait = max((bucket.wait_time(amount, now) for bucket, amount in demands), default=0.0)
+                        if wait <= 0:
+                            for bucket, amount in demands:
+                                bucket.consume(amount)
+                            break
+                if time.monotonic() + wait > deadline:
+                    raise AICapacityError()
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            with cls._lock:
+                cls._waiting[priority] -= 1
+                MetricsManager.set_ai_queue_depth(label, cls._waiting[priority])
+        MetricsManager.record_ai_queue_wait(label, time.monotonic() - started)
+
+    @classmethod
+    def try_acquire(cls, tokens: int, organization_id: Optional[int] = None) -> bool:
+        """Take budget only if it is available right now (used for optional extra calls such as hedges)."""
+        if not settings.ai_governor_enabled:
+            return True
+        organization_id = ai_organization_var.get() if organization_id is None else organization_id
+        with cls._lock:
+            now = time.monotonic()
+            if cls._paused_until > now or any(cls._waiting.values()):
+                return False
+            demands = cls._demands(tokens, organization_id)
+            if any(bucket.wait_time(amount, now) > 0 for bucket, amount in demands):
+                return False
+            for bucket, amount in demands:
+                bucket.consume(amount)
+            return True
+
+    @classmethod
+    async def wait_if_paused(cls):
+        """Hold a retry until an upstream ``Retry-After`` pause has passed."""
+        if not settings.ai_governor_enabled:
+            return
+        while True:
+            with cls._lock:
+                wait = cls._paused_until - time.monotonic()
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 0.25))
+
+    @classmethod
+    def settle(cls, estimated_tokens: int, actual_tokens: Optional[int], organization_id: Optional[int] = None):
+        """Correct the tokens-per-minute buckets once the provider reports real usage."""
+        if not settings.ai_governor_enabled or not actual_tokens:
+            return
+        organization_id = ai_organization_var.get() if organization_id is None else organization_id
+        with cls._lock:
+            for org in (None, organization_id) if organization_id is not None else (None,):
+                bucket = cls._bucket("tpm", org)
+                if bucket is not None:
+                    bucket.adjust(actual_tokens - estimated_tokens)
+
+    @classmethod
+    def pause(cls, seconds: float):
+        """Hold every queued call until the provider's ``Retry-After`` has passed."""
+        seconds = min(seconds, settings.ai_governor_max_wait)
+        with cls._lock:
+            cls._paused_until = max(cls._paused_until, time.monotonic() + seconds)
+        logger.warning(f"Upstream rate limited; pausing model calls for {seconds:.1f}s")
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._buckets.clear()
+            cls._waiting.clear()
+            cls._paused_until = 0.0
@@ -0,0 +1,153 @@
+"""
+Single-flight coalescing for expensive cached calls.
+
+Concurrent callers with the same cache key share one upstream call instead of
+each paying for it. Within a process, followers wait for the leader's result
+(or exception). Across worker processes the leader also takes a file lock in
+``<cache_dir>/singleflight`` and re-checks the shared cache once it holds the
+lock, so a worker that lost the race reads the winner's result instead of
+calling upstream again.
+
+Each key gets its own lock file (named by a hash of the key), removed once
+the leader is done, so unrelated keys never wait on each other. A thread that
+already leads one single-flight call (e.g. ``cache_ai_response`` wrapping the
+gateway's own single-flight) does not take a second file lock.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: in-process coalescing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    _calls: Dict[str, _Call] = {}
+    _lock = threading.Lock()
+    _held = threading.local()  # file locks held by the current thread
+
+    @classmethod
+    def do(
+        cls,
+        key: str,
+        compute: Callable[[], Any],
+        recheck: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """
+        Run ``compute`` once for all concurrent callers of ``key``.
+
+        ``compute`` should store its result in the shared cache; ``recheck``
+        reads it back (returning None on a miss) and is used after waiting
+        for another worker's lock.
+        """
+        if not settings.singleflight_enabled:
+            return compute()
+
+        with cls._lock:
+            call = cls._calls.get(key)
+            leader = call is None
+            if leader:
+                call = cls._calls[key] = _Call()
+
+        if not leader:
+            logger.info(f"Single-flight: waiting for in-flight call {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = cls._run_leader(key, compute, recheck)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with cls._lock:
+                del cls._calls[key]
+            call.done.set()
+
+    @classmethod
+    def _run_leader(cls, key: str, compute: Callable[[], Any], recheck: Optional[Callable[[], Any]]) -> Any:
+        with cls._file_lock(key) as waited:
+            if waited and recheck is not None:
+                cached = recheck()
+                if cached is not None:
+                    logger.info(f"Single-flight: reused result from another worker for {key}")
+                    return cached
+            return compute()
+
+    @staticmethod
+    def lock_path(key: str) -> str:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return os.path.join(settings.cache_dir, "singleflight", f"{digest}.lock")
+
+    @classmethod
+    @contextmanager
+    def _file_lock(cls, key: str):
+        """Cross-process lock for ``key``; yields whether another holder had to be waited for."""
+        if fcntl is None or not settings.singleflight_cross_process or getattr(cls._held, "depth", 0):
+            yield False
+            return
+
+        path = cls.lock_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        waited = False
+        lock_file = None
+        deadline = time.monotonic() + settings.singleflight_lock_timeout
+        while lock_file is None:
+            candidate = open(path, "a")
+            try:
+                fcntl.flock(candidate, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                candidate.close()
+                waited = True
+                if time.monotonic() >= deadline:
+                    # Do not let a stuck worker block everyone; call upstream unlocked
+                    logger.warning(f"Single-flight: lock wait timed out for {key}")
+                    break
+                time.sleep(0.05)
+                continue
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(candidate.fileno()).st_ino:
+                # The previous holder removed this file after we opened it; lock the new one
+                candidate.close()
+                continue
+            lock_file = candidate
+
+        cls._held.depth = getattr(cls._held, "depth", 0) + 1
+        try:
+            yield waited
+        finally:
+            cls._held.depth -= 1
+            if lock_file is not None:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
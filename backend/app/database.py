@@ -44,7 +44,7 @@ def init_db():
         performance_metric, performance_review, 
         wellbeing_assessment, burnout_assessment,
         onboarding_employee, onboarding_task, onboarding_chat, onboarding_document,
-        document, document_chunk, activity,
+        document, document_chunk, chunk_term, activity,
         audit_log, ticket, organization, governance
     )
     # Perform schema emission
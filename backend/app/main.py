@@ -33,6 +33,8 @@ from app.core.schemas import ApiResponse
 from app.core.logging import setup_logging
 from app.core.metrics import get_metrics_response
 from app.core.limiter import limiter
+from app.core.cache import CacheManager
+from app.core.http_client import HTTPClientManager
 from app.core.middleware import (
     CorrelationIdMiddleware,
     LoggingMiddleware,
@@ -79,6 +81,9 @@ async def lifespan(app: FastAPI):
     
     # === SHUTDOWN ===
     logger.info("Gracefully shutting down...")
+    await HTTPClientManager.aclose()
+    HTTPClientManager.shutdown()
+    CacheManager.close()
 
 
 # ============================================================================
@@ -9,7 +9,7 @@ from . import (
     wellbeing_assessment, burnout_assessment,
     onboarding_employee, onboarding_task, onboarding_chat, onboarding_document,
     onboarding_template, onboarding_reminder,
-    document, document_chunk, activity,
+    document, document_chunk, chunk_term, activity,
     audit_log, ticket, organization, governance, task
 )
 
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from app.database import Base
+
+class ChunkTerm(Base):
+    """Inverted-index posting: one row per (chunk, term) with its term frequency."""
+    __tablename__ = "chunk_terms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
+    chunk_id = Column(Integer, ForeignKey("document_chunks.id"), index=True)
+    term = Column(String, nullable=False)
+    term_frequency = Column(Integer, nullable=False, default=1)
+    chunk_length = Column(Integer, nullable=False, default=0)  # Total tokens in the chunk (BM25 length norm)
+
+    __table_args__ = (
+        Index("ix_chunk_terms_org_term", "organization_id", "term"),
+    )
@@ -1,6 +1,12 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
 from sqlalchemy.sql import func
 from app.database import Base
+import enum
+
+class DocumentStatus(str, enum.Enum):
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
 
 class Document(Base):
     __tablename__ = "documents"
@@ -13,4 +19,8 @@ class Document(Base):
     uploaded_by = Column(String, nullable=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"), index=True)
     version = Column(String, nullable=True, default="1.0")  # Document version for citations
-
+    
+    # Ingestion state (see document_ai.ingest_document)
+    status = Column(String, default=DocumentStatus.READY, server_default=DocumentStatus.READY.value, index=True)
+    progress = Column(Integer, default=100, server_default="100")  # Percent complete
+    error = Column(Text, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, PickleType
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, PickleType, LargeBinary
 from app.database import Base
 
 class DocumentChunk(Base):
@@ -8,4 +8,7 @@ class DocumentChunk(Base):
     document_id = Column(Integer, ForeignKey("documents.id"), index=True)
     chunk_text = Column(Text)
     chunk_index = Column(Integer)
-    embedding_vector = Column(PickleType, nullable=True)  # Store as pickle for SQLite, or use pgvector for PostgreSQL
+    page_start = Column(Integer, nullable=True)  # 1-based pages the chunk spans, for citations
+    page_end = Column(Integer, nullable=True)
+    embedding_vector = Column(PickleType, nullable=True)  # Legacy pickled list (EMBEDDING_STORAGE=pickle)
+    embedding_blob = Column(LargeBinary, nullable=True)  # Packed float32/float16/int8 vector, see embedding_codec
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, PickleType
+from sqlalchemy import Column, Integer, String, DateTime, PickleType, LargeBinary
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -7,5 +7,6 @@ class EmbeddingCache(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     text_hash = Column(String, unique=True, index=True)
-    embedding_vector = Column(PickleType)
+    embedding_vector = Column(PickleType, nullable=True)  # Legacy pickled list
+    embedding_blob = Column(LargeBinary, nullable=True)  # Packed vector, see embedding_codec
     created_at = Column(DateTime(timezone=True), server_default=func.now())
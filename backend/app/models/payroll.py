@@ -25,7 +25,10 @@ class Payroll(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True) # Ensure multi-tenancy
 
-    components = relationship("SalaryComponent", back_populates="payroll", cascade="all, delete-orphan")
+    # Ordered so payslip prompts (and their cache keys) are identical however the components are loaded
+    components = relationship(
+        "SalaryComponent", back_populates="payroll", cascade="all, delete-orphan", order_by="SalaryComponent.id"
+    )
 
 class PayrollLock(Base):
     __tablename__ = "payroll_locks"
@@ -5,7 +5,8 @@ Provides role-based and department-level access control for FastAPI endpoints.
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from typing import List, Optional, Callable
+from typing import AsyncIterator, List, Optional, Callable
+from app.core.rate_governor import AIPriority, ai_call_context
 from app.database import get_db
 from app.models.user import User, UserRole
 from app.models.department import Department
@@ -173,10 +174,13 @@ def require_admin():
     return require_role([UserRole.SUPER_ADMIN, UserRole.HR_ADMIN])
 
 
-def get_current_org(token: str = Depends(oauth2_scheme)) -> int:
+async def get_current_org(token: str = Depends(oauth2_scheme)) -> AsyncIterator[int]:
     """
     Extracts and validates the organization ID from the JWT token.
     Fast context without a database hit.
+
+    Model calls made while handling the request are charged to this
+    organization's rate budget at interactive priority (see ``RateGovernor``).
     """
     payload = auth_service.decode_access_token(token)
     if payload is None:
@@ -192,7 +196,8 @@ def get_current_org(token: str = Depends(oauth2_scheme)) -> int:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No organization context in token"
         )
-    return int(org_id)
+    with ai_call_context(priority=AIPriority.INTERACTIVE, organization_id=int(org_id)):
+        yield int(org_id)
 
 
 # Alias for backward compatibility
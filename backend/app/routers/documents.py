@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, List, Optional
 from pydantic import BaseModel
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models.document import Document
 from app.models.document_chunk import DocumentChunk
 from app.models.organization import Organization
-from app.services.document_ai import process_uploaded_file, query_documents, delete_document
+from app.services.document_ai import process_uploaded_file, query_documents, stream_query_documents, delete_document
 from datetime import datetime
 import os
+import json
 import logging
 import time
 
@@ -17,6 +19,7 @@ logger = logging.getLogger(__name__)
 from app.routers.auth_deps import require_role, require_any_role, get_current_user, get_current_org
 from app.models.user import UserRole, User
 from app.services.audit import AuditService
+from app.services.task_service import TaskService
 from app.services.ai_trust_service import AITrustService
 from app.schemas.trust import TrustedAIResponse, TrustMetadata
 
@@ -30,6 +33,18 @@ class DocumentResponse(BaseModel):
     upload_date: datetime
     uploaded_by: Optional[str]
     organization_id: Optional[int]
+    status: Optional[str] = None
+    progress: Optional[int] = None
+    error: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class DocumentStatusResponse(BaseModel):
+    id: int
+    status: Optional[str]
+    progress: Optional[int]
+    error: Optional[str]
     
     class Config:
         from_attributes = True
@@ -48,6 +63,8 @@ class ChunkResponse(BaseModel):
     document_id: int
     chunk_text: str
     chunk_index: int
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -57,6 +74,7 @@ class ChunkResponse(BaseModel):
 
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     org_id: int = Depends(get_current_org),
@@ -64,6 +82,8 @@ async def upload_document(
 ):
     """
     Upload a company document (PDF, DOCX, TXT, CSV).
+    The file is stored and returned with status "processing"; extraction and
+    indexing run in the background (poll GET /documents/{id}/status).
     """
     upload_start = time.time()
     logger.info("=" * 60)
@@ -74,12 +94,15 @@ async def upload_document(
     logger.info("=" * 60)
     
     try:
-        # Process file for organization
+        # Store file for organization and queue ingestion
         document = await process_uploaded_file(file, org_id, current_user.email, db)
+        TaskService(background_tasks, db, organization_id=org_id).enqueue(
+            "document_ingestion", {"document_id": document.id}
+        )
         
         upload_time = time.time() - upload_start
         logger.info("=" * 60)
-        logger.info(f"UPLOAD SUCCESSFUL - Document ID: {document.id}")
+        logger.info(f"UPLOAD ACCEPTED - Document ID: {document.id}, ingestion queued")
         logger.info(f"Total upload time: {upload_time:.2f}s")
         logger.info("=" * 60)
         
@@ -175,6 +198,67 @@ def query_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying documents: {str(e)}")
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/query/stream")
+def query_document_stream(
+    request: DocumentQueryRequest,
+    org_id: int = Depends(get_current_org),
+    current_user: User = Depends(require_any_role)
+):
+    """
+    Streaming variant of /query (Server-Sent Events).
+    Emits `sources` once retrieval is done, `token` events as the answer is
+    generated, then `done` with the trust metadata and audit log id.
+    """
+    user_id, user_role = current_user.id, current_user.role
+
+    def events():
+        # The request-scoped session is closed before a streamed body is sent
+        db = SessionLocal()
+        try:
+            trust_service = AITrustService(db, organization_id=org_id, user_id=user_id, user_role=user_role)
+            for event, payload in stream_query_documents(
+                request.question, org_id, db, top_k=5, document_ids=request.document_ids
+            ):
+                if event != "done":
+                    yield _sse(event, payload)
+                    continue
+
+                trust_obj: TrustMetadata = payload.get("trust_metadata_obj")
+                if trust_obj is None:
+                    trust_obj = TrustMetadata(**payload["trust"])
+                response = trust_service.wrap_and_log(
+                    content=payload["answer"],
+                    action_type="query_document",
+                    entity_type="document",
+                    confidence_score=trust_obj.confidence_score,
+                    sources=trust_obj.sources,
+                    model_name=trust_obj.ai_model,
+                    reasoning=trust_obj.reasoning,
+                    is_fallback=trust_obj.is_fallback,
+                    fallback_reason=trust_obj.fallback_reason,
+                    details={"question": request.question, "streamed": True}
+                )
+                db.commit()
+                audit_log = trust_service.last_audit_log
+                yield _sse("done", {
+                    "trust": response.trust.model_dump(mode="json"),
+                    "audit_id": audit_log.id if audit_log is not None else None
+                })
+        except Exception as e:
+            logger.error(f"Streaming document query failed: {e}", exc_info=True)
+            yield _sse("error", {"detail": f"Error querying documents: {str(e)}"})
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("", response_model=List[DocumentResponse])
 def list_documents(
     db: Session = Depends(get_db),
@@ -216,6 +300,26 @@ def delete_document_endpoint(
     
     return {"message": "Document deleted successfully"}
 
+@router.get("/{document_id}/status", response_model=DocumentStatusResponse)
+def get_document_status(
+    document_id: int,
+    db: Session = Depends(get_db),
+    org_id: int = Depends(get_current_org),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get ingestion status and progress for a document.
+    """
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.organization_id == org_id
+    ).first()
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return document
+
 @router.get("/{document_id}/chunks", response_model=List[ChunkResponse])
 def get_document_chunks(
     document_id: int,
@@ -23,7 +23,7 @@ from app.schemas.interview_workflow import (
     InterviewDecisionRequest,
     ConsistencyAnalysis
 )
-from app.services.interview_service import InterviewService
+from app.services.interview_service import KIT_RESUME_PLACEHOLDER, InterviewService
 from app.services.audit import AuditService
 from app.services.ai_trust_service import AITrustService
 
@@ -180,8 +180,8 @@ def get_interview_kit(
 
     # Generate Kit using AI
     service = InterviewService(db, organization_id=org_id)
-    # Fetch resume text mock
-    resume_text = "Experienced Python Developer..." 
+    # Fetch resume text mock (shared with the cache prewarm job)
+    resume_text = KIT_RESUME_PLACEHOLDER
     
     job_title = interview.job.title if interview.job else "Role"
     kit_data = service.generate_interview_kit(job_title, resume_text)
@@ -6,7 +6,7 @@ from app.models.leave_request import LeaveRequest, LeaveStatus
 from app.schemas.leave import LeaveRequestCreate, LeaveRequestResponse
 from app.models.user import User, UserRole
 from app.routers.auth_deps import get_current_user, require_role, get_current_org
-from app.services.leave import detect_conflicts
+from app.services.leave import detect_conflicts, invalidate_employee_insights
 
 router = APIRouter(prefix="/leave", tags=["leave"])
 
@@ -32,6 +32,7 @@ def create_leave(
     db.add(leave)
     db.commit()
     db.refresh(leave)
+    invalidate_employee_insights(db, current_user.id)
     return leave
 
 @router.get("/requests/{employee_id}", response_model=List[LeaveRequestResponse])
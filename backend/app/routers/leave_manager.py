@@ -8,6 +8,7 @@ from app.models.user import User, UserRole
 from app.schemas.leave import LeaveApprovalRequest, CalendarLeave
 from app.routers.auth_deps import get_current_user, require_role, get_current_org
 from app.services.audit import AuditService
+from app.services.leave import invalidate_employee_insights
 from app.services.notification_service import NotificationService
     
 router = APIRouter(prefix="/leave", tags=["leave-manager"])
@@ -129,6 +130,7 @@ def approve_leave(
     
     db.commit()
     db.refresh(leave)
+    invalidate_employee_insights(db, leave.employee_id)
     return {
         "success": True, 
         "leave_status": leave.status, 
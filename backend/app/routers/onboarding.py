@@ -24,6 +24,7 @@ from app.services.onboarding_ai import (
     answer_onboarding_question,
     get_onboarding_tips,
     analyze_progress,
+    invalidate_onboarding_tips,
 )
 
 logger = logging.getLogger(__name__)
@@ -216,6 +217,7 @@ def update_employee(
     
     db.commit()
     db.refresh(employee)
+    invalidate_onboarding_tips(employee.id)
     
     # Audit Log
     AuditService.log(
@@ -251,6 +253,7 @@ def delete_employee(
     db.query(OnboardingChat).filter(OnboardingChat.employee_id == employee_id).delete()
     db.delete(employee)
     db.commit()
+    invalidate_onboarding_tips(employee_id)
     return {"message": "Employee deleted successfully"}
 
 
@@ -278,6 +281,7 @@ def generate_checklist(
 
     # Update progress
     analyze_progress(employee_id, db)
+    invalidate_onboarding_tips(employee_id)
 
     # Audit logging via AITrustService
     trust_service = AITrustService(db, org_id, current_user.id, current_user.role)
@@ -352,6 +356,7 @@ def create_custom_task(
     db.commit()
     db.refresh(task)
     analyze_progress(employee_id, db)
+    invalidate_onboarding_tips(employee_id)
     return task
 
 
@@ -375,6 +380,7 @@ def complete_task(
         db.commit()
         db.refresh(task)
         analyze_progress(task.employee_id, db)
+        invalidate_onboarding_tips(task.employee_id)
         
         # Audit logging
         AuditService.log(
@@ -405,6 +411,7 @@ def delete_task(
     db.delete(task)
     db.commit()
     analyze_progress(employee_id, db)
+    invalidate_onboarding_tips(employee_id)
     return {"message": "Task deleted successfully"}
 
 
@@ -516,7 +523,8 @@ def chat_feedback(
 def tips(
     employee_id: int, 
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    org_id: int = Depends(get_current_org)
 ):
     employee = db.query(OnboardingEmployee).filter(OnboardingEmployee.id == employee_id).first()
     if not employee:
@@ -709,6 +717,7 @@ def apply_template(
         
     employee.status = OnboardingStatus.in_progress
     db.commit()
+    invalidate_onboarding_tips(employee_id)
     
     AuditService.log(
         db,
@@ -832,6 +841,8 @@ def apply_template_bulk(
             results["failed"].append({"id": emp_id, "error": str(e)})
 
     db.commit()
+    for applied in results["success"]:
+        invalidate_onboarding_tips(applied["id"])
     
     # Audit Log
     AuditService.log(
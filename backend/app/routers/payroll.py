@@ -5,7 +5,7 @@ Handles HTTP endpoints for payroll operations.
 All business logic is delegated to the payroll service layer.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Body
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -15,6 +15,7 @@ from app.routers.auth_deps import require_role, get_current_user, get_current_or
 from app.services.audit import AuditService
 from app.services import payroll_service
 from app.services.ai_trust_service import AITrustService
+from app.services.task_service import TaskService
 from pydantic import BaseModel
 
 
@@ -136,8 +137,10 @@ def calculate_payroll(
 def calculate_bulk_payroll(
     month: int, 
     year: int, 
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    org_id: int = Depends(get_current_org)
 ):
     """
     Run payroll for all employees in the current user's organization.
@@ -153,10 +156,18 @@ def calculate_bulk_payroll(
             detail=f"Payroll for {month}/{year} is locked."
         )
 
-    return payroll_service.calculate_bulk_payroll(
+    result = payroll_service.calculate_bulk_payroll(
         db, month, year, org_id
     )
 
+    # Employees open their payslips right after a run: explain them ahead of demand
+    if result["processed"]:
+        TaskService(background_tasks, db, organization_id=org_id).enqueue(
+            "cache_prewarm",
+            {"targets": ["payroll"], "organization_id": org_id, "month": month, "year": year}
+        )
+    return result
+
 
 @router.get("/history/{employee_id}")
 def get_payroll_history(
@@ -191,7 +202,8 @@ def get_payroll_details(
 def ask_payroll_question(
     question: str = Body(..., embed=True),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    org_id: int = Depends(get_current_org)
 ):
     """
     Ask AI questions about payroll policy/history.
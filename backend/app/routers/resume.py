@@ -39,7 +39,9 @@ def submit_resume(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    anonymized_text = anonymize_resume(resume.resume_text, blind_screening=resume.blind_screening)
+    anonymized_text = anonymize_resume(
+        resume.resume_text, blind_screening=resume.blind_screening, organization_id=org_id
+    )
     
     db_resume = Resume(
         job_id=job_id,
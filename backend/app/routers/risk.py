@@ -67,7 +67,7 @@ def check_text_toxicity(
     Check if text contains toxic language.
     """
     try:
-        result = analyze_friction_indicators(request.text)
+        result = analyze_friction_indicators(request.text, org_id)
         
         trust_service = AITrustService(db, org_id, current_user.id, current_user.role)
         return trust_service.wrap_and_log(
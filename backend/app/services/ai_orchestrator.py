@@ -1,14 +1,26 @@
+import asyncio
+import contextvars
 import json
 import re
-import requests
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import Future
+import httpx
+from pydantic import BaseModel
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
+from app.core.cache import CacheManager, current_cache_tags, is_refreshing
 from app.core.config import settings
-from app.core.exceptions import AIError, AIKillSwitchError
+from app.core.http_client import HTTPClientManager
+from app.core.singleflight import SingleFlight
+from app.core.rate_governor import RateGovernor, ai_call_context, estimate_message_tokens, parse_retry_after
+from app.core.metrics import MetricsManager
+from app.core.exceptions import AICapacityError, AIError, AIKillSwitchError
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from app.core.logging import request_id_var
 from app.services.audit import AuditService
+from app.services.model_health import CircuitBreaker, LatencyTracker
 
 logger = logging.getLogger(__name__)
 
@@ -18,42 +30,86 @@ class AIDomain:
     WELLBEING = "wellbeing"
     AUDIT = "audit"
     DOCUMENTS = "documents"
+    PAYROLL = "payroll"
+    LEAVE = "leave"
+    HELPDESK = "helpdesk"
+    ONBOARDING = "onboarding"
     GENERAL = "general"
 
+class DomainPolicy(BaseModel):
+    """Per-domain gateway budget."""
+    cache_ttl: int = 0  # seconds to reuse an identical prompt's response; 0 disables
+    timeout: Optional[float] = None  # read timeout per attempt; None uses settings.ai.http_timeout
+    max_concurrency: int = 16  # model calls in flight for the domain
+
+# Single place to tune AI throughput. Interview, resume and document services
+# cache their own results (cache_ai_response / RAG answer cache), so the gateway
+# does not cache those domains again.
+DOMAIN_POLICIES: Dict[str, DomainPolicy] = {
+    AIDomain.INTERVIEW: DomainPolicy(timeout=45, max_concurrency=16),
+    AIDomain.RESUME: DomainPolicy(timeout=60, max_concurrency=8),
+    AIDomain.WELLBEING: DomainPolicy(cache_ttl=3600, max_concurrency=8),
+    AIDomain.AUDIT: DomainPolicy(max_concurrency=4),
+    AIDomain.DOCUMENTS: DomainPolicy(timeout=45, max_concurrency=32),
+    AIDomain.PAYROLL: DomainPolicy(cache_ttl=24 * 3600, max_concurrency=8),
+    AIDomain.LEAVE: DomainPolicy(cache_ttl=3600, timeout=20, max_concurrency=16),
+    AIDomain.HELPDESK: DomainPolicy(cache_ttl=3600, max_concurrency=16),
+    AIDomain.ONBOARDING: DomainPolicy(cache_ttl=3600, max_concurrency=16),
+    AIDomain.GENERAL: DomainPolicy(),
+}
+
+def get_domain_policy(domain: str) -> DomainPolicy:
+    return DOMAIN_POLICIES.get(domain) or DOMAIN_POLICIES[AIDomain.GENERAL]
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+
+def _openrouter_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {settings.ai.openrouter_api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "http://localhost:3000", # Required by OpenRouter
+    }
+
+
 class AIOrchestrator:
     @staticmethod
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type((requests.exceptions.RequestException, AIError)),
+        retry=retry_if_exception_type((httpx.HTTPError, AIError)),
         reraise=True
     )
-    def _do_call(
+    async def _ado_call(
         messages: List[Dict[str, str]], 
         model_name: str,
         temperature: float = 0.7,
-        json_output: bool = True
+        json_output: bool = True,
+        domain: str = AIDomain.GENERAL
     ) -> str:
-        """Internal method to perform the actual API call with retries."""
+        """Internal method to perform the actual API call with retries (pooled async client)."""
         logger.info(f"Calling AI Model: {model_name}")
         
+        # Rate budget was taken before the first attempt; a retry still waits out a 429's Retry-After
+        estimated_tokens = estimate_message_tokens(messages)
+        await RateGovernor.wait_if_paused()
         try:
-            response = requests.post(
-                url="https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.ai.openrouter_api_key}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "http://localhost:3000", # Required by OpenRouter
-                },
-                data=json.dumps({
-                    "model": model_name,
-                    "messages": messages,
-                    "temperature": temperature
-                }),
-                timeout=30
-            )
+            # The domain slot is held per attempt, not across retry backoff
+            async with AIOrchestrator._domain_slot(domain):
+                response = await HTTPClientManager.post(
+                    OPENROUTER_URL,
+                    json={
+                        "model": model_name,
+                        "messages": messages,
+                        "temperature": temperature
+                    },
+                    headers=_openrouter_headers(),
+                    timeout=get_domain_policy(domain).timeout
+                )
             response.raise_for_status()
-            content = response.json()["choices"][0]["message"]["content"]
+            data = response.json()
+            RateGovernor.settle(estimated_tokens, (data.get("usage") or {}).get("total_tokens"))
+            content = data["choices"][0]["message"]["content"]
             
             if json_output:
                 # Basic JSON extraction if model returns text around it
@@ -63,16 +119,178 @@ class AIOrchestrator:
             
             return content
 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error("AI service timeout.")
             raise AIError("AI service reached timeout limit.")
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             logger.error(f"AI service HTTP error: {e}")
+            if e.response.status_code == 429:
+                AIOrchestrator._rate_limited(model_name, e.response)
             raise AIError(f"AI service returned error: {e.response.status_code}")
         except Exception as e:
             logger.exception("Unexpected error during AI call.")
             raise AIError(f"AI service error: {str(e)}")
 
+    @staticmethod
+    def _rate_limited(model_name: str, response: httpx.Response):
+        """Upstream 429: hold all queued calls for Retry-After instead of retrying into the limit."""
+        MetricsManager.record_ai_rate_limited(model_name)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        RateGovernor.pause(retry_after if retry_after is not None else settings.ai_rate_limit_default_pause)
+
+    _domain_semaphores: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Semaphore] = {}
+
+    @classmethod
+    def _domain_slot(cls, domain: str) -> asyncio.Semaphore:
+        key = (asyncio.get_running_loop(), domain)
+        semaphore = cls._domain_semaphores.get(key)
+        if semaphore is None:
+            semaphore = cls._domain_semaphores[key] = asyncio.Semaphore(get_domain_policy(domain).max_concurrency)
+        return semaphore
+
+    @classmethod
+    async def _attempt(
+        cls,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        temperature: float,
+        json_output: bool,
+        domain: str
+    ) -> Tuple[str, str]:
+        """One model's call (with its retries), feeding latency and circuit state."""
+        started = time.perf_counter()
+        try:
+            response = await cls._ado_call(messages, model_name, temperature, json_output, domain)
+        except asyncio.CancelledError:
+            # Lost a hedge race; says nothing about the model's health. The time so far is
+            # a lower bound on its latency, and dropping it would drag the p95 (and so the
+            # hedge delay) down with every hedge
+            CircuitBreaker.release_trial(model_name)
+            LatencyTracker.record(model_name, time.perf_counter() - started)
+            raise
+        except Exception:
+            CircuitBreaker.record_failure(model_name)
+            MetricsManager.record_ai_call(domain, model_name, "error", time.perf_counter() - started)
+            raise
+        elapsed = time.perf_counter() - started
+        CircuitBreaker.record_success(model_name)
+        LatencyTracker.record(model_name, elapsed)
+        MetricsManager.record_ai_call(domain, model_name, "success", elapsed)
+        return response, model_name
+
+    @classmethod
+    async def _acall_with_fallback(
+        cls,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        json_output: bool,
+        domain: str
+    ) -> Tuple[str, str]:
+        """
+        Latency-aware routing. Returns (response, model_name).
+
+        Models whose circuit is open are skipped. If the primary has not answered
+        by its rolling p95 (``settings.ai_hedge_quantile``), a hedged request goes
+        to the fallback; the first successful answer wins and the other call is
+        cancelled. A failed primary hands over to the fallback immediately.
+        """
+        candidates = [settings.ai.model_name, settings.ai_fallback_model]
+        # Queue for rate budget once, outside retries and hedging: a full queue is not a
+        # model failure, and queueing time must not count towards the hedge delay
+        estimated_tokens = estimate_message_tokens(messages)
+        await RateGovernor.acquire(estimated_tokens)
+
+        primary = next((m for m in candidates if CircuitBreaker.allow(m)), None)
+        if primary is None:
+            MetricsManager.record_ai_failure(domain, "circuit_open")
+            raise AIError("AI service unavailable (all model circuits open)")
+        backups = candidates[candidates.index(primary) + 1:]
+
+        def start(model_name: str) -> asyncio.Task:
+            task = asyncio.ensure_future(cls._attempt(messages, model_name, temperature, json_output, domain))
+            tasks[task] = model_name
+            return task
+
+        tasks: Dict[asyncio.Task, str] = {}
+        errors = []
+        try:
+            pending = {start(primary)}
+            while pending:
+                hedge_delay = None
+                if backups and settings.ai_hedging_enabled:
+                    hedge_delay = LatencyTracker.percentile(primary, settings.ai_hedge_quantile)
+                    if hedge_delay is None:
+                        hedge_delay = settings.ai_hedge_default_delay
+                done, pending = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    try:
+                        response, model_name = task.result()
+                    except Exception as e:
+                        logger.warning(f"Model {tasks[task]} failed: {e}")
+                        errors.append(f"{tasks[task]}: {e}")
+                        continue
+                    if len(tasks) > 1:
+                        MetricsManager.record_ai_hedge(domain, model_name)
+                    return response, model_name
+
+                # Hand over when the primary is slower than its p95 (hedge) or has failed
+                if backups and (not done or not pending):
+                    if pending and not RateGovernor.try_acquire(estimated_tokens):
+                        # Under quota pressure a hedge would only add demand; keep waiting on the primary
+                        continue
+                    model_name = backups.pop(0)
+                    if not CircuitBreaker.allow(model_name):
+                        errors.append(f"{model_name}: circuit open")
+                        continue
+                    if pending:
+                        logger.info(f"Hedging {domain} call to {model_name}; {primary} slower than p{int(settings.ai_hedge_quantile * 100)}")
+                    pending.add(start(model_name))
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        MetricsManager.record_ai_failure(domain, "unavailable")
+        logger.error(f"All models failed for domain {domain}")
+        raise AIError(f"AI service completely unavailable ({'; '.join(errors)})")
+
+    @staticmethod
+    def _response_cache_key(
+        messages: List[Dict[str, str]], temperature: float, json_output: bool, domain: str
+    ) -> Optional[str]:
+        if get_domain_policy(domain).cache_ttl <= 0:
+            return None
+        return CacheManager.generate_key(domain, "call_model", {
+            "messages": messages,
+            "temperature": temperature,
+            "json_output": json_output,
+        })
+
+    @classmethod
+    def forget_response(
+        cls,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        json_output: bool = True,
+        domain: str = AIDomain.GENERAL
+    ):
+        """Drop a cached gateway response the caller found unusable, so the next call asks the model again."""
+        cache_key = cls._response_cache_key(messages, temperature, json_output, domain)
+        if cache_key:
+            CacheManager.get_cache().delete(cache_key)
+            CacheManager.evict_local(cache_key)
+
+    @staticmethod
+    def _check_available():
+        if settings.ai.kill_switch:
+            logger.warning("AI Kill-switch is active. Blocking request.")
+            raise AIKillSwitchError()
+
+        if not settings.ai.openrouter_api_key:
+            logger.error("OpenRouter API Key missing.")
+            raise AIError("AI service configuration error.")
+
     @classmethod
     def call_model(
         cls,
@@ -84,42 +302,190 @@ class AIOrchestrator:
         db_session: Any = None
     ) -> str:
         """
-        Centralized AI model caller with kill-switch, retries, fallback, and domain coordination.
+        Centralized AI gateway: kill-switch, per-domain cache/timeout/concurrency
+        (``DOMAIN_POLICIES``), retries, fallback model, metrics and governance logging.
         """
         logger.info(f"AI Coordination Request | Domain: {domain}")
-        
-        if settings.ai.kill_switch:
-            logger.warning("AI Kill-switch is active. Blocking request.")
-            raise AIKillSwitchError()
+        cls._check_available()
 
-        if not settings.ai.openrouter_api_key:
-            logger.error("OpenRouter API Key missing.")
-            raise AIError("AI service configuration error.")
+        cache_key = cls._response_cache_key(messages, temperature, json_output, domain)
+        if cache_key and not is_refreshing():
+            cached = CacheManager.get(cache_key)
+            if cached is not None:
+                MetricsManager.record_ai_cache_hit(domain)
+                return cached
+
+        def compute() -> str:
+            # Organization-scoped rate budgets; the context travels with the coroutine
+            with ai_call_context(organization_id=organization_id):
+                response, model_name = HTTPClientManager.run_sync(
+                    cls._acall_with_fallback(messages, temperature, json_output, domain)
+                )
 
-        try:
-            # Try primary model
-            response = cls._do_call(messages, settings.ai.model_name, temperature, json_output)
-            
             # Governance Hook: Log provenance if DB session is provided
             if db_session:
-                cls._log_governance(
-                    db_session, 
-                    domain, 
-                    messages, 
-                    response, 
-                    settings.ai.model_name, 
-                    organization_id
+                cls._log_governance(db_session, domain, messages, response, model_name, organization_id)
+            if cache_key:
+                CacheManager.set(
+                    cache_key, response, expire=get_domain_policy(domain).cache_ttl,
+                    tags=[CacheManager.tag("domain", domain), *current_cache_tags()]
                 )
-            
             return response
+
+        if not cache_key:
+            return compute()
+        # Identical prompts already in flight (e.g. dashboard widgets) share one model call
+        return SingleFlight.do(cache_key, compute, recheck=lambda: CacheManager.get(cache_key))
+
+    @classmethod
+    async def acall_model(
+        cls,
+        messages: List[Dict[str, str]], 
+        temperature: float = 0.7,
+        json_output: bool = True,
+        domain: str = AIDomain.GENERAL,
+        organization_id: Optional[int] = None,
+        db_session: Any = None
+    ) -> str:
+        """
+        Async counterpart of ``call_model`` for use from async endpoints and workers:
+        the model call awaits on the pooled client instead of holding a thread.
+        """
+        logger.info(f"AI Coordination Request | Domain: {domain}")
+        cls._check_available()
+
+        cache_key = cls._response_cache_key(messages, temperature, json_output, domain)
+        if cache_key and not is_refreshing():
+            cached = CacheManager.get(cache_key)
+            if cached is not None:
+                MetricsManager.record_ai_cache_hit(domain)
+                return cached
+
+        with ai_call_context(organization_id=organization_id):
+            response, model_name = await cls._acall_with_fallback(messages, temperature, json_output, domain)
+
+        if db_session:
+            # Governance logging uses the caller's sync session; keep it off the event loop
+            await asyncio.to_thread(
+                cls._log_governance, db_session, domain, messages, response, model_name, organization_id
+            )
+        if cache_key:
+            CacheManager.set(
+                cache_key, response, expire=get_domain_policy(domain).cache_ttl,
+                tags=[CacheManager.tag("domain", domain), *current_cache_tags()]
+            )
+        return response
+
+    @staticmethod
+    async def _ado_stream(
+        messages: List[Dict[str, str]],
+        model_name: str,
+        temperature: float = 0.7,
+        domain: str = AIDomain.GENERAL
+    ) -> AsyncIterator[str]:
+        """Internal method: stream completion tokens (OpenAI-style SSE chunks)."""
+        logger.info(f"Streaming AI Model: {model_name}")
+        
+        await RateGovernor.acquire(estimate_message_tokens(messages))
+        try:
+            async with AIOrchestrator._domain_slot(domain), HTTPClientManager.stream(
+                OPENROUTER_URL,
+                json={
+                    "model": model_name,
+                    "messages": messages,
+                    "temperature": temperature,
+                    "stream": True
+                },
+                headers=_openrouter_headers(),
+                timeout=get_domain_policy(domain).timeout
+            ) as response:  # read timeout bounds the gap between streamed chunks
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    # Skip keep-alive comments (": OPENROUTER PROCESSING") and blank lines
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    chunk = json.loads(data)
+                    if "error" in chunk:
+                        raise AIError(f"AI service stream error: {chunk['error']}")
+                    choices = chunk.get("choices") or [{}]
+                    token = (choices[0].get("delta") or {}).get("content")
+                    if token:
+                        yield token
+
+        except httpx.TimeoutException:
+            logger.error("AI service stream timeout.")
+            raise AIError("AI service reached timeout limit.")
+        except httpx.HTTPStatusError as e:
+            logger.error(f"AI service HTTP error: {e}")
+            if e.response.status_code == 429:
+                AIOrchestrator._rate_limited(model_name, e.response)
+            raise AIError(f"AI service returned error: {e.response.status_code}")
+        except AIError:
+            raise
         except Exception as e:
-            logger.warning(f"Primary model {settings.ai.model_name} failed: {e}. Attempting fallback.")
+            logger.exception("Unexpected error during AI stream.")
+            raise AIError(f"AI service error: {str(e)}")
+
+    @classmethod
+    def _do_stream(
+        cls,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        temperature: float = 0.7,
+        domain: str = AIDomain.GENERAL
+    ) -> Iterator[str]:
+        """Sync shim: iterates ``_ado_stream`` on the shared HTTP client loop."""
+        return HTTPClientManager.iterate_sync(cls._ado_stream(messages, model_name, temperature, domain))
+
+    @classmethod
+    def stream_model(
+        cls,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        domain: str = AIDomain.GENERAL,
+        organization_id: Optional[int] = None,
+        db_session: Any = None
+    ) -> Iterator[str]:
+        """
+        Streaming counterpart of ``call_model``: yields completion tokens as they arrive.
+        Falls back to the fallback model only if the primary fails before its first token.
+        """
+        logger.info(f"AI Coordination Stream Request | Domain: {domain}")
+        cls._check_available()
+
+        errors = []
+        for model_name in (settings.ai.model_name, settings.ai_fallback_model):
+            if not CircuitBreaker.allow(model_name):
+                errors.append(f"{model_name}: circuit open")
+                continue
+            parts = []
             try:
-                # Try fallback model
-                return cls._do_call(messages, settings.ai_fallback_model, temperature, json_output)
-            except Exception as fe:
-                logger.error(f"Fallback model {settings.ai_fallback_model} also failed: {fe}")
-                raise AIError(f"AI service completely unavailable (Primary: {e}, Fallback: {fe})")
+                for token in cls._do_stream(messages, model_name, temperature, domain):
+                    parts.append(token)
+                    yield token
+            except (GeneratorExit, AICapacityError):
+                # Client went away mid-stream, or no rate budget: neither says anything about the model
+                CircuitBreaker.release_trial(model_name)
+                raise
+            except Exception as e:
+                CircuitBreaker.record_failure(model_name)
+                if parts:
+                    # Tokens already reached the client; switching models would garble the answer
+                    raise
+                logger.warning(f"Streaming model {model_name} failed: {e}")
+                errors.append(f"{model_name}: {e}")
+                continue
+
+            CircuitBreaker.record_success(model_name)
+            if db_session:
+                cls._log_governance(db_session, domain, messages, "".join(parts), model_name, organization_id)
+            return
+
+        MetricsManager.record_ai_failure(domain, "unavailable")
+        raise AIError(f"AI service completely unavailable ({'; '.join(errors)})")
 
     @classmethod
     def analyze_text(
@@ -226,3 +592,135 @@ class AIOrchestrator:
                 )
         except Exception as e:
             logger.error(f"Failed to log AI governance data: {e}")
+
+
+class MicroBatcher:
+    """
+    Packs small, same-shaped classification prompts into one model call.
+
+    Each batcher owns one per-item ``system_prompt`` that asks for a JSON
+    object. ``submit`` waits up to ``max_wait_ms`` for other concurrent
+    callers of the same organization, sends the whole group as a JSON array
+    and hands every caller its own object back. Items the model leaves out of
+    the batch answer are retried one by one.
+
+    Items of different organizations never share a prompt (their texts may
+    carry PII) and each call is charged to its organization's rate budget.
+    Items submitted without an organization are sent on their own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        system_prompt: str,
+        domain: str = AIDomain.GENERAL,
+        temperature: float = 0.3,
+        max_items: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        max_chars: Optional[int] = None
+    ):
+        self.name = name
+        self.system_prompt = system_prompt
+        self.domain = domain
+        self.temperature = temperature
+        self.max_items = max_items or settings.ai_batch_max_items
+        self.max_wait_ms = settings.ai_batch_max_wait_ms if max_wait_ms is None else max_wait_ms
+        self.max_chars = max_chars or settings.ai_batch_max_chars
+        # organization_id -> waiting items, their total size and flush timer
+        self._pending: Dict[int, List[Tuple[str, Future]]] = {}
+        self._pending_chars: Dict[int, int] = {}
+        self._timers: Dict[int, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, text: str, organization_id: Optional[int]) -> Dict[str, Any]:
+        """Classify one item, sharing a model call with concurrent submitters of the same organization."""
+        if organization_id is None or not settings.ai_batching_enabled or self.max_items <= 1:
+            return self._call_single(text, organization_id)
+
+        future: Future = Future()
+        batch = None
+        with self._lock:
+            self._pending.setdefault(organization_id, []).append((text, future))
+            self._pending_chars[organization_id] = self._pending_chars.get(organization_id, 0) + len(text)
+            if (
+                len(self._pending[organization_id]) >= self.max_items
+                or self._pending_chars[organization_id] >= self.max_chars
+            ):
+                batch = self._take_pending(organization_id)
+            elif organization_id not in self._timers:
+                # The flush runs with the first submitter's context (priority)
+                timer = threading.Timer(
+                    self.max_wait_ms / 1000.0, contextvars.copy_context().run, args=(self._flush, organization_id)
+                )
+                timer.daemon = True
+                self._timers[organization_id] = timer
+                timer.start()
+        if batch:
+            self._run(batch, organization_id)
+        return future.result()
+
+    def _take_pending(self, organization_id: int) -> List[Tuple[str, Future]]:
+        # Caller holds self._lock
+        timer = self._timers.pop(organization_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._pending_chars.pop(organization_id, None)
+        return self._pending.pop(organization_id, [])
+
+    def _flush(self, organization_id: int):
+        with self._lock:
+            batch = self._take_pending(organization_id)
+        if batch:
+            self._run(batch, organization_id)
+
+    def _run(self, batch: List[Tuple[str, Future]], organization_id: int):
+        try:
+            results = self._call_batch([text for text, _ in batch], organization_id)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _call_single(self, text: str, organization_id: Optional[int]) -> Dict[str, Any]:
+        return AIOrchestrator.analyze_text(
+            self.system_prompt, text, temperature=self.temperature, domain=self.domain,
+            organization_id=organization_id
+        )
+
+    def _call_batch(self, texts: List[str], organization_id: int) -> List[Dict[str, Any]]:
+        if len(texts) == 1:
+            return [self._call_single(texts[0], organization_id)]
+
+        logger.info(f"Micro-batch {self.name}: {len(texts)} items in one call")
+        system_prompt = (
+            f"{self.system_prompt}\n\n"
+            "You will receive a JSON array of items, each {\"id\": ..., \"text\": ...}. "
+            "Handle every item independently as described above. Respond with JSON only: "
+            "{\"results\": [{\"id\": <item id>, ...the JSON object described above for that item...}]}, "
+            "with exactly one entry per item."
+        )
+        items = [{"id": str(i), "text": text} for i, text in enumerate(texts)]
+        response_text = AIOrchestrator.call_model(
+            [{"role": "system", "content": system_prompt}, {"role": "user", "content": json.dumps(items)}],
+            temperature=self.temperature,
+            json_output=True,
+            domain=self.domain,
+            organization_id=organization_id
+        )
+        try:
+            data = json.loads(response_text)
+        except json.JSONDecodeError:
+            logger.warning(f"Micro-batch {self.name}: unparseable batch answer, retrying items individually")
+            data = {}
+
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for entry in (data.get("results") if isinstance(data, dict) else None) or []:
+            if isinstance(entry, dict) and "id" in entry:
+                by_id[str(entry.pop("id"))] = entry
+
+        return [
+            by_id[item["id"]] if item["id"] in by_id else self._call_single(item["text"], organization_id)
+            for item in items
+        ]
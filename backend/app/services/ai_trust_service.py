@@ -16,6 +16,7 @@ class AITrustService:
         self.user_id = user_id
         self.user_role = user_role
         self.audit_service = AuditService(db)
+        self.last_audit_log = None  # Entry written by the most recent wrap_and_log
 
     def wrap_and_log(
         self,
@@ -80,7 +81,7 @@ class AITrustService:
         # We catch exceptions here to ensure the user still gets the response 
         # even if logging fails (though in high-security mode we might want to fail hard)
         try:
-            self.audit_service.log_action(
+            self.last_audit_log = self.audit_service.log_action(
                 action=action_type,
                 entity_type=entity_type,
                 entity_id=entity_id,
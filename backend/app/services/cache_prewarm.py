@@ -0,0 +1,138 @@
+"""
+Cache prewarming for predictable AI workloads.
+
+Some model outputs can be produced before anyone asks for them: onboarding
+checklists for each open job's position, interview kits for each active job,
+and payslip explanations once a payroll run has finished. ``prewarm_ai_cache``
+enumerates those inputs from the database and calls the same cached service
+functions users hit. Calls run on a small thread pool at background priority,
+so the first request of the day is a cache hit instead of a model round trip.
+
+Run it from ``scripts/prewarm_ai_cache.py`` (cron) or enqueue the
+``cache_prewarm`` task type.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import settings
+from app.core.rate_governor import AIPriority, ai_call_context
+from app.models.job import Job
+from app.models.payroll import Payroll
+from app.services.interview_service import KIT_RESUME_PLACEHOLDER, InterviewService
+from app.services.onboarding_ai import suggest_onboarding_checklist
+from app.services.payroll_ai import PayrollAIService
+
+logger = logging.getLogger(__name__)
+
+PREWARM_TARGETS = ("onboarding", "interview", "payroll")
+
+# (target, organization_id, call)
+PrewarmCall = Tuple[str, Optional[int], Callable[[], Any]]
+
+
+def _warm_interview_kit(job_title: str):
+    kit = InterviewService().generate_interview_kit(job_title, KIT_RESUME_PLACEHOLDER)
+    if not kit.get("questions"):
+        raise RuntimeError(f"no interview kit generated for {job_title!r}")
+
+
+def _prewarm_calls(
+    db: Session,
+    targets: Iterable[str],
+    organization_id: Optional[int],
+    month: int,
+    year: int
+) -> List[PrewarmCall]:
+    """Collect every call to make. All DB reads happen here, on the caller's thread."""
+    calls: List[PrewarmCall] = []
+
+    if "onboarding" in targets or "interview" in targets:
+        query = db.query(Job).filter(Job.is_active.is_(True))
+        if organization_id is not None:
+            query = query.filter(Job.organization_id == organization_id)
+        jobs = query.all()
+
+        seen = set()
+        for job in jobs:
+            if "onboarding" in targets and ("onboarding", job.title, job.department) not in seen:
+                seen.add(("onboarding", job.title, job.department))
+                calls.append(("onboarding", job.organization_id, partial(suggest_onboarding_checklist, job.title, job.department)))
+            if "interview" in targets and ("interview", job.title) not in seen:
+                seen.add(("interview", job.title))
+                calls.append(("interview", job.organization_id, partial(_warm_interview_kit, job.title)))
+
+    if "payroll" in targets:
+        query = db.query(Payroll).options(selectinload(Payroll.components)).filter(
+            Payroll.month == month, Payroll.year == year
+        )
+        if organization_id is not None:
+            query = query.filter(Payroll.organization_id == organization_id)
+        service = PayrollAIService()
+        for payroll in query.all():
+            calls.append(("payroll", payroll.organization_id, partial(service.explain_payslip, payroll)))
+
+    return calls
+
+
+def _run(target: str, organization_id: Optional[int], call: Callable[[], Any]) -> str:
+    # Queue behind interactive traffic, within the organization's rate budget
+    with ai_call_context(priority=AIPriority.BACKGROUND, organization_id=organization_id):
+        call()
+    return target
+
+
+def prewarm_ai_cache(
+    db: Session,
+    targets: Optional[Iterable[str]] = None,
+    organization_id: Optional[int] = None,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    concurrency: Optional[int] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Fill the AI caches for ``targets`` (default: all of ``PREWARM_TARGETS``).
+    Payslips are warmed for ``month``/``year`` (default: the current month).
+    Returns warmed/failed counts per target.
+    """
+    targets = set(targets or PREWARM_TARGETS)
+    unknown = targets - set(PREWARM_TARGETS)
+    if unknown:
+        raise ValueError(f"Unknown prewarm targets: {', '.join(sorted(unknown))}")
+    today = date.today()
+    calls = _prewarm_calls(db, targets, organization_id, month or today.month, year or today.year)
+
+    summary = {target: {"warmed": 0, "failed": 0} for target in sorted(targets)}
+    logger.info(f"Prewarming AI cache: {len(calls)} calls for {', '.join(sorted(targets))}")
+    with ThreadPoolExecutor(
+        max_workers=concurrency or settings.cache_prewarm_concurrency, thread_name_prefix="cache-prewarm"
+    ) as executor:
+        futures = {executor.submit(_run, *call): call[0] for call in calls}
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                future.result()
+                summary[target]["warmed"] += 1
+            except Exception as e:
+                logger.warning(f"Prewarm {target} call failed: {e}")
+                summary[target]["failed"] += 1
+
+    logger.info(f"Prewarm complete: {summary}")
+    return summary
+
+
+def process_cache_prewarm(db: Session, payload: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """
+    Background Task Handler for cache prewarming.
+    """
+    return prewarm_ai_cache(
+        db,
+        targets=payload.get("targets"),
+        organization_id=payload.get("organization_id"),
+        month=payload.get("month"),
+        year=payload.get("year"),
+    )
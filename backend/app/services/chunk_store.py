@@ -0,0 +1,101 @@
+"""
+Bulk write path for ``document_chunks``.
+
+Ingestion and re-indexing insert chunks in fixed-size batches of
+``settings.chunk_insert_batch_size`` rows, bypassing the ORM unit of work.
+PostgreSQL uses ``COPY ... FROM STDIN`` when enabled; other databases use a
+multi-row ``INSERT ... RETURNING``.
+"""
+import csv
+import io
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+# Columns written by COPY (the legacy pickled column is only written by the INSERT path)
+_COPY_COLUMNS = ("document_id", "chunk_text", "chunk_index", "page_start", "page_end", "embedding_blob")
+
+
+def bulk_insert_chunks(db: Session, rows: Sequence[dict]) -> List[int]:
+    """
+    Insert ``document_chunks`` rows in the caller's transaction.
+
+    Each row is a dict of DocumentChunk column values. Returns the new chunk ids
+    in the same order as ``rows``.
+    """
+    if not rows:
+        return []
+    batch_size = max(1, settings.chunk_insert_batch_size)
+    use_copy = (
+        settings.chunk_insert_copy
+        and db.get_bind().dialect.name == "postgresql"
+        and all(row.get("embedding_vector") is None for row in rows)
+    )
+
+    ids: List[int] = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if use_copy:
+            _copy_batch(db, batch)
+        else:
+            ids.extend(_insert_batch(db, batch))
+
+    if use_copy:
+        ids = _select_ids(db, rows)
+    logger.info(f"Bulk inserted {len(rows)} chunks ({'COPY' if use_copy else 'INSERT'}, batches of {batch_size})")
+    return ids
+
+
+def _insert_batch(db: Session, batch: Sequence[dict]) -> List[int]:
+    statement = insert(DocumentChunk.__table__).returning(
+        DocumentChunk.__table__.c.id, sort_by_parameter_order=True
+    )
+    return [row[0] for row in db.execute(statement, list(batch))]
+
+
+def _copy_batch(db: Session, batch: Sequence[dict]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        values = []
+        for column in _COPY_COLUMNS:
+            value = row.get(column)
+            if value is None:
+                values.append("")  # unquoted empty field is NULL in CSV COPY
+            elif isinstance(value, (bytes, bytearray, memoryview)):
+                values.append("\\x" + bytes(value).hex())
+            else:
+                values.append(value)
+        writer.writerow(values)
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {DocumentChunk.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _select_ids(db: Session, rows: Sequence[dict]) -> List[int]:
+    """Map (document_id, chunk_index) back to the ids COPY assigned."""
+    keys = [(row["document_id"], row["chunk_index"]) for row in rows]
+    found: Dict[Tuple[int, int], int] = {}
+    for document_id in {document_id for document_id, _ in keys}:
+        query = db.query(DocumentChunk.id, DocumentChunk.chunk_index).filter(
+            DocumentChunk.document_id == document_id
+        )
+        for chunk_id, chunk_index in query:
+            # Highest id wins: a re-index inserts new rows before deleting the old ones
+            if found.get((document_id, chunk_index), 0) < chunk_id:
+                found[(document_id, chunk_index)] = chunk_id
+    return [found[key] for key in keys]
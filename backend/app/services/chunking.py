@@ -0,0 +1,115 @@
+"""
+Streaming, sentence-aware text chunking.
+
+``iter_chunks`` consumes page texts lazily and yields chunks as soon as they
+are full, so embedding can start while later pages are still being extracted.
+Text is split into sentence/paragraph units once; each unit enters and leaves
+the window exactly once, so chunking is linear in the input size. Overlap is
+carried over at sentence granularity and every chunk records the pages it
+spans for citations.
+"""
+import re
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, NamedTuple
+
+# Sentence ends (., !, ? followed by whitespace) and paragraph breaks (blank lines)
+_BOUNDARY_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+_WORD_RE = re.compile(r"\S+")
+
+CHUNK_UNITS = ("chars", "tokens")
+
+
+class TextChunk(NamedTuple):
+    text: str
+    page_start: int
+    page_end: int
+
+
+def iter_chunks(
+    pages: Iterable[str],
+    chunk_size: int = 800,
+    overlap: int = 200,
+    unit: str = "chars"
+) -> Iterator[TextChunk]:
+    """
+    Yield overlapping chunks of at most ``chunk_size`` units (characters, or
+    whitespace-delimited tokens when ``unit="tokens"``) from an iterable of
+    page texts. Pages are numbered from 1.
+    """
+    if unit not in CHUNK_UNITS:
+        raise ValueError(f"Unsupported chunk unit: {unit}")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    overlap = max(0, min(overlap, chunk_size - 1))
+    measure = len if unit == "chars" else _count_tokens
+    separator = 1 if unit == "chars" else 0
+
+    # Unpunctuated runs (tables, CSV rows) are cut into overlap-sized pieces so overlap still applies
+    piece_size = max(overlap, chunk_size // 16, 1) if overlap else chunk_size
+
+    window = deque()  # (text, size, page)
+    window_size = 0
+    fresh = 0  # units added since the last emitted chunk
+
+    for page_number, page_text in enumerate(pages, start=1):
+        for sentence in _split_units(page_text or "", chunk_size, piece_size, measure):
+            size = measure(sentence)
+            if window and window_size + separator + size > chunk_size:
+                if fresh:
+                    yield _make_chunk(window)
+                    fresh = 0
+                # Keep trailing sentences up to ``overlap`` (and room for the new one)
+                while window and (window_size > overlap or window_size + separator + size > chunk_size):
+                    _, dropped, _ = window.popleft()
+                    window_size -= dropped + (separator if window else 0)
+                if not window:
+                    window_size = 0
+            window_size += size + (separator if window else 0)
+            window.append((sentence, size, page_number))
+            fresh += 1
+
+    if window and fresh:
+        yield _make_chunk(window)
+
+
+def _make_chunk(window) -> TextChunk:
+    return TextChunk(" ".join(text for text, _, _ in window), window[0][2], window[-1][2])
+
+
+def _count_tokens(text: str) -> int:
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+
+def _split_units(text: str, chunk_size: int, piece_size: int, measure: Callable[[str], int]) -> Iterator[str]:
+    """Split page text into sentences, breaking sentences longer than a chunk into word-aligned pieces."""
+    for sentence in _BOUNDARY_RE.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if measure(sentence) <= chunk_size:
+            yield sentence
+        else:
+            yield from _split_long(sentence, piece_size, measure)
+
+
+def _split_long(sentence: str, piece_size: int, measure: Callable[[str], int]) -> Iterator[str]:
+    words: List[str] = []
+    size = 0
+    for word in sentence.split(" "):
+        if measure is len and len(word) > piece_size:
+            # A single "word" longer than a piece (e.g. a URL or table row): hard split
+            if words:
+                yield " ".join(words)
+                words, size = [], 0
+            for start in range(0, len(word), piece_size):
+                yield word[start:start + piece_size]
+            continue
+        word_size = measure(word) + (1 if words and measure is len else 0)
+        if words and size + word_size > piece_size:
+            yield " ".join(words)
+            words, size = [], 0
+            word_size = measure(word)
+        words.append(word)
+        size += word_size
+    if words:
+        yield " ".join(words)
@@ -0,0 +1,147 @@
+"""
+Context assembly for RAG prompts.
+
+Retrieved chunks are packed before the model call:
+
+1. Adjacent chunks of the same document are merged, dropping the text they
+   share through chunk overlap.
+2. Passages mostly contained in a better-scored one (e.g. the same policy in
+   two document versions) are dropped.
+3. Passages are ordered by maximal marginal relevance and added until the
+   token budget is spent.
+
+Passage similarity is measured on word shingles, so no extra embeddings are needed.
+"""
+import re
+from typing import Dict, FrozenSet, List, Optional
+
+from app.core.config import settings
+
+_WORD_RE = re.compile(r"\w+")
+_SHINGLE = 3
+_OVERLAP_PROBE = 40  # chars of the next chunk searched for in the previous one
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose)."""
+    return len(text) // 4 + 1
+
+
+def pack_context(
+    results: List[Dict],
+    token_budget: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    dedup_threshold: Optional[float] = None
+) -> List[Dict]:
+    """
+    Turn search hits (``document_id``, ``chunk_index``, ``chunk_text`` and a
+    ``combined_score`` or ``similarity``) into prompt passages:
+    ``{"text", "document_id", "chunk_indexes", "score"}`` in prompt order.
+    """
+    token_budget = token_budget or settings.rag_context_token_budget
+    mmr_lambda = settings.rag_mmr_lambda if mmr_lambda is None else mmr_lambda
+    dedup_threshold = settings.rag_dedup_threshold if dedup_threshold is None else dedup_threshold
+
+    passages = _merge_adjacent(results)
+    for passage in passages:
+        passage["_shingles"] = _shingles(passage["text"])
+    passages = _deduplicate(passages, dedup_threshold)
+
+    packed = []
+    used = 0
+    for passage in _mmr_order(passages, mmr_lambda):
+        tokens = estimate_tokens(passage["text"])
+        if used + tokens > token_budget:
+            if packed:
+                continue
+            # Always include something: trim the best passage to the budget
+            passage["text"] = passage["text"][:token_budget * 4]
+            tokens = token_budget
+        packed.append(passage)
+        used += tokens
+    for passage in packed:
+        del passage["_shingles"]
+    return packed
+
+
+def _score(result: Dict) -> float:
+    return float(result.get("combined_score", result.get("similarity", 0.0)) or 0.0)
+
+
+def _merge_adjacent(results: List[Dict]) -> List[Dict]:
+    by_document: Dict[int, List[Dict]] = {}
+    for result in results:
+        by_document.setdefault(result["document_id"], []).append(result)
+
+    passages = []
+    for document_id, hits in by_document.items():
+        hits.sort(key=lambda r: r["chunk_index"])
+        current = None
+        for hit in hits:
+            text = hit.get("chunk_text") or ""
+            if current is not None and hit["chunk_index"] == current["chunk_indexes"][-1] + 1:
+                current["text"] = _join_overlapping(current["text"], text)
+                current["chunk_indexes"].append(hit["chunk_index"])
+                current["score"] = max(current["score"], _score(hit))
+                continue
+            if current is not None:
+                passages.append(current)
+            current = {"text": text, "document_id": document_id, "chunk_indexes": [hit["chunk_index"]], "score": _score(hit)}
+        if current is not None:
+            passages.append(current)
+    return passages
+
+
+def _join_overlapping(previous: str, following: str) -> str:
+    """Concatenate two consecutive chunks, dropping the text they share."""
+    probe = following[:_OVERLAP_PROBE]
+    if probe:
+        start = previous.rfind(probe, max(0, len(previous) - len(following) - len(probe)))
+        if start != -1 and following.startswith(previous[start:]):
+            return previous[:start] + following
+    return f"{previous} {following}"
+
+
+def _shingles(text: str) -> FrozenSet:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= _SHINGLE:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + _SHINGLE]) for i in range(len(words) - _SHINGLE + 1))
+
+
+def _jaccard(a: FrozenSet, b: FrozenSet) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _containment(a: FrozenSet, b: FrozenSet) -> float:
+    """Share of ``a`` already present in ``b``."""
+    if not a:
+        return 1.0
+    return len(a & b) / len(a)
+
+
+def _deduplicate(passages: List[Dict], threshold: float) -> List[Dict]:
+    """Drop passages mostly covered by a better-scored one (containment, so a chunk inside a merged passage counts)."""
+    kept: List[Dict] = []
+    for passage in sorted(passages, key=lambda p: p["score"], reverse=True):
+        if all(_containment(passage["_shingles"], other["_shingles"]) < threshold for other in kept):
+            kept.append(passage)
+    return kept
+
+
+def _mmr_order(passages: List[Dict], mmr_lambda: float) -> List[Dict]:
+    """Greedy maximal marginal relevance: relevance minus redundancy with what is already picked."""
+    remaining = list(passages)
+    ordered: List[Dict] = []
+    while remaining:
+        best = max(
+            remaining,
+            key=lambda p: mmr_lambda * p["score"] - (1 - mmr_lambda) * max(
+                (_jaccard(p["_shingles"], q["_shingles"]) for q in ordered), default=0.0
+            )
+        )
+        remaining.remove(best)
+        ordered.append(best)
+    return ordered
@@ -1,24 +1,36 @@
 import os
-import PyPDF2
-import docx
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from fastapi import UploadFile
-from app.models.document import Document
+from app.models.document import Document, DocumentStatus
 from app.models.document_chunk import DocumentChunk
 from app.models.organization import Organization
-from app.services.embedding_service import generate_embeddings, hybrid_search
+from app.services.embedding_service import generate_embeddings, get_embedding_backend, hybrid_search
+from app.services.keyword_index import KeywordIndexRegistry, analyze_chunks, build_postings, store_postings
+from app.services.vector_index import VectorIndexRegistry
+from app.services.embedding_codec import embedding_columns
+from app.services.text_extraction import count_pages, extract_text, iter_pages
+from app.services.chunking import iter_chunks
+from app.services.chunk_store import bulk_insert_chunks
+from app.services.context_packing import pack_context
+from app.services.rag_cache import RagAnswerCache
+from app.services.ai_orchestrator import AIOrchestrator, AIDomain
+from app.core.config import settings
+from app.models.chunk_term import ChunkTerm
 import hashlib
 import re
+import uuid
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
 # Configuration
-CHUNK_SIZE = 800
-CHUNK_OVERLAP = 200
+CHUNK_SIZE = settings.chunk_size
+CHUNK_OVERLAP = settings.chunk_overlap
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # Uploads are streamed to disk in 1MB blocks
 ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.txt', '.csv'}
 
 def validate_file(file: UploadFile) -> tuple[bool, str]:
@@ -32,65 +44,46 @@ def validate_file(file: UploadFile) -> tuple[bool, str]:
     return True, ""
 
 def extract_text_from_file(file_path: str, file_type: str) -> str:
-    """Extract text from uploaded file based on type."""
-    text = ""
-    
+    """Extract text from uploaded file based on type (PDF pages in parallel, see text_extraction)."""
     try:
-        if file_type == '.pdf':
-            with open(file_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-        
-        elif file_type == '.docx':
-            doc = docx.Document(file_path)
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-        
-        elif file_type in ['.txt', '.csv']:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                text = f.read()
-        
-        return text.strip()
+        return extract_text(file_path, file_type)
     except Exception as e:
         raise Exception(f"Error extracting text from file: {str(e)}")
 
 def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
-    """Split text into overlapping chunks - FAST version."""
-    logger.info(f"Starting chunking - text length: {len(text)} chars")
-    
-    if len(text) <= chunk_size:
-        logger.info("Text is small, returning as single chunk")
-        return [text]
-    
-    chunks = []
-    start = 0
-    chunk_count = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        
-        # Simple break - no complex sentence boundary detection
-        if end < len(text):
-            # Just find nearest space
-            space_pos = text.find(' ', end)
-            if space_pos != -1 and space_pos < end + 100:
-                end = space_pos
-        
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-            chunk_count += 1
-            if chunk_count % 10 == 0:
-                logger.info(f"Created {chunk_count} chunks...")
-        
-        # Move start forward with overlap
-        start = end - overlap
-        if start >= len(text):
-            break
-    
-    logger.info(f"Chunking complete - created {len(chunks)} chunks")
-    return chunks
+    """Split text into overlapping, sentence-aligned chunks (see chunking.iter_chunks)."""
+    return [chunk.text for chunk in iter_chunks([text], chunk_size, overlap, settings.chunk_unit)]
+
+async def save_upload(file: UploadFile, org_upload_dir: str) -> tuple[str, int]:
+    """
+    Stream an upload to disk in UPLOAD_BLOCK_SIZE blocks.
+
+    The file is written under a temporary name and renamed once complete, so a
+    half-written upload is never picked up by ingestion. Raises ValueError if
+    the upload exceeds MAX_FILE_SIZE.
+    """
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    file_hash = hashlib.md5(f"{file.filename}{uuid.uuid4().hex}".encode()).hexdigest()
+    file_path = os.path.join(org_upload_dir, f"{file_hash}{file_ext}")
+    partial_path = f"{file_path}.part"
+
+    file_size = 0
+    try:
+        with open(partial_path, 'wb') as f:
+            while True:
+                block = await file.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                file_size += len(block)
+                if file_size > MAX_FILE_SIZE:
+                    raise ValueError(f"File size exceeds {MAX_FILE_SIZE / (1024*1024)}MB limit")
+                f.write(block)
+        os.replace(partial_path, file_path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return file_path, file_size
 
 async def process_uploaded_file(
     file: UploadFile,
@@ -100,291 +93,377 @@ async def process_uploaded_file(
     upload_dir: str = "uploads"
 ) -> Document:
     """
-    Process uploaded file: extract text, chunk, generate embeddings, and store.
+    Accept an upload: stream it to disk and create its document record.
+
+    The document is returned with ``status="processing"``; extraction, chunking
+    and embedding run later in ``ingest_document`` (enqueued as the
+    ``document_ingestion`` task), which reports progress on the record.
     """
     process_start = time.time()
-    logger.info(f"=== Starting file upload process ===")
+    logger.info(f"=== Accepting file upload ===")
     logger.info(f"Filename: {file.filename}")
     logger.info(f"Organization ID: {organization_id}, Uploaded by: {uploaded_by}")
-    
+
+    is_valid, error_msg = validate_file(file)
+    if not is_valid:
+        logger.error(f"File validation failed: {error_msg}")
+        raise ValueError(error_msg)
+
+    org_upload_dir = os.path.join(upload_dir, str(organization_id))
+    os.makedirs(org_upload_dir, exist_ok=True)
+
+    file_path, file_size = await save_upload(file, org_upload_dir)
+    logger.info(f"Saved {file_size} bytes ({file_size/(1024*1024):.2f}MB) to {file_path} in {time.time() - process_start:.2f}s")
+
+    document = Document(
+        filename=file.filename,
+        file_path=file_path,
+        file_type=os.path.splitext(file.filename)[1].lower(),
+        uploaded_by=uploaded_by,
+        organization_id=organization_id,
+        status=DocumentStatus.PROCESSING,
+        progress=0
+    )
     try:
-        # Step 1: Validate file
-        logger.info("Step 1: Validating file...")
-        is_valid, error_msg = validate_file(file)
-        if not is_valid:
-            logger.error(f"File validation failed: {error_msg}")
-            raise ValueError(error_msg)
-        logger.info("Step 1: File validation passed")
-        
-        # Step 2: Create upload directory
-        logger.info("Step 2: Creating upload directory...")
-        org_upload_dir = os.path.join(upload_dir, str(organization_id))
-        os.makedirs(org_upload_dir, exist_ok=True)
-        logger.info(f"Step 2: Upload directory ready: {org_upload_dir}")
-        
-        # Step 3: Prepare file path
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        file_hash = hashlib.md5(f"{file.filename}{organization_id}".encode()).hexdigest()
-        file_path = os.path.join(org_upload_dir, f"{file_hash}{file_ext}")
-        logger.info(f"Step 3: File path prepared: {file_path}")
-        
-        # Step 4: Read and save file
-        logger.info("Step 4: Reading file content...")
-        read_start = time.time()
-        content = await file.read()
-        file_size = len(content)
-        read_time = time.time() - read_start
-        logger.info(f"Step 4: File read complete - Size: {file_size} bytes ({file_size/(1024*1024):.2f}MB) in {read_time:.2f}s")
-        
-        if file_size > MAX_FILE_SIZE:
-            logger.error(f"File size {file_size} exceeds limit {MAX_FILE_SIZE}")
-            raise ValueError(f"File size exceeds {MAX_FILE_SIZE / (1024*1024)}MB limit")
-        
-        logger.info("Step 5: Saving file to disk...")
-        save_start = time.time()
-        with open(file_path, 'wb') as f:
-            f.write(content)
-        save_time = time.time() - save_start
-        logger.info(f"Step 5: File saved in {save_time:.2f}s")
-    
-        # Step 6: Extract text
-        logger.info("Step 6: Extracting text from file...")
-        extract_start = time.time()
-        try:
-            text = extract_text_from_file(file_path, file_ext)
-            extract_time = time.time() - extract_start
-            logger.info(f"Step 6: Text extraction complete - Length: {len(text)} chars in {extract_time:.2f}s")
-        except Exception as e:
-            logger.error(f"Step 6: Text extraction failed: {e}", exc_info=True)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            raise ValueError(f"Error extracting text from file: {str(e)}")
-        
-        if not text or not text.strip():
-            logger.error("Step 6: Extracted text is empty")
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            raise ValueError("Could not extract text from file or file is empty")
-        
-        if len(text.strip()) < 10:
-            logger.error(f"Step 6: Extracted text too short: {len(text.strip())} chars")
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            raise ValueError("Extracted text is too short (minimum 10 characters required)")
-        
-        # Step 7: Create document record
-        logger.info("Step 7: Creating document record in database...")
-        doc_start = time.time()
-        document = Document(
-            filename=file.filename,
-            file_path=file_path,
-            file_type=file_ext,
-            uploaded_by=uploaded_by,
-            organization_id=organization_id
-        )
         db.add(document)
-        db.flush()
-        doc_time = time.time() - doc_start
-        logger.info(f"Step 7: Document record created (ID: {document.id}) in {doc_time:.2f}s")
-    
-        # Step 8: Chunk text
-        logger.info("Step 8: Chunking text...")
-        chunk_start = time.time()
-        chunks = chunk_text(text)
-        chunk_time = time.time() - chunk_start
-        logger.info(f"Step 8: Created {len(chunks)} chunks in {chunk_time:.2f}s")
-        
-        if not chunks or len(chunks) == 0:
-            logger.error("Step 8: No chunks created")
-            raise ValueError("Failed to create text chunks from document")
-        
-        valid_chunks = [chunk for chunk in chunks if chunk and chunk.strip()]
-        if not valid_chunks:
-            logger.error("Step 8: All chunks are empty")
-            raise ValueError("All text chunks are empty")
-        
-        logger.info(f"Step 8: Valid chunks: {len(valid_chunks)}")
-        
-        # Step 9: Generate embeddings
-        logger.info("Step 9: Generating embeddings for chunks...")
-        embed_start = time.time()
-        try:
-            embeddings = generate_embeddings(valid_chunks, db)
-            embed_time = time.time() - embed_start
-            logger.info(f"Step 9: Generated {len(embeddings)} embeddings in {embed_time:.2f}s")
-        except Exception as embed_error:
-            logger.error(f"Step 9: Embedding generation error: {embed_error}", exc_info=True)
-            from app.services.embedding_service import _fallback_embedding
-            embeddings = []
-            for chunk in valid_chunks:
-                try:
-                    embeddings.append(_fallback_embedding(chunk))
-                except Exception as e:
-                    logger.warning(f"Fallback embedding failed: {e}, using zero vector")
-                    embeddings.append([0.0] * 384)
-        
-        if not embeddings or len(embeddings) == 0:
-            logger.error("Step 9: No embeddings generated")
-            raise ValueError("Failed to generate embeddings for document chunks")
-        
-        if len(embeddings) != len(valid_chunks):
-            logger.warning(f"Step 9: Embedding count mismatch: {len(embeddings)} vs {len(valid_chunks)}, fixing...")
-            from app.services.embedding_service import _fallback_embedding
-            if len(embeddings) < len(valid_chunks):
-                for i in range(len(embeddings), len(valid_chunks)):
-                    embeddings.append(_fallback_embedding(valid_chunks[i]))
-            else:
-                embeddings = embeddings[:len(valid_chunks)]
-            logger.info(f"Step 9: Fixed embedding count to {len(embeddings)}")
-        
-        # Step 10: Create chunk records
-        logger.info("Step 10: Creating chunk records in database...")
-        chunk_record_start = time.time()
-        chunk_count = 0
-        for idx, (chunk_content, embedding) in enumerate(zip(valid_chunks, embeddings)):
-            if not chunk_content or not chunk_content.strip():
-                continue
-            
-            if not embedding or len(embedding) == 0:
-                from app.services.embedding_service import _fallback_embedding
-                try:
-                    embedding = _fallback_embedding(chunk_content)
-                except Exception as e:
-                    logger.warning(f"Fallback embedding for chunk {idx} failed: {e}")
-                    embedding = [0.0] * 384
-            
-            chunk = DocumentChunk(
-                document_id=document.id,
-                chunk_text=chunk_content,
-                chunk_index=idx,
-                embedding_vector=embedding
-            )
-            db.add(chunk)
-            chunk_count += 1
-            
-            if chunk_count % 20 == 0:
-                logger.info(f"Step 10: Created {chunk_count}/{len(valid_chunks)} chunk records...")
-        
-        chunk_record_time = time.time() - chunk_record_start
-        logger.info(f"Step 10: Created {chunk_count} chunk records in {chunk_record_time:.2f}s")
-        
-        # Step 11: Commit to database
-        if chunk_count > 0:
-            logger.info("Step 11: Committing transaction to database...")
-            commit_start = time.time()
-            try:
-                db.commit()
-                commit_time = time.time() - commit_start
-                logger.info(f"Step 11: Database commit successful in {commit_time:.2f}s")
-                
-                db.refresh(document)
-                total_time = time.time() - process_start
-                logger.info(f"=== Upload process completed successfully ===")
-                logger.info(f"Document ID: {document.id}")
-                logger.info(f"Total chunks: {chunk_count}")
-                logger.info(f"Total processing time: {total_time:.2f}s")
-                return document
-            except Exception as commit_error:
-                logger.error(f"Step 11: Database commit failed: {commit_error}", exc_info=True)
-                db.rollback()
-                raise ValueError(f"Database commit failed: {str(commit_error)}")
-        else:
-            logger.error("Step 11: No chunks to commit")
-            raise ValueError("No valid chunks were created")
-    
+        db.commit()
+        db.refresh(document)
+    except Exception:
+        db.rollback()
+        os.remove(file_path)
+        raise
+    logger.info(f"Document record created (ID: {document.id}), ingestion pending")
+    return document
+
+def _set_progress(db: Session, document: Document, progress: int):
+    document.progress = progress
+    db.commit()
+
+def ingest_document(db: Session, document: Document, replace: bool = False) -> int:
+    """
+    Extract, chunk, embed and store a document created by ``process_uploaded_file``.
+
+    Progress is committed on the document row between stages; chunks become
+    visible to search in a single final commit. With ``replace`` the document's
+    existing chunks are swapped out in that same commit (re-indexing).
+    Returns the number of chunks.
+    """
+    process_start = time.time()
+    organization_id = document.organization_id
+    document_id = document.id
+    logger.info(f"=== Starting ingestion of document {document_id} ({document.filename}) ===")
+
+    # Stages 1-3: Extract pages -> chunk -> embed, streamed in embedding batches
+    page_count = count_pages(document.file_path, document.file_type)
+    pages_read = 0
+
+    def pages():
+        nonlocal pages_read
+        for page in iter_pages(document.file_path, document.file_type, page_count):
+            pages_read += 1
+            yield page
+
+    stream_start = time.time()
+    embedded = []
+    chunks = iter_chunks(pages(), CHUNK_SIZE, CHUNK_OVERLAP, settings.chunk_unit)
+    try:
+        for batch in _batched(chunks, max(1, settings.embedding_batch_size)):
+            embeddings = generate_embeddings([chunk.text for chunk in batch], db)
+            if len(embeddings) != len(batch):
+                raise ValueError(f"Embedding count mismatch: {len(embeddings)} vs {len(batch)}")
+            embedded.extend(zip(batch, embeddings))
+            _set_progress(db, document, 10 + 70 * min(pages_read, page_count) // max(page_count, 1))
+    except ValueError:
+        raise
     except Exception as e:
-        total_time = time.time() - process_start
-        logger.error(f"=== Upload process FAILED after {total_time:.2f}s ===")
-        logger.error(f"Error: {str(e)}", exc_info=True)
-        
+        raise ValueError(f"Error processing document content: {str(e)}")
+
+    text_length = sum(len(chunk.text) for chunk, _ in embedded)
+    if text_length == 0:
+        raise ValueError("Could not extract text from file or file is empty")
+    if text_length < 10:
+        raise ValueError("Extracted text is too short (minimum 10 characters required)")
+    logger.info(
+        f"Stages 1-3: {pages_read} pages -> {len(embedded)} chunks embedded in {time.time() - stream_start:.2f}s"
+    )
+
+    # Stage 4: Bulk-insert chunks and keyword postings (visible to search on commit)
+    store_start = time.time()
+    rows = [
+        {
+            "document_id": document_id,
+            "chunk_text": text_chunk.text,
+            "chunk_index": idx,
+            "page_start": text_chunk.page_start,
+            "page_end": text_chunk.page_end,
+            **embedding_columns(embedding)
+        }
+        for idx, (text_chunk, embedding) in enumerate(embedded)
+    ]
+    try:
+        old_chunk_ids = []
+        if replace:
+            old_chunk_ids = [
+                chunk_id for (chunk_id,) in db.query(DocumentChunk.id).filter(DocumentChunk.document_id == document_id)
+            ]
+            db.query(ChunkTerm).filter(ChunkTerm.document_id == document_id).delete(synchronize_session=False)
+        # New rows go in before the old ones are deleted so chunk ids are never reused
+        chunk_ids = bulk_insert_chunks(db, rows)
+        if old_chunk_ids:
+            db.query(DocumentChunk).filter(DocumentChunk.id.in_(old_chunk_ids)).delete(synchronize_session=False)
+        analyzed = analyze_chunks((chunk_id, row["chunk_text"]) for chunk_id, row in zip(chunk_ids, rows))
+        store_postings(db, build_postings(organization_id, document_id, analyzed))
+        document.status = DocumentStatus.READY
+        document.progress = 100
+        document.error = None
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(f"Stage 4: Stored {len(rows)} chunks in {time.time() - store_start:.2f}s")
+
+    version = RagAnswerCache.bump_corpus_version(organization_id)
+    if replace:
+        # Old rows are gone from the DB; let the next query rebuild both indexes
+        VectorIndexRegistry.invalidate(organization_id)
+        KeywordIndexRegistry.invalidate(organization_id)
+    else:
+        VectorIndexRegistry.add_chunks(
+            organization_id,
+            chunk_ids,
+            [document_id] * len(chunk_ids),
+            [row["chunk_index"] for row in rows],
+            [embedding for _, embedding in embedded],
+            version
+        )
+        KeywordIndexRegistry.add_chunks(organization_id, document_id, analyzed, version)
+
+    logger.info(f"=== Ingestion of document {document_id} completed in {time.time() - process_start:.2f}s ===")
+    return len(rows)
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def process_document_ingestion(db: Session, payload: Dict) -> Dict:
+    """
+    Background Task Handler for document ingestion.
+    """
+    document_id = payload.get("document_id")
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if not document:
+        raise ValueError(f"Document {document_id} not found in database.")
+    if document.status == DocumentStatus.READY:
+        return {"document_id": document_id, "status": document.status}
+
+    document.status = DocumentStatus.PROCESSING
+    document.progress = 0
+    document.error = None
+    db.commit()
+
+    try:
+        chunk_count = ingest_document(db, document)
+    except Exception as e:
+        logger.error(f"Ingestion of document {document_id} failed: {e}", exc_info=True)
+        db.rollback()
+        document.status = DocumentStatus.FAILED
+        document.error = str(e)
+        db.commit()
+        raise
+    return {"document_id": document_id, "status": document.status, "chunks": chunk_count}
+
+def process_document_reindex(db: Session, payload: Dict) -> Dict:
+    """
+    Background Task Handler for re-indexing documents (e.g. after changing the
+    embedding backend or chunk settings). Payload: ``document_ids`` or
+    ``organization_id`` (all ready documents of the organization).
+    """
+    query = db.query(Document).filter(Document.status == DocumentStatus.READY)
+    if payload.get("document_ids"):
+        query = query.filter(Document.id.in_(payload["document_ids"]))
+    elif payload.get("organization_id"):
+        query = query.filter(Document.organization_id == payload["organization_id"])
+    else:
+        raise ValueError("Reindex payload needs document_ids or organization_id")
+
+    reindexed, failed = [], []
+    for document in query.order_by(Document.id).all():
         try:
+            document.status = DocumentStatus.PROCESSING
+            document.progress = 0
+            db.commit()
+            ingest_document(db, document, replace=True)
+            reindexed.append(document.id)
+        except Exception as e:
+            # The old chunks are still in place; the document stays searchable
+            logger.error(f"Reindex of document {document.id} failed: {e}", exc_info=True)
             db.rollback()
-            logger.info("Database transaction rolled back")
-        except Exception as rollback_error:
-            logger.error(f"Rollback failed: {rollback_error}")
-        
-        if 'document' in locals() and document.id:
-            try:
-                logger.info(f"Cleaning up document record {document.id}")
-                db.delete(document)
-                db.commit()
-            except Exception as cleanup_error:
-                logger.error(f"Document cleanup failed: {cleanup_error}")
-                db.rollback()
-        
-        if 'file_path' in locals() and os.path.exists(file_path):
-            try:
-                logger.info(f"Removing file: {file_path}")
-                os.remove(file_path)
-            except Exception as file_cleanup_error:
-                logger.error(f"File cleanup failed: {file_cleanup_error}")
-        
-        error_msg = str(e)
-        logger.error(f"Raising error: {error_msg}")
-        raise ValueError(f"Error processing document: {error_msg}")
+            document.status = DocumentStatus.READY
+            document.progress = 100
+            document.error = f"Reindex failed: {e}"
+            db.commit()
+            failed.append(document.id)
+    return {"reindexed": reindexed, "failed": failed}
 
-def query_documents(
+def retrieve_context(
     question: str,
     organization_id: int,
     db: Session,
     top_k: int = 5,
     document_ids: Optional[List[int]] = None
 ) -> Dict:
-    """Query documents using RAG with enterprise trust metadata."""
-    from app.services.embedding_service import generate_embeddings, hybrid_search
-    from app.schemas.trust import TrustMetadata, SourceCitation, ConfidenceLevel
+    """
+    Retrieval half of the RAG pipeline. Returns one of:
+
+        {"cached": <query_documents result>}   answer cache hit
+        {"fallback": TrustMetadata}            nothing to answer from
+        {"sources", "context_chunks", "similar_embedding", "corpus_version"}
+    """
+    from app.schemas.trust import TrustMetadata
+    
+    # Cached answers skip embedding (exact match), search and the model call
+    corpus_version = RagAnswerCache.corpus_version(organization_id)
+    cached = RagAnswerCache.get(organization_id, question, document_ids, version=corpus_version)
+    if cached is not None:
+        return {"cached": _cached_answer(cached)}
     
     query_embeddings = generate_embeddings([question], db)
     query_embedding = query_embeddings[0] if query_embeddings else None
+    # Near-duplicate matching only makes sense when embedding similarity is meaningful
+    similar_embedding = query_embedding if query_embedding and get_embedding_backend().semantic else None
+    
+    if similar_embedding:
+        cached = RagAnswerCache.get_similar(organization_id, similar_embedding, document_ids, version=corpus_version)
+        if cached is not None:
+            return {"cached": _cached_answer(cached)}
     
     if not query_embedding:
         # Fallback: Unable to process
-        trust = TrustMetadata.fallback("Unable to process your query. Please try again.")
-        return {
-            "answer": trust.fallback_reason,
-            "sources": [],
-            "confidence": 0.0,
-            "trust": trust.model_dump()
-        }
+        return {"fallback": TrustMetadata.fallback("Unable to process your query. Please try again.")}
     
-    results = hybrid_search(question, query_embedding, organization_id, db, top_k)
+    results = hybrid_search(question, query_embedding, organization_id, db, top_k, document_ids)
     
     if not results:
         # Fallback: No relevant information
-        trust = TrustMetadata.fallback("I couldn't find this information in the available documents.")
-        return {
-            "answer": trust.fallback_reason,
-            "sources": [],
-            "confidence": 0.0,
-            "trust": trust.model_dump()
-        }
+        return {"fallback": TrustMetadata.fallback("I couldn't find this information in the available documents.")}
     
-    from app.models.document import Document
+    # Merge overlapping neighbours, drop near-duplicates and fit the token budget
+    passages = pack_context(results)
+    # Cite only the chunks that made it into the prompt
+    packed_chunks = {
+        (passage["document_id"], chunk_index) for passage in passages for chunk_index in passage["chunk_indexes"]
+    }
+
+    # Retrieval results already carry document metadata (see embedding_service._attach_chunk_details)
     sources = []
-    context_chunks = []
     
     for result in results:
-        doc = db.query(Document).filter(Document.id == result["document_id"]).first()
-        if doc:
-            # Include snippet (first 200 chars of chunk)
-            snippet = result.get("chunk_text", "")[:200] + "..." if len(result.get("chunk_text", "")) > 200 else result.get("chunk_text", "")
-            
-            # Include version info (with upload date fallback)
-            version = doc.version if hasattr(doc, 'version') and doc.version else f"Uploaded {doc.upload_date.strftime('%Y-%m-%d')}"
-            
-            sources.append({
-                "document_id": doc.id,
-                "filename": doc.filename,
-                "chunk_index": result["chunk_index"],
-                "similarity": result.get("similarity", 0.0),
-                "combined_score": result.get("combined_score", 0.0),
-                "snippet": snippet,
-                "version": version
-            })
-            context_chunks.append(result["chunk_text"])
+        if (result["document_id"], result["chunk_index"]) not in packed_chunks:
+            continue
+        chunk_text = result.get("chunk_text", "")
+        # Include snippet (first 200 chars of chunk)
+        snippet = chunk_text[:200] + "..." if len(chunk_text) > 200 else chunk_text
+        
+        # Include version info (with upload date fallback)
+        upload_date = result.get("upload_date")
+        version = result.get("version") or (f"Uploaded {upload_date.strftime('%Y-%m-%d')}" if upload_date else None)
+        
+        sources.append({
+            "document_id": result["document_id"],
+            "filename": result["filename"],
+            "chunk_index": result["chunk_index"],
+            "similarity": result.get("similarity", 0.0),
+            "combined_score": result.get("combined_score", 0.0),
+            "snippet": snippet,
+            "version": version
+        })
+    
+    context_chunks = [passage["text"] for passage in passages]
+    
+    return {
+        "sources": sources,
+        "context_chunks": context_chunks,
+        "similar_embedding": similar_embedding,
+        "corpus_version": corpus_version
+    }
+
+def query_documents(
+    question: str,
+    organization_id: int,
+    db: Session,
+    top_k: int = 5,
+    document_ids: Optional[List[int]] = None
+) -> Dict:
+    """Query documents using RAG with enterprise trust metadata."""
+    context = retrieve_context(question, organization_id, db, top_k, document_ids)
+    if "cached" in context:
+        return context["cached"]
+    if "fallback" in context:
+        return _fallback_answer(context["fallback"])
     
-    answer, confidence = generate_rag_answer(question, context_chunks)
+    answer, confidence = generate_rag_answer(question, context["context_chunks"], organization_id=organization_id)
+    return complete_answer(question, organization_id, context, answer, confidence, document_ids)
+
+def stream_query_documents(
+    question: str,
+    organization_id: int,
+    db: Session,
+    top_k: int = 5,
+    document_ids: Optional[List[int]] = None
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming variant of ``query_documents``. Yields ``("sources", [...])`` as
+    soon as retrieval is done, then ``("token", text)`` for each piece of the
+    answer as the model produces it, and finally ``("done", result)`` with the
+    same result dict ``query_documents`` returns.
+    """
+    context = retrieve_context(question, organization_id, db, top_k, document_ids)
+    if "cached" in context or "fallback" in context:
+        result = context["cached"] if "cached" in context else _fallback_answer(context["fallback"])
+        yield "sources", result["sources"]
+        yield "token", result["answer"]
+        yield "done", result
+        return
     
+    yield "sources", context["sources"]
+    
+    parts = []
+    try:
+        for token in AIOrchestrator.stream_model(
+            build_rag_messages(question, context["context_chunks"]),
+            temperature=0.3,
+            domain=AIDomain.DOCUMENTS,
+            organization_id=organization_id
+        ):
+            parts.append(token)
+            yield "token", token
+        answer = "".join(parts)
+        confidence = rag_confidence(answer)
+    except Exception as e:
+        logger.error(f"Streaming RAG answer failed after {len(parts)} tokens: {e}")
+        error = f"Error generating answer: {str(e)}"
+        yield "token", ("\n\n" if parts else "") + error
+        answer = "".join(parts) + ("\n\n" if parts else "") + error
+        confidence = 0.0
+    
+    yield "done", complete_answer(question, organization_id, context, answer, confidence, document_ids)
+
+def complete_answer(
+    question: str,
+    organization_id: int,
+    context: Dict,
+    answer: str,
+    confidence: float,
+    document_ids: Optional[List[int]] = None
+) -> Dict:
+    """Attach trust metadata to a generated answer and store it in the answer cache."""
+    from app.schemas.trust import TrustMetadata, SourceCitation
+    
+    sources = context["sources"]
     # Build trust metadata object locally
     trust = TrustMetadata.from_score(
         score=confidence,
@@ -393,6 +472,16 @@ def query_documents(
         sources=[SourceCitation(**s) for s in sources]
     )
     
+    if confidence > 0:
+        RagAnswerCache.set(
+            organization_id,
+            question,
+            context["similar_embedding"],
+            {"answer": answer, "sources": sources, "confidence": confidence, "trust": trust.model_dump()},
+            document_ids,
+            version=context["corpus_version"]
+        )
+    
     return {
         "answer": answer,
         "sources": sources,
@@ -400,17 +489,32 @@ def query_documents(
         "trust_metadata_obj": trust # Pass the object back for the service to use
     }
 
+def _fallback_answer(trust) -> Dict:
+    return {
+        "answer": trust.fallback_reason,
+        "sources": [],
+        "confidence": 0.0,
+        "trust": trust.model_dump()
+    }
+
+def _cached_answer(cached: Dict) -> Dict:
+    from app.schemas.trust import TrustMetadata
+    return {
+        "answer": cached["answer"],
+        "sources": cached["sources"],
+        "confidence": cached["confidence"],
+        "trust_metadata_obj": TrustMetadata(**cached["trust"])
+    }
 
-def generate_rag_answer(question: str, context_chunks: List[str]) -> tuple[str, float]:
-    """Generate answer using RAG with OpenRouter."""
-    from app.services.openrouter_client import call_openrouter
-    
+
+def build_rag_messages(question: str, context_chunks: List[str]) -> List[Dict[str, str]]:
+    """Prompt for answering ``question`` from retrieved chunks."""
     context = "\n\n".join([
         f"[Document Chunk {i+1}]:\n{chunk}"
         for i, chunk in enumerate(context_chunks)
     ])
     
-    messages = [
+    return [
         {
             "role": "system",
             "content": "You are a helpful assistant that answers questions based on provided document context. Always cite which document chunk you used. If the context doesn't contain the answer, say so clearly."
@@ -420,11 +524,22 @@ def generate_rag_answer(question: str, context_chunks: List[str]) -> tuple[str,
             "content": f"Context from documents:\n\n{context}\n\nQuestion: {question}\n\nProvide a clear answer based on the context above. If the answer is not in the context, state that clearly."
         }
     ]
+
+def rag_confidence(answer: str) -> float:
+    return min(1.0, len(answer) / 200.0)
+
+def generate_rag_answer(
+    question: str, context_chunks: List[str], organization_id: Optional[int] = None
+) -> tuple[str, float]:
+    """Generate answer using RAG through the AI gateway."""
+    messages = build_rag_messages(question, context_chunks)
     
     try:
-        answer = call_openrouter(messages, temperature=0.3)
-        confidence = min(1.0, len(answer) / 200.0)
-        return answer, confidence
+        answer = AIOrchestrator.call_model(
+            messages, temperature=0.3, json_output=False, domain=AIDomain.DOCUMENTS,
+            organization_id=organization_id
+        )
+        return answer, rag_confidence(answer)
     except Exception as e:
         return f"Error generating answer: {str(e)}", 0.0
 
@@ -444,8 +559,12 @@ def delete_document(document_id: int, organization_id: int, db: Session) -> bool
         except:
             pass
     
+    db.query(ChunkTerm).filter(ChunkTerm.document_id == document_id).delete()
     db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete()
     db.delete(document)
     db.commit()
     
+    version = RagAnswerCache.bump_corpus_version(organization_id)
+    VectorIndexRegistry.remove_documents(organization_id, [document_id], version)
+    KeywordIndexRegistry.remove_documents(organization_id, [document_id], version)
     return True
\ No newline at end of file
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 from fastapi import UploadFile
 from app.services.base import BaseService
 from app.services.ai_orchestrator import AIOrchestrator, AIDomain
-from app.core.cache import cache_ai_response
+from app.core.cache import CacheManager, cache_ai_response, collapse_whitespace
 from app.models.document import Document
 from app.models.document_chunk import DocumentChunk
 from app.services.embedding_service import generate_embeddings, hybrid_search
@@ -13,7 +13,9 @@ from app.services.embedding_service import generate_embeddings, hybrid_search
 class DocumentService(BaseService):
     """Domain service for handling documents and search."""
 
-    @cache_ai_response(AIDomain.DOCUMENTS)
+    @cache_ai_response(AIDomain.DOCUMENTS, key={
+        "question": collapse_whitespace, "organization_id": None, "top_k": None
+    }, tags=lambda args: [CacheManager.tag("corpus", args["organization_id"])])
     def query(self, question: str, organization_id: int, top_k: int = 5) -> Dict[str, Any]:
         self.log_info(f"Querying documents for organization {organization_id}: {question[:50]}...")
         
@@ -0,0 +1,74 @@
+"""
+Compact binary encoding for stored embeddings.
+
+Vectors are written as an 8-byte header followed by raw little-endian values:
+
+    b"EMB" | format code (1 byte) | float32 scale (4 bytes) | payload
+
+float32 blobs decode zero-copy via ``numpy.frombuffer``; float16 halves the
+size again and int8 (symmetric, per-vector scale) quarters it.
+"""
+import struct
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+
+MAGIC = b"EMB"
+HEADER = struct.Struct("<3sBf")
+
+_FORMATS = {
+    "float32": (1, np.dtype("<f4")),
+    "float16": (2, np.dtype("<f2")),
+    "int8": (3, np.dtype("i1")),
+}
+_DTYPES_BY_CODE = {code: dtype for code, dtype in _FORMATS.values()}
+
+STORAGE_FORMATS = tuple(_FORMATS) + ("pickle",)
+
+
+def encode_embedding(vector: Sequence[float], storage: Optional[str] = None) -> bytes:
+    """Pack a vector into a binary blob using ``storage`` (defaults to settings.embedding_storage)."""
+    storage = storage or settings.embedding_storage
+    if storage not in _FORMATS:
+        raise ValueError(f"Unsupported embedding storage format: {storage}")
+    code, dtype = _FORMATS[storage]
+    values = np.asarray(vector, dtype=np.float32)
+    scale = 1.0
+    if storage == "int8":
+        peak = float(np.max(np.abs(values))) if values.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        values = np.clip(np.rint(values / scale), -127, 127)
+    return HEADER.pack(MAGIC, code, scale) + values.astype(dtype).tobytes()
+
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    """Unpack a blob into a float32 vector (read-only view for float32 blobs)."""
+    magic, code, scale = HEADER.unpack_from(blob)
+    if magic != MAGIC or code not in _DTYPES_BY_CODE:
+        raise ValueError("Not an encoded embedding")
+    values = np.frombuffer(blob, dtype=_DTYPES_BY_CODE[code], offset=HEADER.size)
+    if values.dtype == np.float32:
+        return values
+    values = values.astype(np.float32)
+    if scale != 1.0:
+        values *= scale
+    return values
+
+
+def read_embedding(blob: Optional[bytes], legacy_vector: Optional[List[float]] = None) -> Optional[np.ndarray]:
+    """Return the stored vector, preferring the binary column over the legacy pickled one."""
+    if blob:
+        return decode_embedding(blob)
+    if legacy_vector:
+        return np.asarray(legacy_vector, dtype=np.float32)
+    return None
+
+
+def embedding_columns(vector: Sequence[float], storage: Optional[str] = None) -> Dict[str, Any]:
+    """Column values for a model with ``embedding_vector``/``embedding_blob`` columns."""
+    storage = storage or settings.embedding_storage
+    if storage == "pickle":
+        return {"embedding_vector": list(vector), "embedding_blob": None}
+    return {"embedding_vector": None, "embedding_blob": encode_embedding(vector, storage)}
@@ -0,0 +1,186 @@
+"""
+Memory-mapped, per-organization embedding segment files.
+
+Each organization gets a directory under ``<cache_dir>/embeddings``:
+
+    manifest.json          {"generation", "dim", "rows", "tombstones", "version"}
+    gen_<n>/vectors.f32    L2-normalized float32 rows, appended in place
+    gen_<n>/ids.i64        (chunk_id, document_id, chunk_index) per row
+    gen_<n>/tombstones.i64 deleted document ids
+
+Segments are opened with ``numpy.memmap`` so every uvicorn worker serves
+queries from the same page-cache-backed matrix instead of its own copy, and a
+fresh worker can search right after mapping the file rather than after a full
+DB scan. The manifest is replaced atomically and is the source of truth for
+how many rows are committed; bytes past that count (a torn append) are
+truncated by the next writer. Rewrites go to a new generation directory so
+readers holding an old mapping are never disturbed.
+"""
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_index import VectorIndex, normalize_rows
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: single-worker deployments only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_VECTOR_DTYPE = np.dtype("<f4")
+_ID_DTYPE = np.dtype("<i8")
+
+
+def _advance_version(manifest: dict, version: Optional[int]):
+    """Record ``version`` only if the segment reflected every change before it."""
+    if version is not None and manifest.get("version", 0) == version - 1:
+        manifest["version"] = version
+
+
+class SegmentStore:
+    """Append-only embedding segment for one organization."""
+
+    def __init__(self, organization_id: int, root: Optional[str] = None):
+        self.organization_id = organization_id
+        self.path = os.path.join(root or settings.vector_segments_dir, f"org_{organization_id}")
+
+    def open(self) -> Optional[VectorIndex]:
+        """Map the committed segment into a ``VectorIndex`` (None if never written)."""
+        manifest = self._read_manifest()
+        if manifest is None:
+            return None
+        rows, dim, version = manifest["rows"], manifest["dim"], manifest.get("version", 0)
+        if rows == 0:
+            return VectorIndex(dim, version)
+
+        gen_dir = self._generation_dir(manifest["generation"])
+        matrix = np.memmap(os.path.join(gen_dir, "vectors.f32"), dtype=_VECTOR_DTYPE, mode="r", shape=(rows, dim))
+        ids = np.memmap(os.path.join(gen_dir, "ids.i64"), dtype=_ID_DTYPE, mode="r", shape=(rows, 3))
+        alive = None
+        if manifest["tombstones"]:
+            tombstones = np.fromfile(
+                os.path.join(gen_dir, "tombstones.i64"), dtype=_ID_DTYPE, count=manifest["tombstones"]
+            )
+            alive = ~np.isin(ids[:, 1], tombstones)
+        return VectorIndex.from_arrays(matrix, ids[:, 0], ids[:, 1], ids[:, 2], alive, version)
+
+    def write(self, index: VectorIndex):
+        """Rewrite the segment from the live rows of ``index`` (also compacts tombstones)."""
+        matrix, chunk_ids, document_ids, chunk_indexes = index.export()
+        with self._locked():
+            previous = self._read_manifest()
+            generation = previous["generation"] + 1 if previous else 1
+            gen_dir = self._generation_dir(generation)
+            os.makedirs(gen_dir, exist_ok=True)
+            np.ascontiguousarray(matrix, dtype=_VECTOR_DTYPE).tofile(os.path.join(gen_dir, "vectors.f32"))
+            np.column_stack([chunk_ids, document_ids, chunk_indexes]).astype(_ID_DTYPE).tofile(
+                os.path.join(gen_dir, "ids.i64")
+            )
+            open(os.path.join(gen_dir, "tombstones.i64"), "wb").close()
+            self._write_manifest({
+                "generation": generation,
+                "dim": int(index.dim or matrix.shape[1]),
+                "rows": int(matrix.shape[0]),
+                "tombstones": 0,
+                "version": index.version,
+            })
+            if previous:
+                shutil.rmtree(self._generation_dir(previous["generation"]), ignore_errors=True)
+        logger.info(f"Wrote embedding segment for organization {self.organization_id} ({matrix.shape[0]} rows)")
+
+    def append(
+        self,
+        chunk_ids: Sequence[int],
+        document_ids: Sequence[int],
+        chunk_indexes: Sequence[int],
+        vectors,
+        version: Optional[int] = None,
+    ) -> bool:
+        """
+        Append rows to the current segment, committed under corpus ``version``.
+        Returns False if there is no segment to append to.
+        """
+        if len(chunk_ids) == 0:
+            return True
+        matrix = normalize_rows(vectors)
+        with self._locked():
+            manifest = self._read_manifest()
+            if manifest is None or matrix.shape[1] != manifest["dim"]:
+                return False
+            gen_dir = self._generation_dir(manifest["generation"])
+            ids = np.column_stack([chunk_ids, document_ids, chunk_indexes]).astype(_ID_DTYPE)
+            self._append_file(os.path.join(gen_dir, "vectors.f32"), manifest["rows"] * manifest["dim"] * 4, matrix)
+            self._append_file(os.path.join(gen_dir, "ids.i64"), manifest["rows"] * 3 * 8, ids)
+            manifest["rows"] += matrix.shape[0]
+            _advance_version(manifest, version)
+            self._write_manifest(manifest)
+        return True
+
+    def remove_documents(self, document_ids: Iterable[int], version: Optional[int] = None) -> bool:
+        """Tombstone documents in the current segment. Returns False if there is no segment."""
+        ids = np.fromiter((int(d) for d in document_ids), dtype=_ID_DTYPE)
+        with self._locked():
+            manifest = self._read_manifest()
+            if manifest is None:
+                return False
+            path = os.path.join(self._generation_dir(manifest["generation"]), "tombstones.i64")
+            self._append_file(path, manifest["tombstones"] * 8, ids)
+            manifest["tombstones"] += int(ids.size)
+            _advance_version(manifest, version)
+            self._write_manifest(manifest)
+        return True
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    @staticmethod
+    def _append_file(path: str, committed_bytes: int, array: np.ndarray):
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            f.truncate(committed_bytes)
+            f.seek(committed_bytes)
+            f.write(np.ascontiguousarray(array).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _generation_dir(self, generation: int) -> str:
+        return os.path.join(self.path, f"gen_{generation}")
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.path, "manifest.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"Corrupt embedding segment manifest for organization {self.organization_id}")
+            return None
+
+    def _write_manifest(self, manifest: dict):
+        target = os.path.join(self.path, "manifest.json")
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+
+    @contextmanager
+    def _locked(self):
+        """Serialize writers across worker processes."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
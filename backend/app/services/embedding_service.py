@@ -1,8 +1,22 @@
+import abc
 import hashlib
+import heapq
 import math
-from typing import List, Optional
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.document import Document
 from app.models.document_chunk import DocumentChunk
+from app.models.embedding_cache import EmbeddingCache
+from app.services.embedding_codec import embedding_columns, read_embedding
+from app.services.keyword_index import KeywordIndexRegistry, tokenize
+from app.services.vector_index import VectorIndexRegistry, corpus_signature
 import logging
 import time
 
@@ -11,39 +25,246 @@ logger = logging.getLogger(__name__)
 # Embedding dimensions (using a standard size)
 EMBEDDING_DIM = 384  # Can be adjusted based on model
 
+# Hashes per IN query when reading the embeddings cache
+CACHE_LOOKUP_BATCH = 500
+
+# Hybrid search score weights (semantic weighted more)
+SEMANTIC_WEIGHT = 0.7
+KEYWORD_WEIGHT = 0.3
+
 def generate_text_hash(text: str) -> str:
     """Generate hash for text to use as cache key."""
     return hashlib.md5(text.encode()).hexdigest()
 
+class EmbeddingBackend(abc.ABC):
+    """
+    Turns a batch of texts into a ``(len(texts), dim)`` float32 matrix.
+
+    ``cache_namespace`` keeps vectors from different backends (or model files)
+    apart in ``embeddings_cache``. ``semantic`` is False for backends whose
+    similarities carry no meaning (near-duplicate matching is skipped).
+    """
+    name = "base"
+    dim = EMBEDDING_DIM
+    semantic = True
+
+    @property
+    def cache_namespace(self) -> str:
+        return self.name
+
+    @abc.abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+class HashEmbeddingBackend(EmbeddingBackend):
+    """Deterministic SHA-256 embeddings. No semantics; used for tests and as the fallback."""
+    name = "hash"
+    semantic = False
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return _fallback_embeddings(texts)
+
+class NumpyEmbeddingBackend(EmbeddingBackend):
+    """
+    CPU-only local model: hashed TF-IDF term vector times a dense projection.
+
+    The ``.npz`` file holds ``idf`` (buckets,) and ``projection`` (buckets, dim)
+    and is produced by ``scripts/train_embedding_model.py``. A batch is embedded
+    with a single matrix multiply.
+    """
+    name = "numpy"
+
+    def __init__(self, model_path: str):
+        with open(model_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with np.load(model_path) as model:
+            self.idf = model["idf"].astype(np.float32)
+            self.projection = np.ascontiguousarray(model["projection"], dtype=np.float32)
+        self.buckets, self.dim = self.projection.shape
+        self._namespace = f"numpy:{digest}"
+        logger.info(f"Loaded embedding model {model_path} ({self.buckets} buckets, {self.dim} dims)")
+
+    @property
+    def cache_namespace(self) -> str:
+        return self._namespace
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return hashed_term_matrix(texts, self.buckets, self.idf) @ self.projection
+
+EMBEDDING_BACKENDS = {
+    "hash": lambda: HashEmbeddingBackend(),
+    "numpy": lambda: NumpyEmbeddingBackend(settings.embedding_model_path),
+}
+
+_backend: Optional[EmbeddingBackend] = None
+_backend_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """Return the configured backend, loading its model once per process."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                factory = EMBEDDING_BACKENDS.get(settings.embedding_backend)
+                try:
+                    if factory is None:
+                        raise ValueError(f"Unknown embedding backend: {settings.embedding_backend}")
+                    _backend = factory()
+                except Exception as e:
+                    logger.error(f"Could not load embedding backend '{settings.embedding_backend}', using hash embeddings: {e}")
+                    _backend = HashEmbeddingBackend()
+    return _backend
+
+def set_embedding_backend(backend: Optional[EmbeddingBackend]):
+    """Replace the process-wide backend (None reloads it from settings on next use)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+def hashed_term_matrix(texts: List[str], buckets: int, idf: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Hashed bag-of-words features: one row per text, ``1 + log(tf)`` weights
+    (times ``idf`` if given), L2-normalized.
+    """
+    features = np.zeros((len(texts), buckets), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token, count in Counter(tokenize(text)).items():
+            features[row, zlib.crc32(token.encode()) % buckets] += 1.0 + math.log(count)
+    if idf is not None:
+        features *= idf
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return features / norms
+
+def _cache_key(backend: EmbeddingBackend, text: str) -> str:
+    # Hash embeddings keep the plain text hash so existing cache rows stay valid
+    if backend.cache_namespace == "hash":
+        return generate_text_hash(text)
+    return generate_text_hash(f"{backend.cache_namespace}\0{text}")
+
 def generate_embeddings(texts: List[str], db: Session = None) -> List[List[float]]:
     """
-    Generate embeddings for a list of texts using fast hash-based method.
-    No caching - direct generation for speed and reliability.
+    Generate embeddings for a list of texts.
+
+    Inputs are deduplicated, looked up in ``embeddings_cache`` with batched IN
+    queries, and only the misses are computed by the configured backend in
+    batches of ``settings.embedding_batch_size`` (spread over
+    ``settings.embedding_workers`` threads). New vectors are inserted into the
+    cache in the caller's transaction, so re-uploading a mostly unchanged
+    document costs little more than the lookups.
     
     Args:
         texts: List of text strings to embed
-        db: Database session (not used, kept for compatibility)
+        db: Database session for the embedding cache (optional; no caching without it)
     
     Returns:
-        List of embedding vectors
+        List of embedding vectors, one per input text
     """
     start_time = time.time()
     logger.info(f"Generating embeddings for {len(texts)} texts")
-    
-    embeddings = []
+    if not texts:
+        return []
+
+    backend = get_embedding_backend()
+    hashes = {}
+    for text in texts:
+        if text not in hashes:
+            hashes[text] = _cache_key(backend, text)
+
+    vectors = _lookup_cached_embeddings(db, list(hashes.values()), backend.dim) if db is not None else {}
+    misses = [text for text, text_hash in hashes.items() if text_hash not in vectors]
+
+    batch_size = max(1, settings.embedding_batch_size)
+    batches = [misses[start:start + batch_size] for start in range(0, len(misses), batch_size)]
+    if len(batches) > 1 and settings.embedding_workers > 1:
+        results = _get_executor().map(lambda batch: _embed_batch(backend, batch), batches)
+    else:
+        results = (_embed_batch(backend, batch) for batch in batches)
+
+    computed = {}
+    for batch, matrix in zip(batches, results):
+        for text, vector in zip(batch, matrix):
+            computed[hashes[text]] = vector
+    vectors.update(computed)
+
+    if db is not None and computed:
+        _store_cached_embeddings(db, computed)
+
+    embeddings = [vectors[hashes[text]].tolist() for text in texts]
+    elapsed = time.time() - start_time
+    logger.info(
+        f"Generated {len(embeddings)} embeddings with '{backend.name}' in {elapsed:.2f}s "
+        f"({len(hashes)} unique, {len(hashes) - len(misses)} cached, {len(misses)} computed)"
+    )
+    return embeddings
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _backend_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.embedding_workers, thread_name_prefix="embedding"
+                )
+    return _executor
+
+def _embed_batch(backend: EmbeddingBackend, texts: List[str]) -> np.ndarray:
+    """Embed a batch of texts, degrading to per-text calls (then zero vectors) on errors."""
+    try:
+        return np.asarray(backend.embed(texts), dtype=np.float32)
+    except Exception as e:
+        logger.error(f"Batch embedding failed, embedding texts individually: {e}")
+    vectors = np.zeros((len(texts), backend.dim), dtype=np.float32)
     for i, text in enumerate(texts):
         try:
-            embedding = _fallback_embedding(text)
-            embeddings.append(embedding)
+            vectors[i] = backend.embed([text])[0]
         except Exception as e:
+            # Ultimate fallback: leave a zero vector
             logger.error(f"Error generating embedding for text {i}: {e}")
-            # Ultimate fallback: create a simple zero vector
-            embedding = [0.0] * EMBEDDING_DIM
-            embeddings.append(embedding)
-    
-    elapsed = time.time() - start_time
-    logger.info(f"Generated {len(embeddings)} embeddings in {elapsed:.2f}s")
-    return embeddings
+    return vectors
+
+def _lookup_cached_embeddings(db: Session, text_hashes: List[str], dim: int) -> Dict[str, np.ndarray]:
+    """Fetch cached vectors for the given hashes (one IN query per batch)."""
+    found = {}
+    for start in range(0, len(text_hashes), CACHE_LOOKUP_BATCH):
+        rows = db.query(
+            EmbeddingCache.text_hash, EmbeddingCache.embedding_blob, EmbeddingCache.embedding_vector
+        ).filter(EmbeddingCache.text_hash.in_(text_hashes[start:start + CACHE_LOOKUP_BATCH])).all()
+        for text_hash, blob, legacy in rows:
+            vector = read_embedding(blob, legacy)
+            if vector is not None and vector.shape[0] == dim:
+                found[text_hash] = vector
+    return found
+
+def _store_cached_embeddings(db: Session, vectors: Dict[str, np.ndarray]):
+    """Bulk-insert new cache rows, ignoring hashes another request inserted concurrently."""
+    rows = [{"text_hash": text_hash, **embedding_columns(vector)} for text_hash, vector in vectors.items()]
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    try:
+        with db.begin_nested():
+            if dialect_insert is not None:
+                statement = dialect_insert(EmbeddingCache).on_conflict_do_nothing(index_elements=["text_hash"])
+            else:
+                statement = insert(EmbeddingCache)
+            db.execute(statement, rows)
+    except Exception as e:
+        logger.warning(f"Could not store {len(rows)} embeddings in cache: {e}")
+
+def _fallback_embeddings(texts: List[str]) -> np.ndarray:
+    """Vectorized ``_fallback_embedding`` for a batch of texts."""
+    digests = b"".join(hashlib.sha256(text.encode()).digest() for text in texts)
+    width = min(32, EMBEDDING_DIM)
+    vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    vectors[:, :width] = np.frombuffer(digests, dtype=np.uint8).reshape(len(texts), 32)[:, :width] / 255.0
+    return vectors
 
 def _fallback_embedding(text: str) -> List[float]:
     """
@@ -89,10 +310,13 @@ def semantic_search(
 ) -> List[dict]:
     """
     Perform semantic search to find relevant document chunks.
+
+    Scores are computed against the organization's in-memory vector index
+    (see ``app.services.vector_index``); only the top_k chunk texts are read.
     
     Args:
         query_embedding: Query embedding vector
-        company_id: Company ID to filter documents
+        organization_id: Organization ID to filter documents
         db: Database session
         top_k: Number of results to return
         document_ids: Optional list of document IDs to search within
@@ -100,103 +324,83 @@ def semantic_search(
     Returns:
         List of dictionaries with chunk info and similarity scores
     """
-    from app.models.document import Document
-    
-    # Get all chunks for the organization
-    query = db.query(DocumentChunk).join(Document).filter(Document.organization_id == organization_id)
-    
-    if document_ids:
-        query = query.filter(DocumentChunk.document_id.in_(document_ids))
-    
-    chunks = query.all()
-    
-    # Calculate similarities
-    results = []
-    for chunk in chunks:
-        if chunk.embedding_vector:
-            similarity = cosine_similarity(query_embedding, chunk.embedding_vector)
-            results.append({
-                "chunk_id": chunk.id,
-                "document_id": chunk.document_id,
-                "chunk_text": chunk.chunk_text,
-                "chunk_index": chunk.chunk_index,
-                "similarity": similarity
-            })
-    
-    # Sort by similarity and return top_k
-    results.sort(key=lambda x: x["similarity"], reverse=True)
-    return results[:top_k]
+    index = VectorIndexRegistry.get(db, organization_id)
+    results = index.search(query_embedding, top_k, document_ids)
+    return _attach_chunk_details(results, db)
+
+def _attach_chunk_details(results: List[dict], db: Session) -> List[dict]:
+    """
+    Fill in chunk text, page range and document metadata (filename, version,
+    upload_date) for search hits with a single joined IN query. Hits whose
+    chunk has since been deleted are dropped.
+    """
+    if not results:
+        return results
+    rows = (
+        db.query(
+            DocumentChunk.id, DocumentChunk.chunk_text, DocumentChunk.page_start, DocumentChunk.page_end,
+            Document.filename, Document.version, Document.upload_date
+        )
+        .join(Document, Document.id == DocumentChunk.document_id)
+        .filter(DocumentChunk.id.in_([r["chunk_id"] for r in results]))
+        .all()
+    )
+    details = {row[0]: row for row in rows}
+    attached = []
+    for result in results:
+        row = details.get(result["chunk_id"])
+        if row is None:
+            continue
+        _, result["chunk_text"], result["page_start"], result["page_end"], \
+            result["filename"], result["version"], result["upload_date"] = row
+        attached.append(result)
+    return attached
 
 def hybrid_search(
     query_text: str,
     query_embedding: List[float],
     organization_id: int,
     db: Session,
-    top_k: int = 5
+    top_k: int = 5,
+    document_ids: Optional[List[int]] = None
 ) -> List[dict]:
     """
-    Perform hybrid search (semantic + keyword) for better results.
+    Perform hybrid search (semantic + BM25 keyword) for better results.
+
+    Both signals come from precomputed per-organization structures: the vector
+    index supplies cosine similarities and the keyword index supplies BM25
+    scores from its postings, so the corpus is never re-read or re-tokenized.
     
     Args:
         query_text: Original query text for keyword matching
         query_embedding: Query embedding vector
-        company_id: Company ID
+        organization_id: Organization ID
         db: Database session
         top_k: Number of results
+        document_ids: Optional list of document IDs to search within
     
     Returns:
         List of results with combined scores
     """
-    # Semantic search
-    semantic_results = semantic_search(query_embedding, organization_id, db, top_k * 2)
-    
-    # Keyword search (simple text matching)
-    from app.models.document import Document
-    query_words = set(query_text.lower().split())
-    
-    keyword_results = []
-    chunks = db.query(DocumentChunk).join(Document).filter(
-        Document.organization_id == organization_id
-    ).all()
-    
-    for chunk in chunks:
-        chunk_words = set(chunk.chunk_text.lower().split())
-        common_words = query_words.intersection(chunk_words)
-        keyword_score = len(common_words) / max(len(query_words), 1)
-        
-        if keyword_score > 0:
-            keyword_results.append({
-                "chunk_id": chunk.id,
-                "document_id": chunk.document_id,
-                "chunk_text": chunk.chunk_text,
-                "chunk_index": chunk.chunk_index,
-                "keyword_score": keyword_score
-            })
-    
-    # Combine results
-    combined = {}
-    for result in semantic_results:
-        chunk_id = result["chunk_id"]
-        combined[chunk_id] = {
-            **result,
-            "keyword_score": 0.0,
-            "combined_score": result["similarity"] * 0.7  # Weight semantic more
-        }
-    
-    for result in keyword_results:
-        chunk_id = result["chunk_id"]
-        if chunk_id in combined:
-            combined[chunk_id]["keyword_score"] = result["keyword_score"]
-            combined[chunk_id]["combined_score"] = (
-                combined[chunk_id]["similarity"] * 0.7 + result["keyword_score"] * 0.3
-            )
-        else:
-            combined[chunk_id] = {
-                **result,
-                "similarity": 0.0,
-                "combined_score": result["keyword_score"] * 0.3
-            }
-    
-    # Sort by combined score
-    final_results = sorted(combined.values(), key=lambda x: x["combined_score"], reverse=True)
-    return final_results[:top_k]
\ No newline at end of file
+    signature = corpus_signature(db, organization_id)
+    vector_index = VectorIndexRegistry.get(db, organization_id, signature)
+    keyword_index = KeywordIndexRegistry.get(db, organization_id, signature)
+
+    candidates = {
+        hit["chunk_id"]: hit
+        for hit in vector_index.search(query_embedding, top_k * 2, document_ids)
+    }
+    keyword_scores = keyword_index.score(query_text, document_ids)
+    best_keyword = max(keyword_scores.values(), default=0.0)
+    keyword_top = heapq.nlargest(top_k * 2, keyword_scores, key=keyword_scores.get)
+    keyword_only = [chunk_id for chunk_id in keyword_top if chunk_id not in candidates]
+    for hit in vector_index.lookup(query_embedding, keyword_only):
+        candidates[hit["chunk_id"]] = hit
+
+    for chunk_id, hit in candidates.items():
+        keyword_score = keyword_scores.get(chunk_id, 0.0) / best_keyword if best_keyword else 0.0
+        hit["keyword_score"] = keyword_score
+        hit["combined_score"] = hit["similarity"] * SEMANTIC_WEIGHT + keyword_score * KEYWORD_WEIGHT
+
+    final_results = sorted(candidates.values(), key=lambda x: x["combined_score"], reverse=True)
+    return _attach_chunk_details(final_results[:top_k], db)
@@ -1,4 +1,4 @@
-from app.services.openrouter_client import call_openrouter
+from app.services.ai_orchestrator import AIOrchestrator, AIDomain
 
 def answer_question(question: str, policies: list) -> str:
     """
@@ -31,4 +31,4 @@ def answer_question(question: str, policies: list) -> str:
         }
     ]
     
-    return call_openrouter(messages, temperature=0.7)
+    return AIOrchestrator.call_model(messages, temperature=0.7, json_output=False, domain=AIDomain.HELPDESK)
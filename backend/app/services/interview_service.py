@@ -2,12 +2,17 @@ import json
 from typing import List, Dict, Any, Tuple
 from app.services.base import BaseService
 from app.services.ai_orchestrator import AIOrchestrator, AIDomain
-from app.core.cache import cache_ai_response
+from app.core.cache import cache_ai_response, collapse_whitespace, text_key
+
+# Kits are generated from the job title until candidate resumes are wired in
+KIT_RESUME_PLACEHOLDER = "Experienced Python Developer..."
 
 class InterviewService(BaseService):
     """Domain service for handling interview-related business logic and AI coordination."""
     
-    @cache_ai_response(AIDomain.INTERVIEW)
+    @cache_ai_response(AIDomain.INTERVIEW, key={
+        "candidate_preferences": collapse_whitespace, "interviewer_availability": collapse_whitespace
+    })
     def suggest_slots(self, candidate_preferences: str, interviewer_availability: str) -> List[Dict[str, Any]]:
         self.log_info(f"Suggesting slots for candidate preferences: {candidate_preferences[:50]}...")
         
@@ -29,7 +34,7 @@ class InterviewService(BaseService):
             self.log_error(f"Failed to suggest slots: {e}")
             return []
 
-    @cache_ai_response(AIDomain.INTERVIEW)
+    @cache_ai_response(AIDomain.INTERVIEW, key={"job_title": collapse_whitespace, "candidate_resume": text_key(2000)})
     def generate_questions(self, job_title: str, candidate_resume: str) -> List[str]:
         system_prompt = (
             "You are an expert interviewer. Generate relevant interview questions based on the job title and candidate's background. "
@@ -44,7 +49,9 @@ class InterviewService(BaseService):
             self.log_error(f"Failed to generate questions: {e}")
             return ["Tell me about your experience.", "Why are you interested in this role?"]
 
-    @cache_ai_response(AIDomain.INTERVIEW)
+    @cache_ai_response(AIDomain.INTERVIEW, key={
+        "job_requirements": collapse_whitespace, "candidate_background": text_key(2000)
+    })
     def analyze_fit(self, job_requirements: str, candidate_background: str) -> Tuple[float, str]:
         system_prompt = (
             "You are an expert recruiter. Analyze how well a candidate fits the job requirements. "
@@ -61,6 +68,17 @@ class InterviewService(BaseService):
             return 50.0, "Analysis unavailable."
 
     def generate_interview_kit(self, job_title: str, candidate_resume: str) -> Dict[str, Any]:
+        try:
+            return self._interview_kit(job_title, candidate_resume)
+        except Exception as e:
+            self.log_error(f"Failed to generate kit: {e}")
+            return {"questions": [], "evaluation_criteria": []}
+
+    @cache_ai_response(
+        AIDomain.INTERVIEW, expire=24 * 3600, stale_after=3600,
+        key={"job_title": collapse_whitespace, "candidate_resume": text_key(2000)}
+    )
+    def _interview_kit(self, job_title: str, candidate_resume: str) -> Dict[str, Any]:
         system_prompt = """You are an Enterprise HR Strategist. Generate a structured interview kit.
         Respond in JSON format:
         {
@@ -68,12 +86,7 @@ class InterviewService(BaseService):
             "evaluation_criteria": [{"category": "...", "weight": 0.5, "description": "..."}]
         }"""
         user_content = f"Kit for: {job_title}\nResume: {candidate_resume[:2000]}"
-        
-        try:
-            return AIOrchestrator.analyze_text(system_prompt, user_content, domain=AIDomain.INTERVIEW)
-        except Exception as e:
-            self.log_error(f"Failed to generate kit: {e}")
-            return {"questions": [], "evaluation_criteria": []}
+        return AIOrchestrator.analyze_text(system_prompt, user_content, domain=AIDomain.INTERVIEW)
 
     @cache_ai_response(AIDomain.INTERVIEW)
     def analyze_consistency(self, feedbacks: List[Dict], job_title: str) -> Dict[str, Any]:
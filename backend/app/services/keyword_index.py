@@ -0,0 +1,286 @@
+"""
+BM25 keyword index over document chunks.
+
+Postings (term -> chunk ids with term frequencies) are persisted in the
+``chunk_terms`` table at ingest time and loaded once per organization into
+memory, so keyword scoring costs O(query terms x postings) instead of
+re-reading and tokenizing the whole corpus on every query.
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.chunk_term import ChunkTerm
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_cache import RagAnswerCache
+from app.services.vector_index import corpus_signature, embedded_chunks_filter
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in is it its
+may me my no not of on or our so than that the their them then there these they
+this to was we what when where which who will with you your
+""".split())
+
+# Posting row recorded for chunks with no terms (e.g. stopwords only) so they
+# count as indexed; never produced by ``tokenize``, so never matched.
+EMPTY_CHUNK_TERM = ""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens with common stopwords removed."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def term_frequencies(text: str) -> Tuple[Dict[str, int], int]:
+    """Return ({term: frequency}, total token count) for a chunk of text."""
+    tokens = tokenize(text)
+    return dict(Counter(tokens)), len(tokens)
+
+
+def analyze_chunks(chunks: Iterable[Tuple[int, str]]) -> List[Tuple[int, Dict[str, int], int]]:
+    """Tokenize (chunk_id, chunk_text) pairs into (chunk_id, frequencies, length)."""
+    return [(chunk_id, *term_frequencies(text)) for chunk_id, text in chunks]
+
+
+def build_postings(
+    organization_id: int,
+    document_id: int,
+    analyzed: Iterable[Tuple[int, Dict[str, int], int]],
+) -> List[dict]:
+    """
+    Build ``chunk_terms`` rows from ``analyze_chunks`` output. A chunk without
+    terms gets a single ``EMPTY_CHUNK_TERM`` row.
+    """
+    return [
+        {
+            "organization_id": organization_id,
+            "document_id": document_id,
+            "chunk_id": chunk_id,
+            "term": term,
+            "term_frequency": tf,
+            "chunk_length": length,
+        }
+        for chunk_id, frequencies, length in analyzed
+        for term, tf in (frequencies or {EMPTY_CHUNK_TERM: 0}).items()
+    ]
+
+
+def store_postings(db: Session, rows: List[dict]):
+    """Insert posting rows in the caller's transaction (executemany)."""
+    if rows:
+        db.execute(insert(ChunkTerm), rows)
+
+
+class KeywordIndex:
+    """In-memory BM25 postings for one organization."""
+
+    def __init__(self, version: int = 0):
+        self.version = version  # corpus version the postings reflect
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._chunk_terms: Dict[int, List[str]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._documents: Dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, chunk_id: int) -> bool:
+        return chunk_id in self._lengths
+
+    def signature(self) -> Tuple[int, int, int]:
+        """(chunk count, max chunk id, corpus version), comparable with ``corpus_signature``."""
+        with self._lock:
+            if not self._lengths:
+                return (0, 0, self.version)
+            return (len(self._lengths), max(self._lengths), self.version)
+
+    def advance_version(self, version: Optional[int]):
+        """Adopt ``version`` after applying the change that produced it (see ``VectorIndex``)."""
+        with self._lock:
+            if version is not None and self.version == version - 1:
+                self.version = version
+
+    def add(self, chunk_id: int, document_id: int, frequencies: Dict[str, int], length: int):
+        with self._lock:
+            if chunk_id in self._lengths:
+                self._remove_chunk(chunk_id)
+            for term, tf in frequencies.items():
+                self._postings.setdefault(term, {})[chunk_id] = tf
+            self._chunk_terms[chunk_id] = list(frequencies)
+            self._lengths[chunk_id] = length
+            self._documents[chunk_id] = document_id
+            self._total_length += length
+
+    def add_rows(self, rows: Iterable[dict]):
+        """Load ``chunk_terms`` rows (as produced by ``build_postings``)."""
+        grouped: Dict[int, Tuple[int, int, Dict[str, int]]] = {}
+        for row in rows:
+            entry = grouped.setdefault(row["chunk_id"], (row["document_id"], row["chunk_length"], {}))
+            if row["term"] != EMPTY_CHUNK_TERM:
+                entry[2][row["term"]] = row["term_frequency"]
+        for chunk_id, (document_id, length, frequencies) in grouped.items():
+            self.add(chunk_id, document_id, frequencies, length)
+
+    def remove_documents(self, document_ids: Iterable[int]) -> int:
+        wanted = set(int(d) for d in document_ids)
+        with self._lock:
+            chunk_ids = [c for c, d in self._documents.items() if d in wanted]
+            for chunk_id in chunk_ids:
+                self._remove_chunk(chunk_id)
+            return len(chunk_ids)
+
+    def score(self, query_text: str, document_ids: Optional[Iterable[int]] = None) -> Dict[int, float]:
+        """BM25 score for every chunk containing at least one query term."""
+        terms = set(tokenize(query_text))
+        wanted = set(document_ids) if document_ids else None
+        scores: Dict[int, float] = {}
+        with self._lock:
+            n = len(self._lengths)
+            if n == 0 or not terms:
+                return scores
+            avg_length = self._total_length / n or 1.0
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for chunk_id, tf in postings.items():
+                    if wanted is not None and self._documents[chunk_id] not in wanted:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def _remove_chunk(self, chunk_id: int):
+        for term in self._chunk_terms.pop(chunk_id, []):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id, 0)
+        self._documents.pop(chunk_id, None)
+
+
+def build_index(db: Session, organization_id: int) -> KeywordIndex:
+    """Load persisted postings; chunks indexed before ``chunk_terms`` existed are backfilled."""
+    version = RagAnswerCache.corpus_version(organization_id)  # before the scan, as in vector_index
+    chunk_ids = {cid for (cid,) in db.query(DocumentChunk.id).join(
+        Document, Document.id == DocumentChunk.document_id
+    ).filter(
+        Document.organization_id == organization_id,
+        embedded_chunks_filter()
+    ).all()}
+
+    index = KeywordIndex(version)
+    postings = db.query(
+        ChunkTerm.chunk_id, ChunkTerm.document_id, ChunkTerm.term, ChunkTerm.term_frequency, ChunkTerm.chunk_length
+    ).filter(ChunkTerm.organization_id == organization_id).all()
+    index.add_rows(
+        {"chunk_id": c, "document_id": d, "term": t, "term_frequency": tf, "chunk_length": length}
+        for c, d, t, tf, length in postings
+        if c in chunk_ids
+    )
+
+    missing = sorted(cid for cid in chunk_ids if cid not in index)
+    if missing:
+        _backfill(db, organization_id, missing, index)
+    return index
+
+
+def _backfill(db: Session, organization_id: int, chunk_ids: List[int], index: KeywordIndex):
+    """Tokenize chunks that have no postings yet and persist them in a separate transaction."""
+    logger.info(f"Backfilling keyword postings for {len(chunk_ids)} chunks (organization {organization_id})")
+    rows = []
+    for start in range(0, len(chunk_ids), 500):
+        batch = db.query(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.chunk_text).filter(
+            DocumentChunk.id.in_(chunk_ids[start:start + 500])
+        ).all()
+        for chunk_id, document_id, text in batch:
+            analyzed = analyze_chunks([(chunk_id, text)])
+            index.add(chunk_id, document_id, analyzed[0][1], analyzed[0][2])
+            rows.extend(build_postings(organization_id, document_id, analyzed))
+
+    writer = Session(bind=db.get_bind())
+    try:
+        store_postings(writer, rows)
+        writer.commit()
+    except Exception as e:
+        writer.rollback()
+        logger.warning(f"Could not persist backfilled postings: {e}")
+    finally:
+        writer.close()
+
+
+class KeywordIndexRegistry:
+    """Process-wide registry of organization keyword indexes (see ``VectorIndexRegistry``)."""
+    _indexes: Dict[int, KeywordIndex] = {}
+    _build_locks: Dict[int, threading.Lock] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db: Session, organization_id: int, signature: Optional[Tuple[int, int, int]] = None) -> KeywordIndex:
+        if signature is None:
+            signature = corpus_signature(db, organization_id)
+        index = cls._indexes.get(organization_id)
+        if index is not None and index.signature() == signature:
+            return index
+
+        with cls._build_lock(organization_id):
+            index = cls._indexes.get(organization_id)
+            if index is None or index.signature() != signature:
+                index = build_index(db, organization_id)
+                cls._indexes[organization_id] = index
+        return index
+
+    @classmethod
+    def add_chunks(
+        cls,
+        organization_id: int,
+        document_id: int,
+        analyzed: Sequence[Tuple[int, Dict[str, int], int]],
+        version: Optional[int] = None,
+    ):
+        """Apply freshly committed chunks to an already-built index (no-op otherwise)."""
+        index = cls._indexes.get(organization_id)
+        if index is None:
+            return
+        for chunk_id, frequencies, length in analyzed:
+            index.add(chunk_id, document_id, frequencies, length)
+        index.advance_version(version)
+
+    @classmethod
+    def remove_documents(cls, organization_id: int, document_ids: Iterable[int], version: Optional[int] = None):
+        index = cls._indexes.get(organization_id)
+        if index is not None:
+            index.remove_documents(document_ids)
+            index.advance_version(version)
+
+    @classmethod
+    def invalidate(cls, organization_id: Optional[int] = None):
+        with cls._lock:
+            if organization_id is None:
+                cls._indexes.clear()
+            else:
+                cls._indexes.pop(organization_id, None)
+
+    @classmethod
+    def _build_lock(cls, organization_id: int) -> threading.Lock:
+        with cls._lock:
+            return cls._build_locks.setdefault(organization_id, threading.Lock())
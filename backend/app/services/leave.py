@@ -1,4 +1,6 @@
 from sqlalchemy.orm import Session
+from app.core.cache import CacheManager
+from app.models.employee import Employee
 from app.models.leave_request import LeaveRequest, LeaveStatus
 
 def detect_conflicts(db: Session, employee_id: int, start_date, end_date) -> bool:
@@ -13,3 +15,13 @@ def detect_conflicts(db: Session, employee_id: int, start_date, end_date) -> boo
         LeaveRequest.start_date <= end_date
     ).first()
     return conflicts is not None
+
+
+def invalidate_employee_insights(db: Session, user_id: int):
+    """
+    Drop cached AI output (wellbeing assessments, payslip explanations) for the
+    employee profile linked to ``user_id`` after their leave changed.
+    """
+    employee = db.query(Employee).filter(Employee.user_id == user_id).first()
+    if employee:
+        CacheManager.invalidate_tags(CacheManager.tag("employee", employee.id))
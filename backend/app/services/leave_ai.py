@@ -4,8 +4,15 @@ from app.models.leave_balance import LeaveBalance
 from app.models.leave_policy import LeavePolicy
 from typing import Dict, Any, List
 from datetime import datetime
-from app.services.openrouter_client import call_openrouter
-import json
+from app.services.ai_orchestrator import AIOrchestrator, AIDomain
+
+AUTO_APPROVE_PROMPT = """You are an HR Leave Administrator AI. Analyze the leave request and recommend a decision (Auto-Approve or Manual Review). Output JSON only.
+
+            Key:
+            - Auto-Approve if standard, reasonable, and low risk.
+            - Manual Review if high duration, unusual reason, or close to limits.
+
+            Return JSON: { "decision": "auto_approved" | "pending_approval", "reasoning": "string" }"""
 
 def check_leave_eligibility(db: Session, employee_id: str, leave_type: str, days_requested: float) -> Dict[str, Any]:
     """
@@ -52,42 +59,22 @@ def auto_approve_decision(leave_request: LeaveRequest, balance: LeaveBalance, po
         return {"decision": "auto_approved", "reasoning": "Within auto-approval threshold defined by policy."}
     
     # Use AI for more complex decision (e.g. "sick" leave with high frequency, or specific reasons)
-    # Construct prompt
-    messages = [
-        {
-            "role": "system",
-            "content": "You are an HR Leave Administrator AI. Analyze the leave request and recommend a decision (Auto-Approve or Manual Review). Output JSON only."
-        },
-        {
-            "role": "user",
-            "content": f"""
+    request_summary = f"""
             Analyze this leave request:
             Type: {leave_request.leave_type}
             Duration: {leave_request.days_count} days
             Reason: {leave_request.reason}
             Employee Previous Leaves (Used): {balance.used_days} days
             Policy Max Days: {policy.max_days_per_year}
-            
-            Key:
-            - Auto-Approve if standard, reasonable, and low risk.
-            - Manual Review if high duration, unusual reason, or close to limits.
-
-            Return JSON: {{ "decision": "auto_approved" | "pending_approval", "reasoning": "string" }}
             """
-        }
-    ]
 
     try:
-        response_text = call_openrouter(messages, temperature=0.2)
-        # Attempt to parse specific JSON block if model is chatty
-        if "```json" in response_text:
-            json_str = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-             json_str = response_text.split("```")[1].split("```")[0].strip()
-        else:
-            json_str = response_text.strip()
-            
-        ai_result = json.loads(json_str)
+        ai_result = AIOrchestrator.analyze_text(
+            AUTO_APPROVE_PROMPT, request_summary, temperature=0.2, domain=AIDomain.LEAVE,
+            organization_id=leave_request.organization_id
+        )
+        if ai_result.get("decision") not in ("auto_approved", "pending_approval"):
+            raise ValueError(f"Unexpected decision: {ai_result.get('decision')}")
         return ai_result
     except Exception as e:
         print(f"AI Decision Error: {e}")
@@ -108,7 +95,7 @@ def suggest_alternative_dates(start_date: str, end_date: str, reason: str) -> st
             "content": f"User requested leave from {start_date} to {end_date} for reason: '{reason}'. Assuming these dates are busy (e.g. project deadline), suggest two alternative date ranges nearby."
         }
     ]
-    return call_openrouter(messages)
+    return AIOrchestrator.call_model(messages, json_output=False, domain=AIDomain.LEAVE)
 
 def calculate_leave_impact(days_count: float, leave_type: str) -> str:
     """
@@ -124,4 +111,4 @@ def calculate_leave_impact(days_count: float, leave_type: str) -> str:
             "content": f"Employee is taking {days_count} days of {leave_type} leave. Describe potential impacts on team workflow and 1-2 mitigation strategies."
         }
     ]
-    return call_openrouter(messages)
+    return AIOrchestrator.call_model(messages, json_output=False, domain=AIDomain.LEAVE)
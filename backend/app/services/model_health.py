@@ -0,0 +1,126 @@
+"""
+Per-model health used for routing model calls.
+
+``LatencyTracker`` keeps a rolling window of successful call latencies per
+model for percentile lookups (hedge delays). ``CircuitBreaker`` opens for a
+model while its recent error rate is too high. After a cooldown it lets a
+single trial call through (half-open) and closes again if that call succeeds.
+
+State is per process; every worker learns independently.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    _samples: Dict[str, Deque[float]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, model: str, seconds: float):
+        with cls._lock:
+            samples = cls._samples.get(model)
+            if samples is None:
+                samples = cls._samples[model] = deque(maxlen=settings.ai_latency_window)
+            samples.append(seconds)
+
+    @classmethod
+    def percentile(cls, model: str, q: float) -> Optional[float]:
+        """``q``-quantile (0..1) of recent latencies, or None until enough samples exist."""
+        with cls._lock:
+            samples = sorted(cls._samples.get(model) or ())
+        if len(samples) < settings.ai_hedge_min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._samples.clear()
+
+
+class _Circuit:
+    __slots__ = ("outcomes", "opened_at", "trial_in_flight")
+
+    def __init__(self):
+        self.outcomes: Deque[bool] = deque(maxlen=settings.ai_circuit_window)
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+
+class CircuitBreaker:
+    _circuits: Dict[str, _Circuit] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _circuit(cls, model: str) -> _Circuit:
+        circuit = cls._circuits.get(model)
+        if circuit is None:
+            circuit = cls._circuits[model] = _Circuit()
+        return circuit
+
+    @classmethod
+    def allow(cls, model: str) -> bool:
+        """Whether a call to ``model`` may go out now (claims the trial slot when half-open)."""
+        with cls._lock:
+            circuit = cls._circuit(model)
+            if circuit.opened_at is None:
+                return True
+            if time.monotonic() - circuit.opened_at < settings.ai_circuit_cooldown:
+                return False
+            if circuit.trial_in_flight:
+                return False
+            circuit.trial_in_flight = True
+            return True
+
+    @classmethod
+    def is_open(cls, model: str) -> bool:
+        with cls._lock:
+            return cls._circuit(model).opened_at is not None
+
+    @classmethod
+    def record_success(cls, model: str):
+        with cls._lock:
+            circuit = cls._circuit(model)
+            if circuit.opened_at is not None:
+                # Trial call succeeded: close and start counting afresh
+                circuit.opened_at = None
+                circuit.trial_in_flight = False
+                circuit.outcomes.clear()
+            circuit.outcomes.append(True)
+
+    @classmethod
+    def record_failure(cls, model: str):
+        with cls._lock:
+            circuit = cls._circuit(model)
+            if circuit.opened_at is not None:
+                # Trial call failed: stay open for another cooldown
+                circuit.opened_at = time.monotonic()
+                circuit.trial_in_flight = False
+                return
+            circuit.outcomes.append(False)
+            failures = circuit.outcomes.count(False)
+            if (
+                len(circuit.outcomes) >= settings.ai_circuit_min_calls
+                and failures / len(circuit.outcomes) >= settings.ai_circuit_error_rate
+            ):
+                circuit.opened_at = time.monotonic()
+                logger.warning(f"Circuit opened for model {model} ({failures}/{len(circuit.outcomes)} recent calls failed)")
+
+    @classmethod
+    def release_trial(cls, model: str):
+        """The half-open trial call was cancelled without an outcome."""
+        with cls._lock:
+            cls._circuit(model).trial_in_flight = False
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._circuits.clear()
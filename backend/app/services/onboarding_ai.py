@@ -9,7 +9,8 @@ from sqlalchemy.orm import Session
 from app.models.onboarding_employee import OnboardingEmployee, OnboardingStatus
 from app.models.onboarding_task import OnboardingTask, OnboardingTaskCategory
 from app.models.document import Document
-from app.services.openrouter_client import call_openrouter
+from app.core.cache import CacheManager, cache_ai_response, collapse_whitespace
+from app.services.ai_orchestrator import AIOrchestrator, AIDomain
 from app.services.embedding_service import generate_embeddings, hybrid_search
 
 logger = logging.getLogger(__name__)
@@ -39,10 +40,11 @@ def _extract_json(text: str) -> Optional[dict]:
     return None
 
 
-def generate_onboarding_checklist(position: str, department: str) -> List[dict]:
+@cache_ai_response(AIDomain.ONBOARDING, expire=24 * 3600, key={"position": collapse_whitespace, "department": collapse_whitespace})
+def suggest_onboarding_checklist(position: str, department: str) -> List[dict]:
     """
-    Use AI to generate a personalized onboarding checklist (10-15 tasks).
-    Returns tasks with categories, priorities, and day_offset (0-14).
+    Model-suggested checklist (cached). Raises ValueError when the output is
+    malformed, so the static fallback is never cached.
     """
     messages = [
         {
@@ -73,7 +75,7 @@ def generate_onboarding_checklist(position: str, department: str) -> List[dict]:
         },
     ]
 
-    raw = call_openrouter(messages, temperature=0.4)
+    raw = AIOrchestrator.call_model(messages, temperature=0.4, json_output=False, domain=AIDomain.ONBOARDING)
     parsed = _extract_json(raw)
 
     tasks: List[dict] = []
@@ -109,77 +111,90 @@ def generate_onboarding_checklist(position: str, department: str) -> List[dict]:
                 }
             )
 
-    # Fallback tasks if AI output is malformed
     if len(tasks) < 8:
-        tasks = [
-            {
-                "title": "Complete HR paperwork",
-                "description": "Review and complete required employment forms and policies.",
-                "category": "documentation",
-                "priority": "high",
-                "day_offset": 0,
-            },
-            {
-                "title": "Set up accounts and access",
-                "description": "Get access to email, HR portal, and required tools.",
-                "category": "setup",
-                "priority": "high",
-                "day_offset": 0,
-            },
-            {
-                "title": "Meet your manager",
-                "description": "Discuss expectations, first-week goals, and success criteria.",
-                "category": "meeting",
-                "priority": "high",
-                "day_offset": 1,
-            },
-            {
-                "title": "Security & compliance training",
-                "description": "Complete mandatory security/compliance modules.",
-                "category": "training",
-                "priority": "high",
-                "day_offset": 2,
-            },
-            {
-                "title": "Read company handbook",
-                "description": "Review key policies, benefits, and company culture.",
-                "category": "documentation",
-                "priority": "medium",
-                "day_offset": 2,
-            },
-            {
-                "title": "Team introductions",
-                "description": "Meet your immediate team and key cross-functional partners.",
-                "category": "meeting",
-                "priority": "medium",
-                "day_offset": 3,
-            },
-            {
-                "title": "Role-specific onboarding training",
-                "description": f"Complete training relevant to {position} in {department}.",
-                "category": "training",
-                "priority": "medium",
-                "day_offset": 5,
-            },
-            {
-                "title": "First deliverable planning",
-                "description": "Define and align on your first deliverable/project plan.",
-                "category": "other",
-                "priority": "medium",
-                "day_offset": 7,
-            },
-            {
-                "title": "Two-week check-in",
-                "description": "Review progress and adjust goals for the next phase.",
-                "category": "meeting",
-                "priority": "medium",
-                "day_offset": 14,
-            },
-        ]
-
+        AIOrchestrator.forget_response(messages, temperature=0.4, json_output=False, domain=AIDomain.ONBOARDING)
+        raise ValueError(f"Malformed onboarding checklist from model ({len(tasks)} usable tasks)")
     return tasks
 
 
+def generate_onboarding_checklist(position: str, department: str) -> List[dict]:
+    """
+    Use AI to generate a personalized onboarding checklist (10-15 tasks).
+    Returns tasks with categories, priorities, and day_offset (0-14).
+    """
+    try:
+        return suggest_onboarding_checklist(position, department)
+    except ValueError as e:
+        logger.warning(f"Using fallback onboarding checklist: {e}")
+
+    # Fallback tasks if AI output is malformed
+    return [
+        {
+            "title": "Complete HR paperwork",
+            "description": "Review and complete required employment forms and policies.",
+            "category": "documentation",
+            "priority": "high",
+            "day_offset": 0,
+        },
+        {
+            "title": "Set up accounts and access",
+            "description": "Get access to email, HR portal, and required tools.",
+            "category": "setup",
+            "priority": "high",
+            "day_offset": 0,
+        },
+        {
+            "title": "Meet your manager",
+            "description": "Discuss expectations, first-week goals, and success criteria.",
+            "category": "meeting",
+            "priority": "high",
+            "day_offset": 1,
+        },
+        {
+            "title": "Security & compliance training",
+            "description": "Complete mandatory security/compliance modules.",
+            "category": "training",
+            "priority": "high",
+            "day_offset": 2,
+        },
+        {
+            "title": "Read company handbook",
+            "description": "Review key policies, benefits, and company culture.",
+            "category": "documentation",
+            "priority": "medium",
+            "day_offset": 2,
+        },
+        {
+            "title": "Team introductions",
+            "description": "Meet your immediate team and key cross-functional partners.",
+            "category": "meeting",
+            "priority": "medium",
+            "day_offset": 3,
+        },
+        {
+            "title": "Role-specific onboarding training",
+            "description": f"Complete training relevant to {position} in {department}.",
+            "category": "training",
+            "priority": "medium",
+            "day_offset": 5,
+        },
+        {
+            "title": "First deliverable planning",
+            "description": "Define and align on your first deliverable/project plan.",
+            "category": "other",
+            "priority": "medium",
+            "day_offset": 7,
+        },
+        {
+            "title": "Two-week check-in",
+            "description": "Review progress and adjust goals for the next phase.",
+            "category": "meeting",
+            "priority": "medium",
+            "day_offset": 14,
+        },
+    ]
+
+
 def analyze_progress(employee_id: int, db: Session) -> dict:
     """
     Compute completion percentage, overdue tasks, and suggested priorities.
@@ -324,7 +339,7 @@ def answer_onboarding_question(question: str, employee_context: dict, db: Sessio
         },
     ]
 
-    answer = call_openrouter(messages, temperature=0.3)
+    answer = AIOrchestrator.call_model(messages, temperature=0.3, json_output=False, domain=AIDomain.ONBOARDING)
     
     return {
         "answer": answer,
@@ -333,14 +348,34 @@ def answer_onboarding_question(question: str, employee_context: dict, db: Sessio
     }
 
 
-def get_onboarding_tips(employee: OnboardingEmployee, db: Session) -> dict:
+def _tips_tag(employee_id: int) -> str:
+    return CacheManager.tag("onboarding_employee", employee_id)
+
+
+def invalidate_onboarding_tips(employee_id: int):
+    """Drop cached tips for an onboarding employee whose profile or tasks changed."""
+    CacheManager.invalidate_tags(_tips_tag(employee_id))
+
+
+@cache_ai_response(
+    AIDomain.ONBOARDING, expire=24 * 3600, stale_after=3600,
+    tags=lambda args: [_tips_tag(args["employee_id"])]
+)
+def _generate_tips(
+    employee_id: int,
+    employee_name: str,
+    position: str,
+    department: str,
+    start_date: str,
+    completion_percentage: int,
+    overdue_count: int,
+    next_actions: List[dict],
+) -> dict:
     """
-    Generate daily tips and suggested next actions based on progress and tasks.
+    Model-generated tips for one onboarding snapshot. Pure inputs, so the
+    cached result can be refreshed in the background. Raises ValueError when
+    the output has no usable tips, so the generic fallback is never cached.
     """
-    progress = analyze_progress(employee.id, db)
-    next_actions = progress.get("next_actions", [])
-    overdue = progress.get("overdue_tasks", [])
-
     messages = [
         {
             "role": "system",
@@ -357,39 +392,71 @@ def get_onboarding_tips(employee: OnboardingEmployee, db: Session) -> dict:
         {
             "role": "user",
             "content": (
-                f"Employee: {employee.employee_name}\n"
-                f"Role: {employee.position}\n"
-                f"Department: {employee.department}\n"
-                f"Start date: {employee.start_date.isoformat()}\n"
-                f"Progress: {progress.get('completion_percentage', 0)}%\n"
-                f"Overdue tasks: {len(overdue)}\n"
+                f"Employee: {employee_name}\n"
+                f"Role: {position}\n"
+                f"Department: {department}\n"
+                f"Start date: {start_date}\n"
+                f"Progress: {completion_percentage}%\n"
+                f"Overdue tasks: {overdue_count}\n"
                 f"Next actions (raw): {json.dumps(next_actions)}\n\n"
                 "Generate today's onboarding tips, 3-5 items, and 2-3 next_actions suggestions."
             ),
         },
     ]
 
-    raw = call_openrouter(messages, temperature=0.6)
-    parsed = _extract_json(raw) or {}
-
-    tips = parsed.get("tips") if isinstance(parsed, dict) else None
-    next_actions_ai = parsed.get("next_actions") if isinstance(parsed, dict) else None
-    motivation = parsed.get("motivation") if isinstance(parsed, dict) else None
+    raw = AIOrchestrator.call_model(messages, temperature=0.6, json_output=False, domain=AIDomain.ONBOARDING)
+    parsed = _extract_json(raw)
+    if not isinstance(parsed, dict):
+        parsed = {}
 
-    if not isinstance(tips, list) or not tips:
-        tips = [
-            "Block 30 minutes to review your checklist and pick 1-2 high-impact tasks for today.",
-            "Schedule short intro chats with teammates you'll work with frequently.",
-            "Write down open questions and ask your manager during your next check-in.",
-        ]
-    if not isinstance(next_actions_ai, list) or not next_actions_ai:
-        next_actions_ai = [a["title"] for a in next_actions[:3]] if next_actions else ["Review your onboarding tasks."]
-    if not isinstance(motivation, str) or not motivation.strip():
-        motivation = "You're doing great—consistent small steps will compound quickly."
+    tips = parsed.get("tips")
+    tips = [str(t).strip() for t in tips if str(t).strip()] if isinstance(tips, list) else []
+    if not tips:
+        AIOrchestrator.forget_response(messages, temperature=0.6, json_output=False, domain=AIDomain.ONBOARDING)
+        raise ValueError("Malformed onboarding tips from model (no usable tips)")
 
+    next_actions_ai = parsed.get("next_actions")
+    motivation = parsed.get("motivation")
     return {
-        "tips": [str(t).strip() for t in tips if str(t).strip()],
-        "next_actions": [str(a).strip() for a in next_actions_ai if str(a).strip()],
-        "motivation": motivation.strip(),
-        "progress": progress,
-    }
\ No newline at end of file
+        "tips": tips,
+        "next_actions": [str(a).strip() for a in next_actions_ai if str(a).strip()]
+        if isinstance(next_actions_ai, list) else [],
+        "motivation": motivation.strip() if isinstance(motivation, str) else "",
+    }
+
+
+def get_onboarding_tips(employee: OnboardingEmployee, db: Session) -> dict:
+    """
+    Generate daily tips and suggested next actions based on progress and tasks.
+    """
+    progress = analyze_progress(employee.id, db)
+    next_actions = progress.get("next_actions", [])
+    try:
+        tips = _generate_tips(
+            employee.id,
+            employee.employee_name,
+            employee.position,
+            employee.department,
+            employee.start_date.isoformat(),
+            progress.get("completion_percentage", 0),
+            len(progress.get("overdue_tasks", [])),
+            next_actions,
+        )
+    except ValueError as e:
+        logger.warning(f"Using fallback onboarding tips: {e}")
+        tips = {
+            "tips": [
+                "Block 30 minutes to review your checklist and pick 1-2 high-impact tasks for today.",
+                "Schedule short intro chats with teammates you'll work with frequently.",
+                "Write down open questions and ask your manager during your next check-in.",
+            ],
+            "next_actions": [],
+            "motivation": "",
+        }
+
+    # Fill in what the model left out on a copy (cached values are shared)
+    if not tips["next_actions"]:
+        tips = {**tips, "next_actions": [a["title"] for a in next_actions[:3]] or ["Review your onboarding tasks."]}
+    if not tips["motivation"]:
+        tips = {**tips, "motivation": "You're doing great—consistent small steps will compound quickly."}
+    return {**tips, "progress": progress}
\ No newline at end of file
@@ -3,7 +3,8 @@ from app.models.payroll import Payroll, PayrollStatus
 from app.models.salary_component import SalaryComponent, ComponentType
 from app.models.payroll_policy import PayrollPolicy, CalculationType
 from typing import Dict, Any, List, Optional
-from app.services.openrouter_client import call_openrouter
+from app.core.cache import CacheManager, cache_tags
+from app.services.ai_orchestrator import AIOrchestrator, AIDomain
 import json
 
 class PayrollAIService:
@@ -111,7 +112,9 @@ class PayrollAIService:
             }
         ]
         
-        explanation = call_openrouter(messages)
+        # Tagged so a payroll re-run for the employee drops the cached explanation
+        with cache_tags(CacheManager.tag("employee", payroll.employee_id)):
+            explanation = AIOrchestrator.call_model(messages, json_output=False, domain=AIDomain.PAYROLL)
         return {"explanation": explanation}
 
     def answer_payroll_question(self, question: str, context: Optional[str] = None) -> str:
@@ -128,7 +131,7 @@ class PayrollAIService:
                 "content": f"Question: {question}\nContext (if any): {context}"
             }
         ]
-        return call_openrouter(messages)
+        return AIOrchestrator.call_model(messages, json_output=False, domain=AIDomain.PAYROLL)
 
     def suggest_tax_optimization(self, payroll: Payroll) -> str:
         """
@@ -149,7 +152,7 @@ class PayrollAIService:
                 """
             }
         ]
-        return call_openrouter(messages)
+        return AIOrchestrator.call_model(messages, json_output=False, domain=AIDomain.PAYROLL)
 
     def calculate_bulk_payroll(self, db: Session, month: int, year: int, organization_id: int) -> List[Payroll]:
         """
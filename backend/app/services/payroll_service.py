@@ -17,6 +17,7 @@ import zipfile
 import io
 
 from app.models.payroll import Payroll, PayrollLock, PayrollStatus
+from app.core.cache import CacheManager
 from app.models.employee import Employee
 from app.services.payroll_ai import PayrollAIService
 
@@ -232,6 +233,7 @@ def calculate_payroll(
         db.commit()
         db.refresh(payroll)
     
+    CacheManager.invalidate_tags(CacheManager.tag("employee", employee_id))
     return _payroll_to_dict(payroll)
 
 
@@ -285,6 +287,8 @@ def calculate_bulk_payroll(
         except Exception as e:
             errors.append({"employee_id": emp.id, "error": str(e)})
     
+    if results:
+        CacheManager.invalidate_tags(*(CacheManager.tag("employee", p["employee_id"]) for p in results))
     return {
         "processed": len(results),
         "errors": len(errors),
@@ -0,0 +1,165 @@
+"""
+Answer cache for document RAG queries.
+
+Answers are keyed on (organization, normalized question, corpus version,
+document filter). The corpus version is a per-organization counter kept in the
+shared disk cache and bumped whenever a document in the organization is
+ingested, re-indexed or deleted, so stale answers are never served and no
+explicit purge is needed; old entries simply expire. The same counter is part
+of the search indexes' ``corpus_signature``.
+
+Besides exact matches, recent questions are kept with their embeddings so a
+rephrased question whose embedding is within
+``settings.rag_cache_similarity_threshold`` (cosine) reuses the answer too.
+"""
+import logging
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.cache import CacheManager
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_DOMAIN = "documents"
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_PUNCTUATION_RE.sub(" ", question.lower()).split())
+
+
+class RagAnswerCache:
+    """Namespace for RAG answer cache operations (backed by CacheManager)."""
+
+    @classmethod
+    def corpus_version(cls, organization_id: int) -> int:
+        return CacheManager.get_cache().get(cls._version_key(organization_id), default=0)
+
+    @classmethod
+    def bump_corpus_version(cls, organization_id: int) -> int:
+        """
+        Invalidate every cached answer for the organization and return the new
+        version. Maintained even with caching off: the search indexes' corpus
+        signatures include it.
+        """
+        version = CacheManager.get_cache().incr(cls._version_key(organization_id), default=0)
+        # Other answers over the corpus (DocumentService.query) are tagged instead
+        CacheManager.invalidate_tags(CacheManager.tag("corpus", organization_id))
+        logger.info(f"RAG answer cache invalidated for organization {organization_id}")
+        return version
+
+    @classmethod
+    def get(
+        cls,
+        organization_id: int,
+        question: str,
+        document_ids: Optional[List[int]] = None,
+        version: Optional[int] = None
+    ) -> Optional[Dict]:
+        """Exact match on the normalized question."""
+        if not settings.enable_caching:
+            return None
+        if version is None:
+            version = cls.corpus_version(organization_id)
+        cached = CacheManager.get(cls._answer_key(organization_id, normalize_question(question), version, document_ids))
+        if cached is not None:
+            logger.info(f"RAG answer cache HIT (exact) for organization {organization_id}")
+        return cached
+
+    @classmethod
+    def get_similar(
+        cls,
+        organization_id: int,
+        query_embedding: List[float],
+        document_ids: Optional[List[int]] = None,
+        version: Optional[int] = None
+    ) -> Optional[Dict]:
+        """Near-duplicate match on the question embedding."""
+        if not settings.enable_caching or settings.rag_cache_similarity_threshold > 1.0:
+            return None
+        if version is None:
+            version = cls.corpus_version(organization_id)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        recent = [
+            entry for entry in CacheManager.get(cls._recent_key(organization_id, version, document_ids), memory=False) or []
+            if entry[1].shape == query.shape
+        ]
+        if not recent or norm == 0:
+            return None
+        matrix = np.stack([embedding for _, embedding in recent])
+        similarities = matrix @ (query / norm)
+        best = int(np.argmax(similarities))
+        if similarities[best] < settings.rag_cache_similarity_threshold:
+            return None
+
+        cached = CacheManager.get(cls._answer_key(organization_id, recent[best][0], version, document_ids))
+        if cached is not None:
+            logger.info(
+                f"RAG answer cache HIT (similar, {similarities[best]:.3f}) for organization {organization_id}"
+            )
+        return cached
+
+    @classmethod
+    def set(
+        cls,
+        organization_id: int,
+        question: str,
+        query_embedding: Optional[List[float]],
+        answer: Dict,
+        document_ids: Optional[List[int]] = None,
+        version: Optional[int] = None
+    ):
+        """
+        Store an answer. Pass the ``version`` read before retrieval so an
+        answer computed while a document was being ingested is filed under the
+        old version and never served afterwards.
+        """
+        if not settings.enable_caching:
+            return
+        if version is None:
+            version = cls.corpus_version(organization_id)
+        normalized = normalize_question(question)
+        expire = settings.rag_cache_ttl
+        CacheManager.set(
+            cls._answer_key(organization_id, normalized, version, document_ids), answer, expire=expire,
+            tags=[CacheManager.tag("org", organization_id), CacheManager.tag("domain", _DOMAIN)]
+        )
+
+        if query_embedding is None or settings.rag_cache_similarity_threshold > 1.0:
+            return
+        embedding = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm == 0:
+            return
+        recent_key = cls._recent_key(organization_id, version, document_ids)
+        with CacheManager.transact(recent_key):
+            # Rewritten by every worker: bypass the in-process tier
+            recent = [entry for entry in (CacheManager.get(recent_key, memory=False) or []) if entry[0] != normalized]
+            recent.append((normalized, embedding / norm))
+            CacheManager.set(recent_key, recent[-settings.rag_cache_max_recent:], expire=expire, memory=False)
+
+    @staticmethod
+    def _version_key(organization_id: int) -> str:
+        return f"{_DOMAIN}:corpus_version:{organization_id}"
+
+    @staticmethod
+    def _answer_key(organization_id: int, normalized: str, version: int, document_ids: Optional[List[int]]) -> str:
+        return CacheManager.generate_key(_DOMAIN, "rag_answer", {
+            "organization_id": organization_id,
+            "question": normalized,
+            "version": version,
+            "document_ids": sorted(document_ids) if document_ids else None,
+        })
+
+    @staticmethod
+    def _recent_key(organization_id: int, version: int, document_ids: Optional[List[int]]) -> str:
+        return CacheManager.generate_key(_DOMAIN, "rag_recent", {
+            "organization_id": organization_id,
+            "version": version,
+            "document_ids": sorted(document_ids) if document_ids else None,
+        })
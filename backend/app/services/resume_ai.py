@@ -8,17 +8,38 @@ from app.services.ai_trust_service import AITrustService
 from app.models.user import UserRole
 
 
-from app.services.ai_orchestrator import AIOrchestrator, AIDomain
+from app.core.cache import cache_ai_response, text_key
+from app.services.ai_orchestrator import AIOrchestrator, AIDomain, MicroBatcher
 from app.schemas.trust import TrustMetadata, ConfidenceLevel
 from app.models.resume import Resume
 from app.models.job import Job
 
 logger = logging.getLogger(__name__)
 
-def anonymize_resume(text: str, blind_screening: bool = False) -> str:
+ANONYMIZE_PROMPT = (
+    "You are a PII scrubbing assistant. Remove personal identifiers (Names, Locations, IDs) from resume text. "
+    "Replace with [NAME], [LOCATION], [ID]. "
+)
+BLIND_SCREENING_PROMPT = (
+    "CRITICAL: rigorously remove any references to Age, Gender, Nationality, Ethnicity, and Photos. "
+    "Replace with [REDACTED]. "
+)
+_SCRUBBED_JSON = "Return JSON only: {\"text\": \"<the scrubbed text>\"}"
+
+# Bulk screening submits many resumes at once; an organization's concurrent submissions share calls
+_anonymize_batchers = {
+    False: MicroBatcher("anonymize", ANONYMIZE_PROMPT + _SCRUBBED_JSON, domain=AIDomain.RESUME, temperature=0.1),
+    True: MicroBatcher(
+        "anonymize_blind", ANONYMIZE_PROMPT + BLIND_SCREENING_PROMPT + _SCRUBBED_JSON,
+        domain=AIDomain.RESUME, temperature=0.1
+    ),
+}
+
+def anonymize_resume(text: str, blind_screening: bool = False, organization_id: Optional[int] = None) -> str:
     """
     Anonymize resume text to remove PII.
     If blind_screening is True, aggressively redacts name, gender, age, nationality, photo references.
+    Only resumes of the same ``organization_id`` are scrubbed in a shared model call.
     """
     logger.info(f"Anonymizing resume (blind_screening={blind_screening})")
     
@@ -32,24 +53,11 @@ def anonymize_resume(text: str, blind_screening: bool = False) -> str:
         text = re.sub(r'(?i)\b(photo|headshot|picture)\b.*', '[PHOTO REDACTED]', text)
         
     # 3. LLM-based Contextual Scrubbing
-    instruction = (
-        "You are a PII scrubbing assistant. Remove personal identifiers (Names, Locations, IDs) from resume text. "
-        "Replace with [NAME], [LOCATION], [ID]. "
-    )
-    if blind_screening:
-        instruction += (
-            "CRITICAL: rigorously remove any references to Age, Gender, Nationality, Ethnicity, and Photos. "
-            "Replace with [REDACTED]. Return ONLY the scrubbed text."
-        )
-    else:
-        instruction += "Return ONLY the scrubbed text."
-
-    messages = [{"role": "system", "content": instruction}, {"role": "user", "content": text[:8000]}]
-    
     try:
-        return AIOrchestrator.call_model(
-            messages, temperature=0.1, json_output=False, domain=AIDomain.RESUME
-        ).strip()
+        scrubbed = _anonymize_batchers[bool(blind_screening)].submit(text[:8000], organization_id).get("text")
+        if not isinstance(scrubbed, str) or not scrubbed.strip():
+            raise ValueError("empty scrubbed text")
+        return scrubbed.strip()
     except Exception as e:
         logger.warning(f"AI Anonymization failed, using regex-only: {e}")
         return text
@@ -71,6 +79,12 @@ def calculate_confidence(overall_score: float, missing_reqs: List[Any], evidence
     # Cap between 0.1 and 1.0
     return max(0.1, min(1.0, base))
 
+def _job_key(job_details: Dict[str, Any]) -> Dict[str, Any]:
+    # Only the fields that reach the prompt identify the analysis
+    return {field: job_details.get(field) for field in ("title", "roles_responsibilities", "candidate_profile", "requirements")}
+
+
+@cache_ai_response(AIDomain.RESUME, key={"resume_text": text_key(10000), "job_details": _job_key})
 def analyze_resume(resume_text: str, job_details: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analyze resume against job details with transparent scoring.
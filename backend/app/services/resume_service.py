@@ -1,6 +1,6 @@
 from app.services.base import BaseService
 from app.services.ai_orchestrator import AIOrchestrator, AIDomain
-from app.core.cache import cache_ai_response
+from app.core.cache import cache_ai_response, collapse_whitespace, text_key
 
 class ResumeService(BaseService):
     """Domain service for resume processing and matching logic."""
@@ -35,7 +35,7 @@ class ResumeService(BaseService):
             self.log_warning(f"AI Anonymization failed, using regex-only: {e}")
             return text
 
-    @cache_ai_response(AIDomain.RESUME)
+    @cache_ai_response(AIDomain.RESUME, key={"resume_text": text_key(4000), "job_requirements": collapse_whitespace})
     def analyze(self, resume_text: str, job_requirements: str) -> Dict[str, Any]:
         self.log_info("Analyzing resume against requirements.")
         system_prompt = """You are an expert recruitment AI. Analyze the resume against job requirements.
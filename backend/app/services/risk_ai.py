@@ -1,10 +1,11 @@
-from app.services.ai_orchestrator import AIOrchestrator
+from app.services.ai_orchestrator import AIOrchestrator, AIDomain, MicroBatcher
 from sqlalchemy.orm import Session
 from app.models.activity import Activity
 from app.models.employee import Employee
 import json
 import re
 from datetime import datetime
+from typing import Optional
 
 def analyze_wellbeing_support(employee_id: int, db: Session) -> dict:
     """
@@ -64,30 +65,29 @@ def analyze_wellbeing_support(employee_id: int, db: Session) -> dict:
         }
     }
 
-def analyze_friction_indicators(text: str) -> dict:
+FRICTION_INDICATORS_PROMPT = """You are a conflict resolution expert. Analyze text for workplace friction indicators (frustration, 
+            communication breakdowns, or distress). 
+            
+            Respond in JSON: {"has_friction": true/false, "explanation": "...", "support_hint": "How to help"}"""
+
+# One prompt per text; concurrent checks of the same organization share a call
+_friction_batcher = MicroBatcher(
+    "friction_indicators", FRICTION_INDICATORS_PROMPT, domain=AIDomain.WELLBEING, temperature=0.3
+)
+
+def analyze_friction_indicators(text: str, organization_id: Optional[int]) -> dict:
     """
     Check if text indicates workplace friction or frustration.
     Formerly 'check_toxicity'.
     """
-    messages = [
-        {
-            "role": "system",
-            "content": """You are a conflict resolution expert. Analyze text for workplace friction indicators (frustration, 
-            communication breakdowns, or distress). 
-            
-            Respond in JSON: {"has_friction": true/false, "explanation": "...", "support_hint": "How to help"}"""
-        },
-        {
-            "role": "user",
-            "content": f"Analyze this text for friction signals: {text}"
-        }
-    ]
-    
     try:
-        data = AIOrchestrator.analyze_text(messages[0]["content"], messages[1]["content"], temperature=0.3)
-    except:
+        data = _friction_batcher.submit(f"Analyze this text for friction signals: {text}", organization_id)
+    except Exception:
         data = {"has_friction": False, "explanation": "Analysis currently unavailable.", "support_hint": "Listen and validate"}
 
+    return _friction_result(data)
+
+def _friction_result(data: dict) -> dict:
     return {
         "has_friction": data.get("has_friction", False),
         "explanation": data.get("explanation", ""),
@@ -1,20 +1,26 @@
 import logging
 import json
 import traceback
-from typing import Callable, Any, Dict
+from typing import Callable, Any, Dict, Optional
 from datetime import datetime
 from fastapi import BackgroundTasks
 from sqlalchemy.orm import Session
 
+from app.core.rate_governor import AIPriority, ai_call_context
 from app.services.base import BaseService
 from app.models.task import Task
 from app.services.resume_ai import process_resume_analysis
+from app.services.document_ai import process_document_ingestion, process_document_reindex
+from app.services.cache_prewarm import process_cache_prewarm
 
 logger = logging.getLogger(__name__)
 
 # Registry of task handlers
 TASK_HANDLERS = {
-    "resume_analysis": process_resume_analysis
+    "resume_analysis": process_resume_analysis,
+    "document_ingestion": process_document_ingestion,
+    "document_reindex": process_document_reindex,
+    "cache_prewarm": process_cache_prewarm
 }
 
 class TaskService(BaseService):
@@ -22,8 +28,8 @@ class TaskService(BaseService):
     Manages persistent background tasks with DB state and retries.
     """
 
-    def __init__(self, background_tasks: BackgroundTasks, db: Session):
-        super().__init__(db)
+    def __init__(self, background_tasks: BackgroundTasks, db: Session, organization_id: Optional[int] = None):
+        super().__init__(db, organization_id)
         self.background_tasks = background_tasks
 
     def enqueue(self, task_type: str, payload: Dict[str, Any]):
@@ -95,8 +101,9 @@ class TaskService(BaseService):
 
         try:
             logger.info(f"Processing Task {task.id} [{task.type}]")
-            # Execute Handler
-            result = handler(db, task.payload)
+            # Execute Handler (model calls queue behind interactive requests, within the org's budget)
+            with ai_call_context(priority=AIPriority.BACKGROUND, organization_id=task.organization_id):
+                result = handler(db, task.payload)
             
             # Success
             task.status = "COMPLETED"
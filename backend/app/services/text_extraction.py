@@ -0,0 +1,152 @@
+"""
+Page-level text extraction for uploaded documents.
+
+PDF pages are extracted in parallel: the page list is split into ranges of
+``settings.pdf_pages_per_task`` pages which are fanned out to a shared
+``ProcessPoolExecutor``. ``iter_pages`` yields pages in document order as soon
+as their range is done, so chunking can start before the last page is parsed.
+
+Each page gets ``settings.pdf_page_timeout`` seconds inside the worker
+(SIGALRM); a page that overruns or fails is logged and yielded as empty text
+instead of stalling or failing the whole ingest.
+"""
+import logging
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional
+
+import docx
+import PyPDF2
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def iter_pages(file_path: str, file_type: str, page_count: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of each page (PDF) or of the whole file (DOCX, TXT, CSV), in
+    order. Pass ``page_count`` from ``count_pages`` if you already have it, to
+    avoid parsing the PDF twice.
+    """
+    if file_type == '.pdf':
+        yield from _iter_pdf_pages(file_path, page_count)
+    elif file_type == '.docx':
+        doc = docx.Document(file_path)
+        yield "\n".join(paragraph.text for paragraph in doc.paragraphs)
+    elif file_type in ['.txt', '.csv']:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            yield f.read()
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def count_pages(file_path: str, file_type: str) -> int:
+    """Number of pages ``iter_pages`` will yield."""
+    if file_type == '.pdf':
+        with open(file_path, 'rb') as f:
+            return len(PyPDF2.PdfReader(f).pages)
+    return 1
+
+
+def extract_text(file_path: str, file_type: str) -> str:
+    """Extract the full text of a file, one line break between pages."""
+    return "\n".join(iter_pages(file_path, file_type)).strip()
+
+
+def _iter_pdf_pages(file_path: str, page_count: Optional[int] = None) -> Iterator[str]:
+    if page_count is None:
+        page_count = count_pages(file_path, '.pdf')
+    if page_count == 0:
+        return
+
+    step = max(1, settings.pdf_pages_per_task)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    if settings.pdf_extraction_workers <= 0:
+        for start, stop in ranges:
+            yield from _extract_page_range(file_path, start, stop, None)
+        return
+
+    page_timeout = settings.pdf_page_timeout
+    executor = _get_executor()
+    futures = [executor.submit(_extract_page_range, file_path, start, stop, page_timeout) for start, stop in ranges]
+    try:
+        for (start, stop), future in zip(ranges, futures):
+            try:
+                # Backstop for workers that cannot use SIGALRM; normally pages time out in the worker
+                yield from future.result(timeout=page_timeout * (stop - start) + 5)
+            except FutureTimeoutError:
+                logger.error(f"Pages {start + 1}-{stop} of {file_path} timed out, skipping")
+                yield from [""] * (stop - start)
+            except BrokenProcessPool:
+                logger.error(f"PDF extraction pool died, extracting pages {start + 1}-{stop} in-process")
+                _reset_executor(executor)
+                yield from _extract_page_range(file_path, start, stop, None)
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _extract_page_range(file_path: str, start: int, stop: int, page_timeout: Optional[float]) -> List[str]:
+    """Worker: extract pages [start, stop). Runs in a pool process."""
+    use_alarm = page_timeout and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_page_timeout)
+
+    pages = []
+    try:
+        with open(file_path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            for number in range(start, stop):
+                try:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                    pages.append(reader.pages[number].extract_text() or "")
+                except PageTimeout:
+                    logger.error(f"Page {number + 1} of {file_path} timed out after {page_timeout}s, skipping")
+                    pages.append("")
+                except Exception as e:
+                    logger.error(f"Page {number + 1} of {file_path} could not be extracted: {e}")
+                    pages.append("")
+                finally:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+    return pages
+
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn: forking a multi-threaded server process can deadlock the child
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.pdf_extraction_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _executor
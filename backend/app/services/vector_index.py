@@ -0,0 +1,511 @@
+"""
+Per-organization in-memory vector index for document chunk retrieval.
+
+Chunk embeddings are held in one contiguous, L2-normalized float32 matrix so a
+top-k query is a single matrix-vector product plus ``argpartition`` instead of
+hydrating every ``DocumentChunk`` through the ORM. Large tenants are optionally
+partitioned into IVF lists (k-means centroids) so only the closest partitions
+are scored.
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.services.embedding_codec import read_embedding
+from app.services.rag_cache import RagAnswerCache
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per block when assigning vectors to IVF partitions
+_ASSIGN_BLOCK = 65536
+# K-means iterations and sample size (per list) used to train IVF centroids
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLE_PER_LIST = 64
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return vectors as a float32 matrix with unit-length rows (zero rows stay zero)."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """
+    Contiguous embedding matrix for one organization.
+
+    Rows are appended into a capacity-doubling buffer and deleted rows are
+    tombstoned, so ingestion and deletion never trigger a full rebuild.
+    """
+
+    def __init__(self, dim: Optional[int] = None, version: int = 0):
+        self.dim = dim
+        self.version = version  # corpus version the rows reflect
+        self._lock = threading.RLock()
+        self._size = 0
+        self._dead = 0
+        self._matrix = np.empty((0, dim or 0), dtype=np.float32)
+        self._chunk_ids = np.empty(0, dtype=np.int64)
+        self._document_ids = np.empty(0, dtype=np.int64)
+        self._chunk_indexes = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._row_of: Optional[Dict[int, int]] = {}  # chunk id -> row, rebuilt lazily
+
+        # IVF partitioning (only trained for large tenants)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._trained_size = 0
+
+    @classmethod
+    def from_arrays(
+        cls, matrix: np.ndarray, chunk_ids, document_ids, chunk_indexes, alive=None, version: int = 0
+    ) -> "VectorIndex":
+        """
+        Wrap existing normalized arrays without copying the matrix.
+
+        ``matrix`` may be a read-only ``numpy.memmap``; it is only copied into a
+        private buffer if rows are later added in-process.
+        """
+        size = matrix.shape[0]
+        index = cls(matrix.shape[1], version)
+        index._matrix = matrix
+        index._chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        index._document_ids = np.asarray(document_ids, dtype=np.int64)
+        index._chunk_indexes = np.asarray(chunk_indexes, dtype=np.int64)
+        index._alive = np.ones(size, dtype=bool) if alive is None else np.array(alive, dtype=bool)
+        index._assignments = np.zeros(size, dtype=np.int32)
+        index._size = size
+        index._dead = int(size - index._alive.sum())
+        index._row_of = None
+        index._maybe_train_partitions()
+        return index
+
+    def __len__(self) -> int:
+        return self._size - self._dead
+
+    @property
+    def dead_fraction(self) -> float:
+        return self._dead / self._size if self._size else 0.0
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Live rows as (matrix, chunk_ids, document_ids, chunk_indexes)."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive[:self._size])
+            return (
+                self._matrix[keep],
+                self._chunk_ids[keep],
+                self._document_ids[keep],
+                self._chunk_indexes[keep],
+            )
+
+    @property
+    def is_partitioned(self) -> bool:
+        return self._centroids is not None
+
+    def signature(self) -> Tuple[int, int, int]:
+        """(live row count, max live chunk id, corpus version), comparable with ``corpus_signature``."""
+        with self._lock:
+            if len(self) == 0:
+                return (0, 0, self.version)
+            alive_ids = self._chunk_ids[:self._size][self._alive[:self._size]]
+            return (int(alive_ids.size), int(alive_ids.max()), self.version)
+
+    def advance_version(self, version: Optional[int]):
+        """Adopt ``version`` after applying the change that produced it, unless other changes came in between."""
+        with self._lock:
+            if version is not None and self.version == version - 1:
+                self.version = version
+
+    def add(
+        self,
+        chunk_ids: Sequence[int],
+        document_ids: Sequence[int],
+        chunk_indexes: Sequence[int],
+        vectors,
+    ) -> int:
+        """Append embeddings; chunk ids already present are replaced. Returns rows added."""
+        if len(chunk_ids) == 0:
+            return 0
+        matrix = normalize_rows(vectors)
+        if matrix.shape[0] != len(chunk_ids):
+            raise ValueError("Number of vectors does not match number of chunk ids")
+
+        with self._lock:
+            if self.dim is None or (self._size == 0 and self.dim != matrix.shape[1]):
+                self.dim = matrix.shape[1]
+                self._matrix = np.empty((0, self.dim), dtype=np.float32)
+            if matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match index dimension {self.dim}")
+
+            row_of = self._rows_by_chunk()
+            replaced = [cid for cid in chunk_ids if int(cid) in row_of]
+            if replaced:
+                self._tombstone(self._rows_for_chunks(replaced))
+
+            count = matrix.shape[0]
+            self._reserve(self._size + count)
+            start, end = self._size, self._size + count
+            self._matrix[start:end] = matrix
+            self._chunk_ids[start:end] = np.asarray(chunk_ids, dtype=np.int64)
+            self._document_ids[start:end] = np.asarray(document_ids, dtype=np.int64)
+            self._chunk_indexes[start:end] = np.asarray(chunk_indexes, dtype=np.int64)
+            self._alive[start:end] = True
+            for offset, chunk_id in enumerate(chunk_ids):
+                row_of[int(chunk_id)] = start + offset
+            if self._centroids is not None:
+                self._assignments[start:end] = self._assign(matrix)
+            self._size = end
+
+            self._maybe_train_partitions()
+            return count
+
+    def remove_documents(self, document_ids: Iterable[int]) -> int:
+        """Tombstone every row belonging to the given documents. Returns rows removed."""
+        ids = np.fromiter((int(d) for d in document_ids), dtype=np.int64)
+        if ids.size == 0:
+            return 0
+        with self._lock:
+            n = self._size
+            rows = np.flatnonzero(np.isin(self._document_ids[:n], ids) & self._alive[:n])
+            self._tombstone(rows)
+            if self._dead > 64 and self._dead * 4 > self._size:
+                self._compact()
+            return int(rows.size)
+
+    def search(
+        self,
+        query_vector,
+        top_k: int = 5,
+        document_ids: Optional[Iterable[int]] = None,
+    ) -> List[dict]:
+        """Return the ``top_k`` most similar live chunks, best first."""
+        query = normalize_rows(query_vector)[0]
+        with self._lock:
+            if len(self) == 0 or top_k <= 0 or query.shape[0] != self.dim:
+                return []
+            rows, scores = self._score(query, document_ids, top_k)
+            if rows.size == 0:
+                return []
+            k = min(top_k, rows.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [self._hit(int(rows[i]), float(scores[i])) for i in top]
+
+    def lookup(self, query_vector, chunk_ids: Iterable[int]) -> List[dict]:
+        """Score specific chunks against the query (used to fuse keyword-only hits)."""
+        query = normalize_rows(query_vector)[0]
+        with self._lock:
+            if len(self) == 0 or query.shape[0] != self.dim:
+                return []
+            rows = self._rows_for_chunks(chunk_ids)
+            if rows.size == 0:
+                return []
+            scores = self._matrix[rows] @ query
+            return [self._hit(int(row), float(score)) for row, score in zip(rows, scores)]
+
+    def _score(self, query: np.ndarray, document_ids, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        n = self._size
+        if document_ids:
+            wanted = np.fromiter((int(d) for d in document_ids), dtype=np.int64)
+            rows = np.flatnonzero(np.isin(self._document_ids[:n], wanted) & self._alive[:n])
+            return rows, self._matrix[rows] @ query
+
+        if self._centroids is not None:
+            probes = min(settings.vector_index_ivf_probes, self._centroids.shape[0])
+            centroid_scores = self._centroids @ query
+            probed = np.argpartition(-centroid_scores, probes - 1)[:probes]
+            rows = np.flatnonzero(np.isin(self._assignments[:n], probed) & self._alive[:n])
+            if rows.size >= top_k:
+                return rows, self._matrix[rows] @ query
+
+        scores = self._matrix[:n] @ query
+        rows = np.flatnonzero(self._alive[:n])
+        return rows, scores[rows]
+
+    def _hit(self, row: int, score: float) -> dict:
+        return {
+            "chunk_id": int(self._chunk_ids[row]),
+            "document_id": int(self._document_ids[row]),
+            "chunk_index": int(self._chunk_indexes[row]),
+            "similarity": score,
+        }
+
+    def _rows_for_chunks(self, chunk_ids: Iterable[int]) -> np.ndarray:
+        row_of = self._rows_by_chunk()
+        return np.fromiter((row_of[int(c)] for c in chunk_ids if int(c) in row_of), dtype=np.int64)
+
+    def _rows_by_chunk(self) -> Dict[int, int]:
+        if self._row_of is None:
+            alive_rows = np.flatnonzero(self._alive[:self._size])
+            self._row_of = dict(zip(self._chunk_ids[alive_rows].tolist(), alive_rows.tolist()))
+        return self._row_of
+
+    def _tombstone(self, rows: np.ndarray):
+        if rows.size == 0:
+            return
+        self._alive[rows] = False
+        if self._row_of is not None:
+            for chunk_id in self._chunk_ids[rows]:
+                self._row_of.pop(int(chunk_id), None)
+        self._dead += int(rows.size)
+
+    def _reserve(self, capacity: int):
+        current = self._matrix.shape[0]
+        if capacity <= current:
+            return
+        new_capacity = max(capacity, current * 2, 64)
+        self._matrix = self._grow(self._matrix, (new_capacity, self.dim))
+        self._chunk_ids = self._grow(self._chunk_ids, (new_capacity,))
+        self._document_ids = self._grow(self._document_ids, (new_capacity,))
+        self._chunk_indexes = self._grow(self._chunk_indexes, (new_capacity,))
+        self._alive = self._grow(self._alive, (new_capacity,))
+        self._assignments = self._grow(self._assignments, (new_capacity,))
+
+    def _grow(self, array: np.ndarray, shape: tuple) -> np.ndarray:
+        grown = np.zeros(shape, dtype=array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+    def _compact(self):
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        self._chunk_ids = self._chunk_ids[keep]
+        self._document_ids = self._document_ids[keep]
+        self._chunk_indexes = self._chunk_indexes[keep]
+        self._assignments = self._assignments[keep]
+        self._alive = np.ones(keep.size, dtype=bool)
+        self._size = int(keep.size)
+        self._dead = 0
+        self._row_of = None
+
+    def _maybe_train_partitions(self):
+        threshold = settings.vector_index_ivf_threshold
+        if threshold <= 0 or len(self) < threshold:
+            return
+        if self._centroids is None or len(self) > 2 * self._trained_size:
+            self._train_partitions()
+
+    def _train_partitions(self):
+        """Train IVF centroids with a few rounds of spherical k-means on a sample."""
+        live = self._matrix[:self._size][self._alive[:self._size]]
+        nlist = max(1, min(settings.vector_index_ivf_lists, int(np.sqrt(live.shape[0]))))
+        rng = np.random.default_rng(0)
+        sample_size = min(live.shape[0], nlist * _KMEANS_SAMPLE_PER_LIST)
+        sample = live[rng.choice(live.shape[0], sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(_KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        self._centroids = centroids
+        self._assignments[:self._size] = self._assign(self._matrix[:self._size])
+        self._trained_size = len(self)
+        logger.info(f"Trained {nlist} IVF partitions over {self._trained_size} vectors")
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        labels = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], _ASSIGN_BLOCK):
+            block = vectors[start:start + _ASSIGN_BLOCK]
+            labels[start:start + block.shape[0]] = np.argmax(block @ self._centroids.T, axis=1)
+        return labels
+
+
+def embedded_chunks_filter():
+    """Chunks that carry an embedding in either the packed or the legacy pickled column."""
+    return or_(DocumentChunk.embedding_blob.isnot(None), DocumentChunk.embedding_vector.isnot(None))
+
+
+def _organization_chunks(db: Session, organization_id: int, *columns):
+    return db.query(*columns).join(
+        Document, Document.id == DocumentChunk.document_id
+    ).filter(
+        Document.organization_id == organization_id,
+        embedded_chunks_filter()
+    )
+
+
+def corpus_signature(db: Session, organization_id: int) -> Tuple[int, int, int]:
+    """
+    Cheap aggregate describing the indexed corpus: (chunk count, max chunk id,
+    corpus version). The version is bumped on every ingest/delete, so the
+    signature changes even when reused row ids leave count and max id as they were.
+    """
+    version = RagAnswerCache.corpus_version(organization_id)
+    count, max_id = _organization_chunks(
+        db, organization_id, func.count(DocumentChunk.id), func.max(DocumentChunk.id)
+    ).one()
+    return (int(count or 0), int(max_id or 0), version)
+
+
+def build_index(db: Session, organization_id: int) -> VectorIndex:
+    """Load every embedded chunk of an organization into a fresh index."""
+    # Read before the scan: a change committed meanwhile leaves the index stale, never falsely current
+    version = RagAnswerCache.corpus_version(organization_id)
+    rows = _organization_chunks(
+        db, organization_id,
+        DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.chunk_index,
+        DocumentChunk.embedding_blob, DocumentChunk.embedding_vector
+    ).order_by(DocumentChunk.id).all()
+
+    index = VectorIndex(version=version)
+    if not rows:
+        return index
+
+    vectors = []
+    for chunk_id, _, _, blob, legacy in rows:
+        try:
+            vectors.append(read_embedding(blob, legacy))
+        except Exception as e:
+            logger.warning(f"Skipping chunk {chunk_id} with an unreadable embedding: {e}")
+            vectors.append(None)
+    dim = next((vector.shape[0] for vector in vectors if vector is not None), None)
+    if dim is None:
+        logger.warning(f"No usable embeddings for organization {organization_id} ({len(rows)} chunks)")
+        return index
+    matrix = np.zeros((len(rows), dim), dtype=np.float32)
+    malformed = 0
+    for i, vector in enumerate(vectors):
+        if vector is not None and vector.shape[0] == dim:
+            matrix[i] = vector
+        else:
+            malformed += 1
+    if malformed:
+        # Kept as zero rows so the index still matches corpus_signature
+        logger.warning(f"{malformed} chunks with malformed embeddings for organization {organization_id}")
+    index.add([r[0] for r in rows], [r[1] for r in rows], [r[2] or 0 for r in rows], matrix)
+    return index
+
+
+class VectorIndexRegistry:
+    """
+    Process-wide registry of organization indexes.
+
+    Indexes are built lazily on first search and kept in sync incrementally by
+    ingestion/deletion. Every lookup compares the index against a one-row
+    aggregate over the DB, so changes made by other workers trigger a reload.
+
+    With ``settings.vector_segments_enabled`` the index is served from a
+    memory-mapped segment file shared by all workers (see
+    ``app.services.embedding_segments``) and the DB is only scanned when the
+    segment is missing or out of date.
+    """
+    _indexes: Dict[int, VectorIndex] = {}
+    _build_locks: Dict[int, threading.Lock] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db: Session, organization_id: int, signature: Optional[Tuple[int, int, int]] = None) -> VectorIndex:
+        if signature is None:
+            signature = corpus_signature(db, organization_id)
+        index = cls._indexes.get(organization_id)
+        if index is not None and index.signature() == signature:
+            return index
+
+        with cls._build_lock(organization_id):
+            index = cls._indexes.get(organization_id)
+            if index is None or index.signature() != signature:
+                index = cls._load(db, organization_id, signature)
+                cls._indexes[organization_id] = index
+        return index
+
+    @classmethod
+    def add_chunks(
+        cls,
+        organization_id: int,
+        chunk_ids: Sequence[int],
+        document_ids: Sequence[int],
+        chunk_indexes: Sequence[int],
+        vectors,
+        version: Optional[int] = None,
+    ):
+        """
+        Apply freshly committed chunks to an already-built index (no-op otherwise).
+        ``version`` is the corpus version the change was committed under.
+        """
+        if settings.vector_segments_enabled:
+            store = cls._segment_store(organization_id)
+            if store.append(chunk_ids, document_ids, chunk_indexes, vectors, version):
+                cls._remap(organization_id, store)
+            return
+
+        index = cls._indexes.get(organization_id)
+        if index is None:
+            return
+        try:
+            index.add(chunk_ids, document_ids, chunk_indexes, vectors)
+            index.advance_version(version)
+        except ValueError as e:
+            logger.warning(f"Dropping vector index for organization {organization_id}: {e}")
+            cls.invalidate(organization_id)
+
+    @classmethod
+    def remove_documents(cls, organization_id: int, document_ids: Iterable[int], version: Optional[int] = None):
+        if settings.vector_segments_enabled:
+            store = cls._segment_store(organization_id)
+            if store.remove_documents(document_ids, version):
+                index = store.open()
+                if index is not None and index.dead_fraction > 0.25:
+                    store.write(index)
+                cls._remap(organization_id, store)
+            return
+
+        index = cls._indexes.get(organization_id)
+        if index is not None:
+            index.remove_documents(document_ids)
+            index.advance_version(version)
+
+    @classmethod
+    def invalidate(cls, organization_id: Optional[int] = None):
+        with cls._lock:
+            if organization_id is None:
+                cls._indexes.clear()
+            else:
+                cls._indexes.pop(organization_id, None)
+
+    @classmethod
+    def _load(cls, db: Session, organization_id: int, signature: Tuple[int, int, int]) -> VectorIndex:
+        store = cls._segment_store(organization_id) if settings.vector_segments_enabled else None
+        if store is not None:
+            index = store.open()
+            if index is not None and index.signature() == signature:
+                logger.info(f"Mapped embedding segment for organization {organization_id} ({len(index)} chunks)")
+                return index
+
+        logger.info(f"Building vector index for organization {organization_id} ({signature[0]} chunks)")
+        index = build_index(db, organization_id)
+        if store is not None:
+            store.write(index)
+            index = store.open() or index
+        return index
+
+    @classmethod
+    def _remap(cls, organization_id: int, store):
+        if organization_id in cls._indexes:
+            index = store.open()
+            if index is not None:
+                cls._indexes[organization_id] = index
+
+    @staticmethod
+    def _segment_store(organization_id: int):
+        from app.services.embedding_segments import SegmentStore
+        return SegmentStore(organization_id)
+
+    @classmethod
+    def _build_lock(cls, organization_id: int) -> threading.Lock:
+        with cls._lock:
+            return cls._build_locks.setdefault(organization_id, threading.Lock())
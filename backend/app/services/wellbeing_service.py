@@ -1,11 +1,29 @@
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
+from app.core.cache import CacheManager, cache_ai_response
 from app.services.base import BaseService
-from app.services.ai_orchestrator import AIOrchestrator, AIDomain
+from app.services.ai_orchestrator import AIOrchestrator, AIDomain, MicroBatcher
 from app.models.employee import Employee
 from app.models.performance_metric import PerformanceMetric
 
+FRICTION_PROMPT = """Analyze for friction or need for support. Identify hidden burnout. 
+        Focus on identifying stress or communication breakdowns that could benefit from support.
+        Return JSON: {"has_friction": bool, "explanation": "Advisory explanation...", "support_hint": "Supportive suggestion..."}"""
+
+WELLBEING_RISK_PROMPT = """You are a workplace wellbeing expert. Analyze data for burnout risk to provide ADVISORY insights.
+        
+        STRICT ETHICAL GUIDELINES:
+        1. Output is Advisory Only. It must be reviewed by a human.
+        2. Focus on support and wellness, NOT surveillance or punitive measures.
+        3. Provide concrete, positive recommendations for both employee and manager.
+        4. Avoid diagnostic medical language. Use 'risk indicators' instead of 'symptoms'.
+        
+        Return JSON: {"support_priority": "low|medium|high|critical", "indicators": [], "recommendations": [], "analysis": "..."}"""
+
+# Friction checks are tiny prompts; concurrent checks share one model call
+_friction_batcher = MicroBatcher("wellbeing_friction", FRICTION_PROMPT, domain=AIDomain.WELLBEING, temperature=0.5)
+
 class WellbeingService(BaseService):
     """Domain service for employee wellbeing and burnout analysis."""
 
@@ -35,36 +53,34 @@ class WellbeingService(BaseService):
         
         metrics_str = "\n".join([f"{m.date}: {m.metric_type}={m.value}" for m in metrics])
         
-        system_prompt = """You are a workplace wellbeing expert. Analyze data for burnout risk to provide ADVISORY insights.
-        
-        STRICT ETHICAL GUIDELINES:
-        1. Output is Advisory Only. It must be reviewed by a human.
-        2. Focus on support and wellness, NOT surveillance or punitive measures.
-        3. Provide concrete, positive recommendations for both employee and manager.
-        4. Avoid diagnostic medical language. Use 'risk indicators' instead of 'symptoms'.
-        
-        Return JSON: {"support_priority": "low|medium|high|critical", "indicators": [], "recommendations": [], "analysis": "..."}"""
-        user_content = f"Employee: {employee.name if employee else 'Unknown'}\nPatterns: {patterns}\nMetrics: {metrics_str}"
-        
         try:
-            result = AIOrchestrator.analyze_text(system_prompt, user_content, temperature=0.4, domain=AIDomain.WELLBEING)
-            result["trust_metadata"] = {
-                "confidence_score": 0.92,
-                "ai_model": "Wellbeing-GPT-4",
-                "timestamp": datetime.now().isoformat()
-            }
-            return result
+            result = self._assess_risk(employee_id, employee.name if employee else "Unknown", patterns, metrics_str)
+            # Stamped per request: the cached assessment may be up to a day old
+            return {**result, "trust_metadata": {**result["trust_metadata"], "timestamp": datetime.now().isoformat()}}
         except Exception as e:
             self.log_error(f"Wellbeing analysis failed: {e}")
             return {"support_priority": "unknown", "analysis": "System error during analysis."}
 
+    @cache_ai_response(
+        AIDomain.WELLBEING, expire=24 * 3600, stale_after=3600,
+        tags=lambda args: [
+            CacheManager.tag("employee", args["employee_id"]), CacheManager.tag("org", args["self"].org_id)
+        ]
+    )
+    def _assess_risk(self, employee_id: int, employee_name: str, patterns: Dict[str, Any], metrics_str: str) -> Dict[str, Any]:
+        """Model assessment from plain inputs only (refreshed off the request thread)."""
+        user_content = f"Employee: {employee_name}\nPatterns: {patterns}\nMetrics: {metrics_str}"
+        result = AIOrchestrator.analyze_text(WELLBEING_RISK_PROMPT, user_content, temperature=0.4, domain=AIDomain.WELLBEING)
+        result["trust_metadata"] = {
+            "confidence_score": 0.92,
+            "ai_model": "Wellbeing-GPT-4"
+        }
+        return result
+
     def check_friction(self, text: str) -> Dict[str, Any]:
         """Analyze text for potential friction or support needs (formerly toxicity)."""
-        system_prompt = """Analyze for friction or need for support. Identify hidden burnout. 
-        Focus on identifying stress or communication breakdowns that could benefit from support.
-        Return JSON: {"has_friction": bool, "explanation": "Advisory explanation...", "support_hint": "Supportive suggestion..."}"""
         try:
-            return AIOrchestrator.analyze_text(system_prompt, f"Text: {text[:2000]}", domain=AIDomain.WELLBEING)
+            return _friction_batcher.submit(f"Text: {text[:2000]}", self.org_id)
         except Exception as e:
             self.log_error(f"Friction check failed: {e}")
             return {"has_friction": False, "explanation": "Error testing friction."}
@@ -0,0 +1,36 @@
+"""
+Add page range columns to 'document_chunks'.
+
+Chunks now record the pages they span ('page_start', 'page_end') for
+citations. Existing chunks keep NULL until their document is re-ingested.
+
+Usage:
+    python scripts/migrate_chunk_pages.py
+"""
+import os
+import sys
+
+from sqlalchemy import inspect, text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+
+COLUMNS = ("page_start", "page_end")
+
+
+def migrate():
+    print("Adding page range columns to 'document_chunks'...")
+    existing = [c["name"] for c in inspect(engine).get_columns("document_chunks")]
+    with engine.begin() as conn:
+        for name in COLUMNS:
+            if name in existing:
+                print(f"  - '{name}' already exists")
+                continue
+            conn.execute(text(f"ALTER TABLE document_chunks ADD COLUMN {name} INTEGER"))
+            print(f"  Added '{name}'")
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    migrate()
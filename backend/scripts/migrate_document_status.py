@@ -0,0 +1,42 @@
+"""
+Add ingestion status columns to 'documents'.
+
+Documents are now ingested in the background; 'status', 'progress' and
+'error' track each upload. Existing documents are marked ready.
+
+Usage:
+    python scripts/migrate_document_status.py
+"""
+import os
+import sys
+
+from sqlalchemy import inspect, text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+
+COLUMNS = {
+    "status": "VARCHAR DEFAULT 'ready'",
+    "progress": "INTEGER DEFAULT 100",
+    "error": "TEXT",
+}
+
+
+def migrate():
+    print("Adding ingestion status columns to 'documents'...")
+    existing = [c["name"] for c in inspect(engine).get_columns("documents")]
+    with engine.begin() as conn:
+        for name, definition in COLUMNS.items():
+            if name in existing:
+                print(f"  - '{name}' already exists")
+                continue
+            conn.execute(text(f"ALTER TABLE documents ADD COLUMN {name} {definition}"))
+            print(f"  Added '{name}'")
+        if "status" not in existing:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_status ON documents (status)"))
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,84 @@
+"""
+Convert pickled embedding lists to packed binary blobs.
+
+Adds the ``embedding_blob`` column to ``document_chunks`` and ``embeddings_cache``
+if missing, then rewrites existing rows in batches (keyset pagination on id),
+clearing the legacy pickled column unless --keep-pickle is given.
+
+Usage:
+    python scripts/migrate_embedding_storage.py [--format float16] [--batch-size 500] [--keep-pickle]
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import bindparam, inspect, text, update
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.database import engine, SessionLocal
+from app.models.document_chunk import DocumentChunk
+from app.models.embedding_cache import EmbeddingCache
+from app.services.embedding_codec import encode_embedding, STORAGE_FORMATS
+
+
+def ensure_blob_column(table_name: str):
+    columns = [c["name"] for c in inspect(engine).get_columns(table_name)]
+    if "embedding_blob" in columns:
+        return
+    column_type = "BYTEA" if engine.dialect.name == "postgresql" else "BLOB"
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN embedding_blob {column_type}"))
+    print(f"Added 'embedding_blob' column to '{table_name}'.")
+
+
+def convert_table(model, storage: str, batch_size: int, keep_pickle: bool) -> int:
+    table = model.__table__
+    statement = update(table).where(table.c.id == bindparam("row_id")).values(
+        embedding_blob=bindparam("blob"),
+        **({} if keep_pickle else {"embedding_vector": None})
+    )
+    converted = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            rows = db.query(model.id, model.embedding_vector).filter(
+                model.id > last_id,
+                model.embedding_blob.is_(None),
+                model.embedding_vector.isnot(None)
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            params = [{"row_id": row_id, "blob": encode_embedding(vector, storage)} for row_id, vector in rows]
+            db.execute(statement, params)
+            db.commit()
+
+            last_id = rows[-1][0]
+            converted += len(rows)
+            print(f"  {table.name}: converted {converted} rows (last id {last_id})")
+    finally:
+        db.close()
+    return converted
+
+
+def migrate(storage: str, batch_size: int, keep_pickle: bool):
+    print(f"Migrating embeddings to '{storage}' blobs at {settings.database_url}...")
+    for model in (DocumentChunk, EmbeddingCache):
+        ensure_blob_column(model.__tablename__)
+        total = convert_table(model, storage, batch_size, keep_pickle)
+        print(f"'{model.__tablename__}': {total} rows converted.")
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    default_format = settings.embedding_storage if settings.embedding_storage != "pickle" else "float32"
+    parser.add_argument("--format", default=default_format,
+                        choices=[f for f in STORAGE_FORMATS if f != "pickle"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--keep-pickle", action="store_true", help="Keep the legacy pickled column populated")
+    args = parser.parse_args()
+    migrate(args.format, args.batch_size, args.keep_pickle)
@@ -0,0 +1,44 @@
+"""
+Fill the AI response cache ahead of demand (run from cron, e.g. before office hours).
+
+    python scripts/prewarm_ai_cache.py
+    python scripts/prewarm_ai_cache.py --targets payroll --month 5 --year 2025 --organization-id 1
+"""
+import argparse
+import os
+import sys
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+import app.models  # noqa: F401  (register all mappers)
+from app.services.cache_prewarm import PREWARM_TARGETS, prewarm_ai_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prewarm the AI response cache.")
+    parser.add_argument("--targets", nargs="+", choices=PREWARM_TARGETS, default=list(PREWARM_TARGETS))
+    parser.add_argument("--organization-id", type=int, default=None, help="Limit to one organization")
+    parser.add_argument("--month", type=int, default=None, help="Payroll month (default: current)")
+    parser.add_argument("--year", type=int, default=None, help="Payroll year (default: current)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Model calls in flight")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = prewarm_ai_cache(
+            db,
+            targets=args.targets,
+            organization_id=args.organization_id,
+            month=args.month,
+            year=args.year,
+            concurrency=args.concurrency,
+        )
+        print(f"Prewarm complete: {summary}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Train the local NumPy embedding model used by EMBEDDING_BACKEND=numpy.
+
+Fits a latent semantic projection (randomized truncated SVD of the hashed
+TF-IDF chunk matrix) over a sample of existing document chunks and writes
+``idf`` and ``projection`` arrays to an .npz file.
+
+Switching backends changes the vector space: re-embed existing documents
+after enabling the model.
+
+Usage:
+    python scripts/train_embedding_model.py [--output models/embedding.npz] [--sample 4000]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+from sqlalchemy import func
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.document_chunk import DocumentChunk
+from app.services.embedding_service import EMBEDDING_DIM, hashed_term_matrix
+
+
+def load_sample(sample: int):
+    db = SessionLocal()
+    try:
+        rows = db.query(DocumentChunk.chunk_text).order_by(func.random()).limit(sample).all()
+    finally:
+        db.close()
+    return [text for (text,) in rows if text]
+
+
+def train(texts, buckets: int, dim: int, seed: int = 0):
+    counts = hashed_term_matrix(texts, buckets)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+    features = hashed_term_matrix(texts, buckets, idf)
+
+    # Randomized SVD: the top right singular vectors span the latent topics
+    rank = min(dim, len(texts), buckets)
+    rng = np.random.default_rng(seed)
+    sketch = features.T @ (features @ rng.normal(size=(buckets, rank + 10)).astype(np.float32))
+    basis, _ = np.linalg.qr(sketch)
+    _, _, vt = np.linalg.svd(features @ basis, full_matrices=False)
+    projection = (basis @ vt.T)[:, :rank]
+    return idf, projection.astype(np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=settings.embedding_model_path)
+    parser.add_argument("--sample", type=int, default=4000, help="Number of chunks to train on")
+    parser.add_argument("--buckets", type=int, default=8192, help="Hashed vocabulary size")
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    args = parser.parse_args()
+
+    texts = load_sample(args.sample)
+    if not texts:
+        print("No document chunks to train on.")
+        sys.exit(1)
+    print(f"Training on {len(texts)} chunks ({args.buckets} buckets, {args.dim} dims)...")
+    idf, projection = train(texts, args.buckets, args.dim)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    np.savez(args.output, idf=idf, projection=projection)
+    print(f"Wrote {args.output} (dim {projection.shape[1]}). Set EMBEDDING_BACKEND=numpy to use it.")
@@ -0,0 +1,17 @@
+"""
+Shared test fixtures.
+"""
+import pytest
+
+from app.core.cache import CacheManager
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep cache files, single-flight locks and RAG corpus versions out of the repo."""
+    monkeypatch.setattr(settings, "cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "vector_segments_dir", str(tmp_path / "embeddings"))
+    monkeypatch.setattr(CacheManager, "_cache", None)
+    yield
+    CacheManager.close()
@@ -0,0 +1,310 @@
+"""
+Tests for the AI gateway: pooled async client, sync shims, domain policies,
+micro-batching, latency-aware routing and the rate governor.
+"""
+import asyncio
+import functools
+import json
+import threading
+import time
+
+import diskcache
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from tenacity import wait_none
+
+from app.core.cache import CacheManager
+from app.core.config import settings
+from app.core.exceptions import AICapacityError
+from app.core.http_client import HTTPClientManager
+from app.core.rate_governor import AIPriority, RateGovernor
+from app.database import Base
+from app.models.payroll import Payroll
+from app.models.payroll_policy import PayrollPolicy
+from app.models.salary_component import SalaryComponent
+from app.services import payroll_service
+from app.services.ai_orchestrator import AIDomain, AIOrchestrator, MicroBatcher
+from app.services.model_health import CircuitBreaker, LatencyTracker
+from app.services.payroll_ai import PayrollAIService
+
+
+@pytest.fixture()
+def openrouter(monkeypatch):
+    """Route the shared client to an in-process fake OpenRouter."""
+    state = {"requests": [], "in_flight": 0, "max_in_flight": 0, "delay": {}, "failing": set(), "rate_limited": 0}
+
+    async def handler(request):
+        body = json.loads(request.content)
+        state["requests"].append(body)
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(state["delay"].get(body["model"], 0.01))
+        state["in_flight"] -= 1
+        if body["model"] in state["failing"]:
+            return httpx.Response(503, json={"error": "overloaded"})
+        if state["rate_limited"]:
+            state["rate_limited"] -= 1
+            return httpx.Response(429, headers={"Retry-After": "0.3"}, json={"error": "rate limited"})
+        if body.get("stream"):
+            lines = [f'data: {json.dumps({"choices": [{"delta": {"content": t}}]})}\n\n' for t in ("Hel", "lo")]
+            return httpx.Response(200, content="".join(lines) + "data: [DONE]\n\n")
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"echo {body['model']}"}}]})
+
+    monkeypatch.setattr(
+        httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(HTTPClientManager, "_clients", {})
+    monkeypatch.setattr(HTTPClientManager, "_semaphores", {})
+    monkeypatch.setattr(AIOrchestrator, "_domain_semaphores", {})
+    monkeypatch.setattr(settings.ai, "openrouter_api_key", "test-key")
+    monkeypatch.setattr(settings.ai, "kill_switch", False)
+    monkeypatch.setattr(AIOrchestrator._ado_call.retry, "wait", wait_none())
+    LatencyTracker.reset()
+    CircuitBreaker.reset()
+    RateGovernor.reset()
+    yield state
+    LatencyTracker.reset()
+    CircuitBreaker.reset()
+    RateGovernor.reset()
+    HTTPClientManager.shutdown()
+
+
+def test_sync_shim_and_stream_use_shared_client(openrouter):
+    messages = [{"role": "user", "content": "hi"}]
+    assert AIOrchestrator.call_model(messages, json_output=False) == f"echo {settings.ai.model_name}"
+    assert list(AIOrchestrator.stream_model(messages)) == ["Hel", "lo"]
+    assert len(HTTPClientManager._clients) == 1  # one pooled client on the background loop
+
+
+def test_acall_model_respects_per_host_limit(openrouter, monkeypatch):
+    monkeypatch.setattr(settings.ai, "http_per_host_limit", 3)
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def fan_out():
+        results = await asyncio.gather(*[
+            AIOrchestrator.acall_model(messages, json_output=False) for _ in range(12)
+        ])
+        await HTTPClientManager.aclose()
+        return results
+
+    results = asyncio.run(fan_out())
+    assert len(results) == 12
+    assert openrouter["max_in_flight"] == 3
+
+
+def test_gateway_applies_domain_cache_policy(openrouter, tmp_path, monkeypatch):
+    cache = diskcache.Cache(str(tmp_path / "cache"))
+    monkeypatch.setattr(CacheManager, "_cache", cache)
+
+    service = PayrollAIService()
+    first = service.answer_payroll_question("When is payday?")
+    second = service.answer_payroll_question("When is payday?")
+    messages = [{"role": "user", "content": "hi"}]
+    AIOrchestrator.call_model(messages, json_output=False, domain=AIDomain.INTERVIEW)
+    AIOrchestrator.call_model(messages, json_output=False, domain=AIDomain.INTERVIEW)
+    cache.close()
+
+    assert first == second == f"echo {settings.ai.model_name}"
+    # Payroll responses are cached by the gateway; interview (cache_ttl=0) is not
+    assert len(openrouter["requests"]) == 3
+
+
+def test_payroll_run_drops_the_employees_cached_explanation(openrouter, tmp_path, monkeypatch):
+    cache = diskcache.Cache(str(tmp_path / "cache"))
+    monkeypatch.setattr(CacheManager, "_cache", cache)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(
+        bind=engine, tables=[Payroll.__table__, SalaryComponent.__table__, PayrollPolicy.__table__]
+    )
+    db = Session(bind=engine)
+
+    service = PayrollAIService()
+    record = db.get(Payroll, payroll_service.calculate_payroll(db, 7, 1, 2026, 5000.0)["id"])
+    service.explain_payslip(record)
+    payroll_service.calculate_payroll(db, 8, 1, 2026, 5000.0)
+    service.explain_payslip(record)
+    assert len(openrouter["requests"]) == 1  # another employee's run leaves it cached
+
+    payroll_service.calculate_payroll(db, 7, 1, 2026, 5000.0)
+    service.explain_payslip(record)
+    db.close()
+    cache.close()
+    assert len(openrouter["requests"]) == 2
+
+
+def test_micro_batcher_packs_concurrent_items_and_retries_missing(monkeypatch):
+    batch_calls, single_calls = [], []
+
+    def fake_call_model(messages, **kwargs):
+        items = json.loads(messages[1]["content"])
+        batch_calls.append(len(items))
+        # The model drops the last item from its answer
+        return json.dumps({"results": [{"id": item["id"], "label": item["text"].upper()} for item in items[:-1]]})
+
+    def fake_analyze_text(system_prompt, text, **kwargs):
+        single_calls.append(text)
+        return {"label": text.upper()}
+
+    monkeypatch.setattr(AIOrchestrator, "call_model", fake_call_model)
+    monkeypatch.setattr(AIOrchestrator, "analyze_text", fake_analyze_text)
+    batcher = MicroBatcher("test", "Label the text. Return JSON: {\"label\": \"...\"}", max_items=5, max_wait_ms=1000)
+
+    results = {}
+    threads = [
+        threading.Thread(target=lambda t=text: results.__setitem__(t, batcher.submit(t, 1)))
+        for text in ["a", "b", "c", "d", "e"]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert batch_calls == [5]  # flushed as soon as max_items arrived, not after max_wait
+    assert len(single_calls) == 1
+    assert results == {text: {"label": text.upper()} for text in "abcde"}
+
+
+def test_micro_batcher_keeps_organizations_in_separate_calls(monkeypatch):
+    batch_calls, single_calls = [], []
+
+    def fake_call_model(messages, organization_id=None, **kwargs):
+        items = json.loads(messages[1]["content"])
+        batch_calls.append((organization_id, sorted(item["text"] for item in items)))
+        return json.dumps({"results": [{"id": item["id"], "org": organization_id} for item in items]})
+
+    def fake_analyze_text(system_prompt, text, organization_id=None, **kwargs):
+        single_calls.append((organization_id, text))
+        return {"org": organization_id}
+
+    monkeypatch.setattr(AIOrchestrator, "call_model", fake_call_model)
+    monkeypatch.setattr(AIOrchestrator, "analyze_text", fake_analyze_text)
+    batcher = MicroBatcher("test", "Label the text.", max_items=4, max_wait_ms=200)
+
+    results = {}
+    threads = [
+        threading.Thread(target=lambda t=text, o=org: results.__setitem__(t, batcher.submit(t, o)))
+        for text, org in [("a", 1), ("b", 2), ("c", 1), ("d", 2)]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(batch_calls) == [(1, ["a", "c"]), (2, ["b", "d"])]
+    assert results == {"a": {"org": 1}, "b": {"org": 2}, "c": {"org": 1}, "d": {"org": 2}}
+
+    # Without an organization an item is never pooled with others, and does not wait for company
+    started = time.perf_counter()
+    assert batcher.submit("e", None) == {"org": None}
+    assert time.perf_counter() - started < 0.1
+    assert single_calls == [(None, "e")]
+
+
+def test_slow_primary_is_hedged_and_failing_model_is_skipped(openrouter, monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedge_default_delay", 0.05)
+    monkeypatch.setattr(settings, "ai_circuit_min_calls", 2)
+    messages = [{"role": "user", "content": "hi"}]
+
+    openrouter["delay"][settings.ai.model_name] = 2.0
+    started = time.perf_counter()
+    assert AIOrchestrator.call_model(messages, json_output=False) == f"echo {settings.ai_fallback_model}"
+    assert time.perf_counter() - started < 1.0  # did not wait for the slow primary
+    # The cancelled primary still contributes a (lower-bound) latency sample
+    assert LatencyTracker._samples[settings.ai.model_name][-1] >= 0.05
+
+    openrouter["delay"].clear()
+    openrouter["failing"].add(settings.ai.model_name)
+    for _ in range(2):
+        assert AIOrchestrator.call_model(messages, json_output=False) == f"echo {settings.ai_fallback_model}"
+    assert CircuitBreaker.is_open(settings.ai.model_name)
+
+    openrouter["requests"].clear()
+    assert AIOrchestrator.call_model(messages, json_output=False) == f"echo {settings.ai_fallback_model}"
+    assert [body["model"] for body in openrouter["requests"]] == [settings.ai_fallback_model]
+
+
+def test_governor_honors_retry_after(openrouter):
+    openrouter["rate_limited"] = 1
+    started = time.perf_counter()
+    result = AIOrchestrator.call_model([{"role": "user", "content": "hi"}], json_output=False)
+
+    assert result == f"echo {settings.ai.model_name}"
+    assert time.perf_counter() - started >= 0.3  # the retry waited for Retry-After
+    assert len(openrouter["requests"]) == 2
+
+
+def test_governor_serves_interactive_before_background(monkeypatch):
+    monkeypatch.setattr(settings, "ai_rpm_limit", 120)  # refills 2 requests/second
+    monkeypatch.setattr(settings, "ai_tpm_limit", 0)
+    monkeypatch.setattr(settings, "ai_org_rpm_limit", 0)
+    monkeypatch.setattr(settings, "ai_org_tpm_limit", 0)
+    RateGovernor.reset()
+    order = []
+
+    async def call(name, priority):
+        await RateGovernor.acquire(100, priority=priority)
+        order.append(name)
+
+    async def scenario():
+        for _ in range(120):
+            await RateGovernor.acquire(1)  # drain the minute's budget
+        background = asyncio.ensure_future(call("background", AIPriority.BACKGROUND))
+        await asyncio.sleep(0.05)
+        await asyncio.gather(background, call("interactive", AIPriority.INTERACTIVE))
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        RateGovernor.reset()
+    assert order == ["interactive", "background"]
+
+
+def test_governor_rejection_is_not_retried_or_counted_against_models(openrouter, monkeypatch):
+    monkeypatch.setattr(settings, "ai_rpm_limit", 1)
+    monkeypatch.setattr(settings, "ai_governor_max_wait", 0.2)
+    monkeypatch.setattr(settings, "ai_circuit_min_calls", 1)
+    messages = [{"role": "user", "content": "hi"}]
+    AIOrchestrator.call_model(messages, json_output=False)
+
+    started = time.perf_counter()
+    with pytest.raises(AICapacityError):
+        AIOrchestrator.call_model(messages, json_output=False)
+    assert time.perf_counter() - started < 1.0
+    assert len(openrouter["requests"]) == 1
+    assert not CircuitBreaker.is_open(settings.ai.model_name)
+
+
+def test_requests_draw_from_their_organizations_budget(openrouter, monkeypatch):
+    from fastapi import Depends, FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routers.auth_deps import get_current_org
+    from app.services.auth import create_access_token
+
+    monkeypatch.setattr(settings, "ai_org_rpm_limit", 1)
+    monkeypatch.setattr(settings, "ai_governor_max_wait", 0.2)
+    app = FastAPI()
+
+    @app.post("/ask")
+    def ask(question: str, org_id: int = Depends(get_current_org)):
+        try:
+            return {"answer": PayrollAIService().answer_payroll_question(question)}
+        except AICapacityError:
+            return {"answer": None}
+
+    client = TestClient(app)
+
+    def ask_as(org_id, question):
+        token = create_access_token({"sub": "hr@example.com", "org_id": org_id})
+        response = client.post("/ask", params={"question": question}, headers={"Authorization": f"Bearer {token}"})
+        return response.json()["answer"]
+
+    assert ask_as(1, "When is payday?") == f"echo {settings.ai.model_name}"
+    assert ask_as(1, "What is my tax code?") is None  # org 1 spent its one request this minute
+    assert ask_as(2, "What is my tax code?") == f"echo {settings.ai.model_name}"  # org 2 has its own
+    assert RateGovernor._buckets[("rpm", 1)].tokens < 1
+    assert RateGovernor._buckets[("rpm", 2)].tokens < 1
+    assert len(openrouter["requests"]) == 2
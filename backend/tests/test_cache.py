@@ -0,0 +1,195 @@
+"""
+Tests for the two-tier cache: in-process LRU bounds, tag invalidation, key
+building, stale-while-revalidate and the Redis backend.
+"""
+import threading
+import time
+
+import diskcache
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.cache import CacheManager, _refresh_keys, cache_ai_response, collapse_whitespace, text_key
+from app.core.cache_backends import RedisCacheBackend
+from app.core.config import settings
+from app.database import Base
+from app.models.employee import Employee
+from app.models.performance_metric import PerformanceMetric
+from app.services.ai_orchestrator import AIOrchestrator
+from app.services.wellbeing_service import WellbeingService
+
+
+@pytest.fixture()
+def cache(tmp_path, monkeypatch):
+    disk = diskcache.Cache(str(tmp_path / "diskcache"))
+    monkeypatch.setattr(CacheManager, "_cache", disk)
+    yield disk
+    disk.close()
+
+
+def test_memory_tier_serves_hits_and_stays_within_byte_budget(cache, monkeypatch):
+    monkeypatch.setattr(settings, "cache_memory_max_bytes", 4096)
+    monkeypatch.setattr(CacheManager, "_memory", None)
+    for i in range(20):
+        CacheManager.set(f"k{i}", "x" * 500)
+
+    memory = CacheManager._memory_tier()
+    assert memory.size <= 4096
+    assert "k19" in memory._entries and "k0" not in memory._entries  # least recently used went first
+    # Evicted entries are still served (and promoted) from disk
+    assert CacheManager.get("k0") == "x" * 500
+    assert "k0" in memory._entries
+
+    cache.set("k19", "changed on disk")
+    assert CacheManager.get("k19") == "x" * 500  # memory hit, disk not read
+
+
+def test_invalidate_tags_drops_entries_in_both_tiers(cache, monkeypatch):
+    org_7, org_8 = CacheManager.tag("org", 7), CacheManager.tag("org", 8)
+    CacheManager.set("answer:7", {"answer": "A"}, tags=[org_7, CacheManager.tag("domain", "documents")])
+    CacheManager.set("answer:8", {"answer": "B"}, tags=[org_8])
+
+    CacheManager.invalidate_tags(org_7)
+    assert CacheManager.get("answer:7") is None
+    assert CacheManager.get("answer:8") == {"answer": "B"}
+
+    # Another worker's invalidation is picked up from disk once the local generation is refreshed
+    CacheManager.set("answer:8", {"answer": "B"}, tags=[org_8])
+    cache.incr(CacheManager._tag_key(org_8), default=0)
+    monkeypatch.setattr(settings, "cache_tag_refresh_seconds", 0)
+    assert CacheManager.get("answer:8") is None
+
+
+def test_key_builder_normalizes_declared_arguments(cache):
+    calls = []
+
+    class Service:
+        @cache_ai_response("interview", key={"job_title": collapse_whitespace, "resume": text_key(2000)})
+        def generate_questions(self, job_title, resume, db=None):
+            calls.append(job_title)
+            return ["Why?"]
+
+    resume = "x" * 2000
+    service = Service()
+    service.generate_questions("Site  Reliability\nEngineer", resume, db=object())
+    # Whitespace, the truncated tail and undeclared arguments do not change the key
+    service.generate_questions("Site Reliability Engineer", resume + " ignored tail", db=object())
+    service.generate_questions("Site Reliability Engineer", "y" + resume[1:])
+    assert len(calls) == 2
+
+
+def test_unhashable_arguments_bypass_the_cache(cache):
+    calls = []
+
+    @cache_ai_response("payroll")
+    def explain(record):
+        calls.append(record)
+        return "ok"
+
+    record = object()
+    assert explain(record) == explain(record) == "ok"
+    assert len(calls) == 2
+
+
+def test_stale_value_is_served_while_one_background_refresh_runs(cache, monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    @cache_ai_response("onboarding", expire=24 * 3600, stale_after=3600)
+    def tips(name):
+        calls.append(name)
+        if len(calls) > 1:
+            release.wait(5)
+        return f"tips v{len(calls)}"
+
+    assert tips("Ada") == "tips v1"
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2 * 3600)  # past the soft TTL, within the hard TTL
+
+    # Stale callers return immediately; only one refresh reaches the model
+    assert [tips("Ada") for _ in range(3)] == ["tips v1"] * 3
+    release.set()
+    for _ in range(100):
+        if not _refresh_keys:
+            break
+        time.sleep(0.05)
+    assert len(calls) == 2
+    assert tips("Ada") == "tips v2"
+
+
+def test_redis_backend_round_trips_compressed_values_and_counters(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisCacheBackend.from_client(fakeredis.FakeRedis(), prefix="test:", compress_min_bytes=64)
+    monkeypatch.setattr(CacheManager, "_cache", backend)
+
+    resume = {"text": "Python developer " * 200}
+    CacheManager.set("resume", resume, expire=60, tags=[CacheManager.tag("org", 1)])
+    CacheManager.evict_local("resume")
+    assert CacheManager.get("resume") == resume
+    assert backend._client.get("test:resume")[:1] == b"\x01"  # stored compressed
+    assert backend.incr("version", default=0) == 1
+    assert backend.get("version", default=0) == 1
+
+    CacheManager.invalidate_tags(CacheManager.tag("org", 1))
+    assert CacheManager.get("resume") is None
+
+
+def test_redis_transact_locks_only_the_key_being_rewritten(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisCacheBackend.from_client(fakeredis.FakeRedis(), prefix="test:")
+    monkeypatch.setattr(CacheManager, "_cache", backend)
+
+    with CacheManager.transact("recent:a"):
+        assert backend._client.exists("test:lock:recent:a")
+        # A different key is not held up
+        other = backend._client.lock("test:lock:recent:b", blocking_timeout=0)
+        assert other.acquire()
+        other.release()
+        # The same key is
+        same = backend._client.lock("test:lock:recent:a", blocking_timeout=0)
+        assert not same.acquire()
+    assert not backend._client.exists("test:lock:recent:a")
+
+
+def test_entity_tags_cover_the_entry_and_the_calls_beneath_it(cache):
+    model_calls = []
+
+    @cache_ai_response("onboarding")  # stands in for the gateway cache
+    def model(prompt):
+        model_calls.append(prompt)
+        return f"reply {len(model_calls)}"
+
+    @cache_ai_response("onboarding", tags=lambda args: [CacheManager.tag("onboarding_employee", args["employee_id"])])
+    def tips(employee_id, progress):
+        return model(f"progress {progress}")
+
+    assert tips(1, 50) == "reply 1"
+    assert tips(2, 80) == "reply 2"
+
+    CacheManager.invalidate_tags(CacheManager.tag("onboarding_employee", 1))
+    assert tips(1, 50) == "reply 3"  # both layers were dropped, so the model is asked again
+    assert tips(2, 80) == "reply 2"
+    assert len(model_calls) == 3
+
+
+def test_cached_wellbeing_assessment_is_stamped_per_request(cache, monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[Employee.__table__, PerformanceMetric.__table__])
+    db = Session(bind=engine)
+    calls = []
+    monkeypatch.setattr(
+        AIOrchestrator, "analyze_text",
+        lambda *args, **kwargs: calls.append(args) or {"support_priority": "low", "analysis": "Steady."}
+    )
+
+    service = WellbeingService(db, organization_id=1)
+    first = service.calculate_risk(5)
+    time.sleep(0.01)
+    second = service.calculate_risk(5)
+    db.close()
+
+    assert len(calls) == 1
+    assert second["support_priority"] == "low"
+    assert second["trust_metadata"]["timestamp"] > first["trust_metadata"]["timestamp"]
@@ -0,0 +1,123 @@
+"""
+Tests for the AI cache prewarm job.
+"""
+import json
+from datetime import date
+
+import diskcache
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.cache import CacheManager
+from app.core.config import settings
+from app.core.http_client import HTTPClientManager
+from app.database import Base
+from app.models.job import Job
+from app.models.payroll import Payroll
+from app.models.salary_component import SalaryComponent
+from app.services.ai_orchestrator import AIOrchestrator
+from app.services.cache_prewarm import prewarm_ai_cache
+from app.models.onboarding_employee import OnboardingEmployee
+from app.services import onboarding_ai
+from app.services.onboarding_ai import generate_onboarding_checklist, get_onboarding_tips
+from app.services.payroll_ai import PayrollAIService
+
+
+@pytest.fixture()
+def db_session(tmp_path, monkeypatch):
+    cache = diskcache.Cache(str(tmp_path / "cache"))
+    monkeypatch.setattr(CacheManager, "_cache", cache)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[Job.__table__, Payroll.__table__, SalaryComponent.__table__])
+    db = Session(bind=engine)
+    yield db
+    db.close()
+    cache.close()
+    HTTPClientManager.shutdown()
+
+
+@pytest.fixture()
+def model(monkeypatch):
+    """Fake upstream below the gateway, so the gateway's own response cache is exercised."""
+    monkeypatch.setattr(settings.ai, "openrouter_api_key", "test-key")
+    monkeypatch.setattr(settings.ai, "kill_switch", False)
+    state = {"prompts": [], "tasks": 10, "reply": None}
+
+    async def fake_call(messages, temperature, json_output, domain):
+        state["prompts"].append(messages[-1]["content"])
+        if state["reply"] is not None:
+            return state["reply"], settings.ai.model_name
+        tasks = [{"title": f"Task {i}", "category": "training", "priority": "medium", "day_offset": i}
+                 for i in range(state["tasks"])]
+        body = {"tasks": tasks, "questions": [{"id": 1, "text": "Why?"}], "evaluation_criteria": []}
+        return json.dumps(body), settings.ai.model_name
+
+    monkeypatch.setattr(AIOrchestrator, "_acall_with_fallback", fake_call)
+    return state
+
+
+def test_prewarm_fills_caches_that_user_requests_hit(db_session, model):
+    payroll = Payroll(employee_id="7", month=5, year=2025, base_salary=5000, net_salary=4100, organization_id=1)
+    db_session.add_all([
+        Job(title="Data Engineer", department="Data", requirements="SQL", organization_id=1),
+        Job(title="Data Engineer", department="Data", requirements="Spark", organization_id=1),
+        Job(title="Recruiter", department="HR", requirements="", organization_id=1, is_active=False),
+        payroll,
+        Payroll(employee_id="8", month=4, year=2025, base_salary=5000, net_salary=4100, organization_id=1),
+    ])
+    db_session.flush()
+    db_session.add_all([
+        SalaryComponent(payroll_id=payroll.id, component_type="bonus", name="Bonus", amount=300),
+        SalaryComponent(payroll_id=payroll.id, component_type="deduction", name="Tax", amount=1200),
+    ])
+    db_session.commit()
+
+    summary = prewarm_ai_cache(db_session, organization_id=1, month=5, year=2025, concurrency=2)
+
+    assert summary == {
+        "interview": {"warmed": 1, "failed": 0},
+        "onboarding": {"warmed": 1, "failed": 0},
+        "payroll": {"warmed": 1, "failed": 0},
+    }
+    assert len(model["prompts"]) == 3  # duplicate job titles and other months are skipped
+
+    # Users' later requests (components lazily loaded this time) are cache hits
+    db_session.expire_all()
+    generate_onboarding_checklist(position="Data Engineer", department="Data")
+    PayrollAIService().explain_payslip(db_session.query(Payroll).filter(Payroll.employee_id == "7").one())
+    assert len(model["prompts"]) == 3
+
+
+def test_malformed_checklist_is_not_cached_or_counted_as_warmed(db_session, model):
+    model["tasks"] = 2
+    db_session.add(Job(title="Designer", department="Product", requirements="", organization_id=1))
+    db_session.commit()
+
+    summary = prewarm_ai_cache(db_session, targets=["onboarding"], concurrency=1)
+    assert summary == {"onboarding": {"warmed": 0, "failed": 1}}
+
+    assert generate_onboarding_checklist("Designer", "Product")[0]["title"] == "Complete HR paperwork"
+    model["tasks"] = 10
+    assert generate_onboarding_checklist("Designer", "Product")[0]["title"] == "Task 0"
+
+
+def test_malformed_tips_fall_back_without_being_cached(db_session, model, monkeypatch):
+    progress = {"completion_percentage": 40, "overdue_tasks": [], "next_actions": [{"title": "Meet your buddy"}]}
+    monkeypatch.setattr(onboarding_ai, "analyze_progress", lambda employee_id, db: progress)
+    employee = OnboardingEmployee(
+        id=3, employee_name="Ada", position="Designer", department="Product", start_date=date(2026, 10, 1)
+    )
+
+    model["reply"] = "Sorry, I can't help with that."
+    fallback = get_onboarding_tips(employee, db_session)
+    assert fallback["tips"][0].startswith("Block 30 minutes")
+    assert fallback["next_actions"] == ["Meet your buddy"]
+
+    model["reply"] = json.dumps({"tips": ["Pair on a small ticket"], "next_actions": [], "motivation": "Nice start!"})
+    tips = get_onboarding_tips(employee, db_session)
+    assert tips["tips"] == ["Pair on a small ticket"]
+    assert tips["next_actions"] == ["Meet your buddy"]
+    assert get_onboarding_tips(employee, db_session)["motivation"] == "Nice start!"
+    assert len(model["prompts"]) == 2
@@ -0,0 +1,129 @@
+"""
+Tests for background document ingestion: upload streaming, staged pipeline, status.
+"""
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.chunk_term import ChunkTerm
+from app.models.document import Document, DocumentStatus
+from app.models.document_chunk import DocumentChunk
+from app.models.embedding_cache import EmbeddingCache
+from app.services.chunking import iter_chunks
+from app.services.document_ai import (
+    process_document_ingestion, process_document_reindex, process_uploaded_file
+)
+from app.services.embedding_service import semantic_search
+from app.services.keyword_index import KeywordIndexRegistry
+from app.services.vector_index import VectorIndexRegistry
+
+HANDBOOK = (
+    "Employees accrue twenty vacation days per year. "
+    "Parental leave is sixteen weeks of paid leave for all new parents. "
+) * 40
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(
+        bind=engine,
+        tables=[Document.__table__, DocumentChunk.__table__, ChunkTerm.__table__, EmbeddingCache.__table__]
+    )
+    db = Session(bind=engine)
+    VectorIndexRegistry.invalidate()
+    KeywordIndexRegistry.invalidate()
+    yield db
+    db.close()
+    VectorIndexRegistry.invalidate()
+    KeywordIndexRegistry.invalidate()
+
+
+def _upload(db, tmp_path, name, content):
+    upload = UploadFile(file=io.BytesIO(content), filename=name)
+    return asyncio.run(process_uploaded_file(upload, 5, "hr@example.com", db, upload_dir=str(tmp_path)))
+
+
+def test_upload_returns_processing_then_ingests(db_session, tmp_path):
+    document = _upload(db_session, tmp_path, "handbook.txt", HANDBOOK.encode())
+    assert document.status == DocumentStatus.PROCESSING
+    assert db_session.query(DocumentChunk).count() == 0
+
+    result = process_document_ingestion(db_session, {"document_id": document.id})
+    db_session.refresh(document)
+
+    assert document.status == DocumentStatus.READY
+    assert document.progress == 100
+    assert result["chunks"] == db_session.query(DocumentChunk).count() > 1
+    query = semantic_search([1.0] * 384, 5, db_session, top_k=1)
+    assert query[0]["document_id"] == document.id
+
+
+def test_ingestion_updates_the_loaded_index_in_place(db_session, tmp_path, monkeypatch):
+    from app.services import vector_index
+
+    first = _upload(db_session, tmp_path, "handbook.txt", HANDBOOK.encode())
+    process_document_ingestion(db_session, {"document_id": first.id})
+    semantic_search([1.0] * 384, 5, db_session, top_k=1)
+    index = VectorIndexRegistry._indexes[5]
+
+    monkeypatch.setattr(vector_index, "build_index", lambda *a: pytest.fail("index rebuilt after local ingest"))
+    second = _upload(db_session, tmp_path, "benefits.txt", b"Dental cover starts on day one. " * 20)
+    process_document_ingestion(db_session, {"document_id": second.id})
+
+    hits = semantic_search([1.0] * 384, 5, db_session, top_k=100)
+    assert {h["document_id"] for h in hits} == {first.id, second.id}
+    assert VectorIndexRegistry._indexes[5] is index
+
+
+def test_failed_ingestion_is_reported_on_document(db_session, tmp_path):
+    document = _upload(db_session, tmp_path, "empty.txt", b"   ")
+
+    with pytest.raises(ValueError):
+        process_document_ingestion(db_session, {"document_id": document.id})
+    db_session.refresh(document)
+
+    assert document.status == DocumentStatus.FAILED
+    assert "empty" in document.error
+    assert db_session.query(DocumentChunk).count() == 0
+
+
+def test_reindex_swaps_chunks_in_place(db_session, tmp_path, monkeypatch):
+    document = _upload(db_session, tmp_path, "handbook.txt", HANDBOOK.encode())
+    process_document_ingestion(db_session, {"document_id": document.id})
+    old_ids = {c.id for c in db_session.query(DocumentChunk)}
+    assert semantic_search([1.0] * 384, 5, db_session, top_k=1)
+
+    monkeypatch.setattr("app.services.document_ai.CHUNK_SIZE", 300)
+    monkeypatch.setattr("app.services.document_ai.CHUNK_OVERLAP", 50)
+    result = process_document_reindex(db_session, {"organization_id": 5})
+
+    chunks = db_session.query(DocumentChunk).order_by(DocumentChunk.chunk_index).all()
+    assert result == {"reindexed": [document.id], "failed": []}
+    assert old_ids.isdisjoint(c.id for c in chunks)
+    assert [c.chunk_index for c in chunks] == list(range(len(chunks)))
+    assert all(len(c.chunk_text) <= 300 and c.page_start == 1 for c in chunks)
+    hits = semantic_search([1.0] * 384, 5, db_session, top_k=len(chunks) + 5)
+    assert {h["chunk_id"] for h in hits} == {c.id for c in chunks}
+
+
+def test_iter_chunks_respects_sentences_and_pages():
+    pages = ["First policy sentence. Second policy sentence.", "Third sentence on page two. Fourth one here."]
+    chunks = list(iter_chunks(pages, chunk_size=60, overlap=30))
+
+    assert all(len(c.text) <= 60 for c in chunks)
+    assert all(c.text.endswith(".") for c in chunks)
+    assert (chunks[0].page_start, chunks[-1].page_end) == (1, 2)
+    # Overlap is carried at sentence granularity
+    assert chunks[1].text.startswith("Second policy sentence.")
+    # Unpunctuated text is split at word boundaries and still overlaps
+    token_chunks = list(iter_chunks(["word " * 1000], chunk_size=100, overlap=10, unit="tokens"))
+    assert [len(c.text.split()) for c in token_chunks] == [100] * 11
@@ -0,0 +1,157 @@
+"""
+Tests for the RAG answer path: answer cache, invalidation and streaming.
+"""
+import diskcache
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.cache import CacheManager
+from app.database import Base
+from app.models.chunk_term import ChunkTerm
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.models.embedding_cache import EmbeddingCache
+from app.services import document_ai
+from app.services.chunking import iter_chunks
+from app.services.context_packing import estimate_tokens, pack_context
+from app.services.keyword_index import KeywordIndexRegistry
+from app.services.rag_cache import RagAnswerCache, normalize_question
+from app.services.vector_index import VectorIndexRegistry
+
+
+@pytest.fixture()
+def answer_cache(tmp_path, monkeypatch):
+    cache = diskcache.Cache(str(tmp_path / "cache"))
+    monkeypatch.setattr(CacheManager, "_cache", cache)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(
+        bind=engine,
+        tables=[Document.__table__, DocumentChunk.__table__, ChunkTerm.__table__, EmbeddingCache.__table__]
+    )
+    db = Session(bind=engine)
+    VectorIndexRegistry.invalidate()
+    KeywordIndexRegistry.invalidate()
+    yield db
+    db.close()
+    VectorIndexRegistry.invalidate()
+    KeywordIndexRegistry.invalidate()
+
+
+def test_exact_and_similar_hits_until_corpus_changes(answer_cache):
+    answer = {"answer": "Twenty days.", "sources": [], "confidence": 0.9, "trust": {}}
+    embedding = np.random.default_rng(0).normal(size=16)
+    RagAnswerCache.set(3, "How many vacation days?", embedding.tolist(), answer)
+
+    assert normalize_question("  HOW many vacation-days ") == "how many vacation days"
+    assert RagAnswerCache.get(3, "how many vacation days") == answer
+    assert RagAnswerCache.get(4, "how many vacation days") is None
+    assert RagAnswerCache.get_similar(3, (embedding + 0.01).tolist()) == answer
+    assert RagAnswerCache.get_similar(3, (-embedding).tolist()) is None
+
+    RagAnswerCache.bump_corpus_version(3)
+    assert RagAnswerCache.get(3, "how many vacation days") is None
+    assert RagAnswerCache.get_similar(3, embedding.tolist()) is None
+
+
+def test_query_documents_skips_search_and_model_on_hit(answer_cache, db_session, monkeypatch):
+    doc = Document(filename="handbook.txt", file_path="x", file_type=".txt", organization_id=3)
+    db_session.add(doc)
+    db_session.flush()
+    db_session.add(DocumentChunk(
+        document_id=doc.id, chunk_text="Employees get twenty vacation days.", chunk_index=0,
+        embedding_vector=[1.0] * 384
+    ))
+    db_session.commit()
+
+    calls = []
+    monkeypatch.setattr(
+        document_ai, "generate_rag_answer",
+        lambda q, c, organization_id=None: calls.append((q, organization_id)) or ("Twenty days.", 0.8)
+    )
+    first = document_ai.query_documents("How many vacation days?", 3, db_session)
+    monkeypatch.setattr(document_ai, "hybrid_search", lambda *a, **k: pytest.fail("search on cache hit"))
+    second = document_ai.query_documents("how many vacation days", 3, db_session)
+
+    assert calls == [("How many vacation days?", 3)]  # charged to the asking organization
+    assert second["answer"] == first["answer"] == "Twenty days."
+    assert second["trust_metadata_obj"].sources[0].filename == "handbook.txt"
+
+    assert document_ai.delete_document(doc.id, 3, db_session)
+    assert RagAnswerCache.get(3, "how many vacation days") is None
+
+
+def test_stream_emits_sources_then_tokens_then_done(answer_cache, db_session, monkeypatch):
+    doc = Document(filename="benefits.txt", file_path="x", file_type=".txt", organization_id=8)
+    db_session.add(doc)
+    db_session.flush()
+    db_session.add(DocumentChunk(
+        document_id=doc.id, chunk_text="Parental leave is sixteen weeks.", chunk_index=0,
+        embedding_vector=[1.0] * 384
+    ))
+    db_session.commit()
+
+    monkeypatch.setattr(
+        document_ai.AIOrchestrator, "stream_model", lambda *a, **k: iter(["Sixteen ", "weeks."])
+    )
+    events = list(document_ai.stream_query_documents("parental leave?", 8, db_session))
+
+    assert [name for name, _ in events] == ["sources", "token", "token", "done"]
+    assert events[0][1][0]["filename"] == "benefits.txt"
+    done = events[-1][1]
+    assert done["answer"] == "Sixteen weeks."
+    assert done["trust_metadata_obj"].sources[0].document_id == doc.id
+    # The streamed answer is cached for the non-streaming endpoint too
+    assert document_ai.query_documents("Parental leave", 8, db_session)["answer"] == "Sixteen weeks."
+
+
+def test_pack_context_merges_dedupes_and_fits_budget():
+    sentences = [f"Policy clause {i} covers remote work allowance number {i}." for i in range(12)]
+    chunks = [chunk.text for chunk in iter_chunks([" ".join(sentences)], chunk_size=200, overlap=60)]
+    results = [
+        {"document_id": 1, "chunk_index": i, "chunk_text": text, "combined_score": 0.9 - i * 0.01}
+        for i, text in enumerate(chunks[:3])
+    ]
+    # Same text in an older version of the document, and an unrelated chunk
+    results.append({"document_id": 2, "chunk_index": 0, "chunk_text": chunks[0], "combined_score": 0.5})
+    results.append({"document_id": 3, "chunk_index": 4, "chunk_text": "Parking is free on weekends.", "combined_score": 0.4})
+
+    packed = pack_context(results, token_budget=1000)
+    assert [p["document_id"] for p in packed] == [1, 3]
+    assert packed[0]["chunk_indexes"] == [0, 1, 2]
+    merged = packed[0]["text"]
+    for sentence in sentences[:6]:
+        assert merged.count(sentence) == 1
+    assert len(merged) < sum(len(text) for text in chunks[:3])
+
+    tight = pack_context(results, token_budget=estimate_tokens(merged))
+    assert [p["document_id"] for p in tight] == [1]
+
+
+def test_sources_cite_only_packed_passages(answer_cache, db_session, monkeypatch):
+    results = [
+        {"document_id": 1, "chunk_index": 0, "chunk_text": "Employees get twenty vacation days per year.",
+         "filename": "handbook.txt", "combined_score": 0.9},
+        # Near-duplicate from an older upload: dropped from the prompt, so not cited
+        {"document_id": 2, "chunk_index": 0, "chunk_text": "Employees get twenty vacation days per year.",
+         "filename": "handbook-old.txt", "combined_score": 0.8},
+        {"document_id": 3, "chunk_index": 5, "chunk_text": "Parking is free on weekends.",
+         "filename": "facilities.txt", "combined_score": 0.4},
+    ]
+    monkeypatch.setattr(document_ai, "generate_embeddings", lambda texts, db: [[1.0] * 384])
+    monkeypatch.setattr(document_ai, "hybrid_search", lambda *a, **k: results)
+
+    context = document_ai.retrieve_context("vacation days?", 3, db_session)
+
+    assert [source["filename"] for source in context["sources"]] == ["handbook.txt", "facilities.txt"]
+    assert len(context["context_chunks"]) == 2
@@ -0,0 +1,79 @@
+"""
+Tests for single-flight coalescing of cached AI calls.
+"""
+import fcntl
+import os
+import threading
+import time
+
+import diskcache
+import pytest
+
+from app.core.cache import CacheManager, cache_ai_response
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+
+@pytest.fixture()
+def shared_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cache_dir", str(tmp_path))
+    cache = diskcache.Cache(str(tmp_path / "diskcache"))
+    monkeypatch.setattr(CacheManager, "_cache", cache)
+    yield cache
+    cache.close()
+
+
+def test_concurrent_identical_calls_share_one_upstream_call(shared_cache):
+    calls = []
+    release = threading.Event()
+
+    class Service:
+        @cache_ai_response("interview")
+        def generate_questions(self, job_title):
+            calls.append(job_title)
+            release.wait(5)
+            return [f"Why {job_title}?"]
+
+    service = Service()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.generate_questions("SRE"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["SRE"]
+    assert results == [["Why SRE?"]] * 8
+
+
+def test_leader_reuses_result_published_by_another_worker(shared_cache):
+    key = "wellbeing:call_model:abc"
+    os.makedirs(os.path.dirname(SingleFlight.lock_path(key)), exist_ok=True)
+    # Another worker holds the lock while it computes the same key
+    other_worker = open(SingleFlight.lock_path(key), "a")
+    fcntl.flock(other_worker, fcntl.LOCK_EX)
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(SingleFlight.do(
+        key, lambda: pytest.fail("computed twice"), recheck=lambda: CacheManager.get(key)
+    )))
+    thread.start()
+    time.sleep(0.2)
+    CacheManager.set(key, {"support_priority": "low"})
+    os.unlink(SingleFlight.lock_path(key))
+    fcntl.flock(other_worker, fcntl.LOCK_UN)
+    other_worker.close()
+    thread.join(5)
+
+    assert results == [{"support_priority": "low"}]
+
+
+def test_nested_calls_do_not_wait_on_their_own_lock(shared_cache):
+    started = time.monotonic()
+    result = SingleFlight.do("interview:kit:a", lambda: SingleFlight.do("interview:call_model:b", lambda: "kit"))
+
+    assert result == "kit"
+    assert time.monotonic() - started < 1.0
+    assert os.listdir(os.path.join(settings.cache_dir, "singleflight")) == []  # lock files are cleaned up
@@ -0,0 +1,116 @@
+"""
+Tests for PDF page extraction: parallel ranges, per-page timeouts and the
+in-process fallback when the worker pool dies.
+"""
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+import PyPDF2
+
+from app.core.config import settings
+from app.services import text_extraction
+from app.services.text_extraction import _extract_page_range, count_pages, iter_pages
+
+PAGES = ["Vacation policy", "Parental leave", "Remote work", "Expense claims", "Code of conduct"]
+
+
+def _write_pdf(path, texts):
+    """Minimal PDF with one line of Helvetica text per page."""
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(texts)))
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(texts)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+    return str(path)
+
+
+@pytest.fixture()
+def pdf(tmp_path):
+    return _write_pdf(tmp_path / "policies.pdf", PAGES)
+
+
+@pytest.fixture()
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_extraction_workers", 2)
+    monkeypatch.setattr(settings, "pdf_pages_per_task", 2)
+    yield
+    if text_extraction._executor is not None:
+        text_extraction._executor.shutdown(wait=True)
+        text_extraction._executor = None
+
+
+def test_serial_extraction_uses_the_given_page_count(pdf, monkeypatch):
+    monkeypatch.setattr(settings, "pdf_extraction_workers", 0)
+    assert count_pages(pdf, ".pdf") == len(PAGES)
+
+    def parse_again(*args):
+        raise AssertionError("page count should not be recomputed")
+
+    monkeypatch.setattr(text_extraction, "count_pages", parse_again)
+    pages = list(iter_pages(pdf, ".pdf", len(PAGES)))
+    assert [page.strip() for page in pages] == PAGES
+
+
+def test_parallel_extraction_yields_pages_in_order(pdf, pool):
+    pages = list(iter_pages(pdf, ".pdf", len(PAGES)))
+    assert [page.strip() for page in pages] == PAGES
+    assert text_extraction._executor is not None
+
+
+def test_slow_page_times_out_and_is_skipped(pdf, monkeypatch):
+    extract = PyPDF2.PageObject.extract_text
+
+    def slow_on_second_page(page, *args, **kwargs):
+        text = extract(page, *args, **kwargs)
+        if "Parental" in text:
+            time.sleep(5)
+        return text
+
+    monkeypatch.setattr(PyPDF2.PageObject, "extract_text", slow_on_second_page)
+    started = time.monotonic()
+    pages = _extract_page_range(pdf, 0, 3, page_timeout=0.2)
+
+    assert time.monotonic() - started < 2
+    assert [page.strip() for page in pages] == ["Vacation policy", "", "Remote work"]
+
+
+def test_broken_pool_falls_back_to_in_process_extraction(pdf, pool, monkeypatch):
+    class DeadPool:
+        shut_down = False
+
+        def submit(self, *args):
+            future = Future()
+            future.set_exception(BrokenProcessPool("worker killed"))
+            return future
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = True
+
+    dead = DeadPool()
+    monkeypatch.setattr(text_extraction, "_executor", dead)
+
+    pages = list(iter_pages(pdf, ".pdf"))
+    assert [page.strip() for page in pages] == PAGES
+    assert dead.shut_down
+    assert text_extraction._executor is None  # the next ingest gets a fresh pool
@@ -0,0 +1,328 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.chunk_term import ChunkTerm
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.models.embedding_cache import EmbeddingCache
+from app.services.embedding_service import (
+    NumpyEmbeddingBackend, _fallback_embedding, generate_embeddings, hybrid_search,
+    semantic_search, set_embedding_backend
+)
+from app.services.keyword_index import (
+    KeywordIndex, KeywordIndexRegistry, analyze_chunks, build_postings, store_postings
+)
+from app.services.vector_index import VectorIndex, VectorIndexRegistry, corpus_signature
+
+
+def _random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(
+        bind=engine, tables=[Document.__table__, DocumentChunk.__table__, ChunkTerm.__table__, EmbeddingCache.__table__]
+    )
+    db = Session(bind=engine)
+    VectorIndexRegistry.invalidate()
+    KeywordIndexRegistry.invalidate()
+    yield db
+    db.close()
+    VectorIndexRegistry.invalidate()
+    KeywordIndexRegistry.invalidate()
+
+
+def test_search_matches_brute_force():
+    vectors = _random_vectors(200)
+    index = VectorIndex()
+    index.add(list(range(1, 201)), [1] * 200, list(range(200)), vectors)
+
+    query = vectors[42] + 0.01
+    hits = index.search(query, top_k=5)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5] + 1
+    assert [h["chunk_id"] for h in hits] == expected.tolist()
+    assert hits[0]["chunk_id"] == 43
+
+
+def test_remove_documents_and_filter():
+    vectors = _random_vectors(10)
+    index = VectorIndex()
+    index.add(list(range(1, 11)), [1] * 5 + [2] * 5, list(range(10)), vectors)
+
+    assert index.remove_documents([1]) == 5
+    assert len(index) == 5
+    assert all(h["document_id"] == 2 for h in index.search(vectors[0], top_k=10))
+    assert index.search(vectors[0], top_k=3, document_ids=[1]) == []
+
+
+def test_partitioned_index_finds_exact_match(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "vector_index_ivf_threshold", 500)
+    monkeypatch.setattr(settings, "vector_index_ivf_lists", 8)
+    monkeypatch.setattr(settings, "vector_index_ivf_probes", 2)
+
+    vectors = _random_vectors(1000, seed=1)
+    index = VectorIndex()
+    index.add(list(range(1000)), [1] * 1000, list(range(1000)), vectors)
+
+    assert index.is_partitioned
+    assert index.search(vectors[123], top_k=1)[0]["chunk_id"] == 123
+
+
+def test_registry_rebuilds_when_corpus_changes(db_session):
+    vectors = _random_vectors(3)
+    doc = Document(filename="handbook.txt", file_path="x", file_type=".txt", organization_id=7)
+    db_session.add(doc)
+    db_session.flush()
+    for i, vec in enumerate(vectors):
+        db_session.add(DocumentChunk(document_id=doc.id, chunk_text=f"chunk {i}", chunk_index=i, embedding_vector=vec.tolist()))
+    db_session.commit()
+
+    results = semantic_search(vectors[1].tolist(), 7, db_session, top_k=1)
+    assert results[0]["chunk_text"] == "chunk 1"
+    index = VectorIndexRegistry.get(db_session, 7)
+    assert index.signature() == corpus_signature(db_session, 7)
+
+    # A chunk written by "another worker" invalidates the cached index
+    db_session.add(DocumentChunk(document_id=doc.id, chunk_text="new", chunk_index=3, embedding_vector=(vectors[0] * -1).tolist()))
+    db_session.commit()
+    results = semantic_search((vectors[0] * -1).tolist(), 7, db_session, top_k=1)
+    assert results[0]["chunk_text"] == "new"
+
+
+def test_bm25_prefers_rarer_terms():
+    index = KeywordIndex()
+    chunks = analyze_chunks([
+        (1, "Employees accrue vacation days every month."),
+        (2, "Parental leave is sixteen weeks of paid leave."),
+        (3, "Employees must submit expense reports monthly."),
+    ])
+    for chunk_id, frequencies, length in chunks:
+        index.add(chunk_id, 1, frequencies, length)
+
+    scores = index.score("how much parental leave do employees get")
+    assert max(scores, key=scores.get) == 2
+    assert index.remove_documents([1]) == 3
+    assert index.score("parental leave") == {}
+
+
+def test_hybrid_search_uses_persisted_postings(db_session):
+    texts = ["vacation policy twenty days", "parental leave sixteen weeks", "expense reimbursement rules"]
+    vectors = _random_vectors(3, seed=3)
+    doc = Document(filename="handbook.txt", file_path="x", file_type=".txt", organization_id=9)
+    db_session.add(doc)
+    db_session.flush()
+    chunks = [
+        DocumentChunk(document_id=doc.id, chunk_text=t, chunk_index=i, embedding_vector=v.tolist())
+        for i, (t, v) in enumerate(zip(texts, vectors))
+    ]
+    db_session.add_all(chunks)
+    db_session.flush()
+    # Only the first two chunks get postings at "ingest"; the third is backfilled on load
+    store_postings(db_session, build_postings(9, doc.id, analyze_chunks((c.id, c.chunk_text) for c in chunks[:2])))
+    db_session.commit()
+
+    results = hybrid_search("expense rules", vectors[1].tolist(), 9, db_session, top_k=3)
+    by_text = {r["chunk_text"]: r for r in results}
+    assert by_text["expense reimbursement rules"]["keyword_score"] == 1.0
+    assert by_text["parental leave sixteen weeks"]["similarity"] == pytest.approx(1.0, abs=1e-5)
+    assert {r["filename"] for r in results} == {"handbook.txt"}
+    assert db_session.query(ChunkTerm).filter(ChunkTerm.chunk_id == chunks[2].id).count() == 3
+
+
+def test_stopword_only_chunks_are_backfilled_once(db_session, monkeypatch):
+    from app.services import keyword_index
+
+    vectors = _random_vectors(2, seed=4)
+    doc = Document(filename="notes.txt", file_path="x", file_type=".txt", organization_id=10)
+    db_session.add(doc)
+    db_session.flush()
+    chunks = [
+        DocumentChunk(document_id=doc.id, chunk_text=t, chunk_index=i, embedding_vector=v.tolist())
+        for i, (t, v) in enumerate(zip(["and so it is", "it was what it was"], vectors))
+    ]
+    db_session.add_all(chunks)
+    db_session.flush()
+    store_postings(db_session, build_postings(10, doc.id, analyze_chunks([(chunks[0].id, chunks[0].chunk_text)])))
+    db_session.commit()
+
+    first = keyword_index.build_index(db_session, 10)  # backfills chunks[1]
+    assert first.signature() == corpus_signature(db_session, 10)
+    assert first.score("it was") == {}
+
+    monkeypatch.setattr(keyword_index, "_backfill", lambda *a: pytest.fail("stopword-only chunk re-scanned"))
+    assert keyword_index.build_index(db_session, 10).signature() == corpus_signature(db_session, 10)
+
+
+@pytest.mark.parametrize("storage,tolerance", [("float32", 0), ("float16", 1e-3), ("int8", 2e-2)])
+def test_embedding_blob_roundtrip(storage, tolerance):
+    from app.services.embedding_codec import decode_embedding, encode_embedding
+
+    vector = _random_vectors(1, dim=384)[0]
+    blob = encode_embedding(vector, storage)
+    decoded = decode_embedding(blob)
+
+    assert decoded.dtype == np.float32
+    assert len(blob) == 8 + 384 * {"float32": 4, "float16": 2, "int8": 1}[storage]
+    assert np.max(np.abs(decoded - vector)) <= tolerance * np.max(np.abs(vector))
+
+
+def test_index_builds_from_blob_and_legacy_columns(db_session):
+    from app.services.embedding_codec import embedding_columns
+
+    vectors = _random_vectors(2, seed=5)
+    doc = Document(filename="mixed.txt", file_path="x", file_type=".txt", organization_id=11)
+    db_session.add(doc)
+    db_session.flush()
+    db_session.add(DocumentChunk(document_id=doc.id, chunk_text="legacy", chunk_index=0, embedding_vector=vectors[0].tolist()))
+    db_session.add(DocumentChunk(document_id=doc.id, chunk_text="packed", chunk_index=1, **embedding_columns(vectors[1], "float16")))
+    db_session.commit()
+
+    assert semantic_search(vectors[1].tolist(), 11, db_session, top_k=1)[0]["chunk_text"] == "packed"
+    assert semantic_search(vectors[0].tolist(), 11, db_session, top_k=1)[0]["chunk_text"] == "legacy"
+
+
+def test_index_skips_chunks_with_empty_embeddings(db_session):
+    from app.services.vector_index import build_index
+
+    vector = _random_vectors(1, seed=9)[0]
+    doc = Document(filename="partial.txt", file_path="x", file_type=".txt", organization_id=12)
+    db_session.add(doc)
+    db_session.flush()
+    # Stored but empty: read_embedding returns None for it
+    db_session.add(DocumentChunk(document_id=doc.id, chunk_text="empty", chunk_index=0, embedding_vector=[]))
+    db_session.commit()
+    assert build_index(db_session, 12).signature() == (0, 0, 0)
+
+    db_session.add(DocumentChunk(document_id=doc.id, chunk_text="embedded", chunk_index=1, embedding_vector=vector.tolist()))
+    db_session.commit()
+    assert semantic_search(vector.tolist(), 12, db_session, top_k=1)[0]["chunk_text"] == "embedded"
+
+
+def test_index_skips_unreadable_embedding_blobs(db_session):
+    from app.services.vector_index import build_index
+
+    vector = _random_vectors(1, seed=10)[0]
+    doc = Document(filename="corrupt.txt", file_path="x", file_type=".txt", organization_id=14)
+    db_session.add(doc)
+    db_session.flush()
+    db_session.add(DocumentChunk(document_id=doc.id, chunk_text="corrupt", chunk_index=0, embedding_blob=b"garbage"))
+    db_session.add(DocumentChunk(document_id=doc.id, chunk_text="intact", chunk_index=1, embedding_vector=vector.tolist()))
+    db_session.commit()
+
+    assert build_index(db_session, 14).signature() == corpus_signature(db_session, 14)
+    assert semantic_search(vector.tolist(), 14, db_session, top_k=1)[0]["chunk_text"] == "intact"
+
+
+def test_reused_chunk_ids_still_trigger_a_reload(db_session):
+    from app.services.rag_cache import RagAnswerCache
+
+    vectors = _random_vectors(2, seed=11)
+    doc = Document(filename="old.txt", file_path="x", file_type=".txt", organization_id=15)
+    db_session.add(doc)
+    db_session.flush()
+    old = DocumentChunk(document_id=doc.id, chunk_text="old", chunk_index=0, embedding_vector=vectors[0].tolist())
+    db_session.add(old)
+    db_session.commit()
+    assert semantic_search(vectors[0].tolist(), 15, db_session, top_k=1)[0]["chunk_text"] == "old"
+
+    # Another worker replaces the newest chunk; SQLite hands out the same rowid again
+    old_id = old.id
+    db_session.delete(old)
+    db_session.flush()
+    new = DocumentChunk(document_id=doc.id, chunk_text="new", chunk_index=0, embedding_vector=vectors[1].tolist())
+    db_session.add(new)
+    db_session.commit()
+    RagAnswerCache.bump_corpus_version(15)
+    assert new.id == old_id
+
+    assert semantic_search(vectors[1].tolist(), 15, db_session, top_k=1)[0]["similarity"] > 0.99
+
+
+def test_segment_store_append_and_tombstone(tmp_path):
+    from app.services.embedding_segments import SegmentStore
+
+    vectors = _random_vectors(6, seed=7)
+    index = VectorIndex()
+    index.add([1, 2, 3], [1, 1, 2], [0, 1, 0], vectors[:3])
+
+    store = SegmentStore(42, root=str(tmp_path))
+    assert store.open() is None
+    store.write(index)
+    assert store.append([4, 5, 6], [3, 3, 3], [0, 1, 2], vectors[3:], version=1)
+    assert store.remove_documents([1], version=2)
+
+    mapped = store.open()
+    assert isinstance(mapped._matrix, np.memmap)
+    assert mapped.signature() == (4, 6, 2)
+    assert mapped.search(vectors[4], top_k=1)[0]["chunk_id"] == 5
+    assert all(hit["document_id"] != 1 for hit in mapped.search(vectors[0], top_k=6))
+
+
+def test_registry_serves_from_segments(db_session, tmp_path, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "vector_segments_enabled", True)
+    monkeypatch.setattr(settings, "vector_segments_dir", str(tmp_path))
+
+    vectors = _random_vectors(2, seed=8)
+    doc = Document(filename="a.txt", file_path="x", file_type=".txt", organization_id=13)
+    db_session.add(doc)
+    db_session.flush()
+    for i, vec in enumerate(vectors):
+        db_session.add(DocumentChunk(document_id=doc.id, chunk_text=f"c{i}", chunk_index=i, embedding_vector=vec.tolist()))
+    db_session.commit()
+
+    assert semantic_search(vectors[1].tolist(), 13, db_session, top_k=1)[0]["chunk_text"] == "c1"
+    assert (tmp_path / "org_13" / "manifest.json").exists()
+
+    # A new worker maps the segment instead of rebuilding from the DB
+    VectorIndexRegistry.invalidate()
+    monkeypatch.setattr("app.services.vector_index.build_index", lambda *a: pytest.fail("unexpected DB rebuild"))
+    assert isinstance(VectorIndexRegistry.get(db_session, 13)._matrix, np.memmap)
+
+
+def test_generate_embeddings_reuses_cache(db_session):
+    texts = ["vacation policy", "parental leave", "vacation policy"]
+    embeddings = generate_embeddings(texts, db_session)
+    db_session.commit()
+
+    assert embeddings[0] == embeddings[2]
+    assert np.allclose(embeddings[1], _fallback_embedding("parental leave"))
+    assert db_session.query(EmbeddingCache).count() == 2
+
+    generate_embeddings(["parental leave", "expense rules"], db_session)
+    db_session.commit()
+    assert db_session.query(EmbeddingCache).count() == 3
+
+
+def test_numpy_backend_batches_and_namespaces_cache(db_session, tmp_path):
+    model_path = tmp_path / "embedding.npz"
+    rng = np.random.default_rng(11)
+    np.savez(model_path, idf=np.ones(512, dtype=np.float32), projection=rng.normal(size=(512, 32)).astype(np.float32))
+    backend = NumpyEmbeddingBackend(str(model_path))
+
+    texts = ["parental leave policy", "leave policy for parents", "quarterly expense report"]
+    batch = backend.embed(texts)
+    assert batch.shape == (3, 32)
+    assert np.allclose(batch[2], backend.embed(texts[2:])[0], atol=1e-5)
+
+    generate_embeddings(texts[:1], db_session)
+    set_embedding_backend(backend)
+    try:
+        embeddings = generate_embeddings(texts, db_session)
+    finally:
+        set_embedding_backend(None)
+    db_session.commit()
+
+    assert np.allclose(embeddings, batch, atol=1e-5)
+    assert db_session.query(EmbeddingCache).count() == 4